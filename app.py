@@ -1,424 +1,778 @@
 # app.py
+import hashlib
+import io
+import os
+import uuid
+
 import streamlit as st
-import pandas as pd
-import requests
-from datetime import datetime
+
+import response_cache
+import jobs
+import schema
+from collector import MIN_INTERVAL_MINUTES, delta_log_exists, get_collector, load_watchlist, save_watchlist
+from credential_pool import get_credential_pool
+from credentials import SPOTIFY_CREDENTIALS_PATH, YOUTUBE_KEY_PATH, load_spotify_credential_pairs, load_youtube_api_keys
+from helpers import sanitize_filename, extract_datetime_from_filename, timestamped_filename
+from http_client import get_client
+from ingest import collect_inputs
+from matching import MIN_SCORE, missing_columns, unified_table
+from metrics import get_metrics
+from response_cache import get_response_cache
+from rollups import (COLLECTOR_ROLLUPS_PATH, DIMENSIONS, STORE_ROLLUPS_PATH, collector_snapshots, get_rollup_store,
+                     store_snapshots)
+from snapshot_store import SnapshotStore, store_available
+from spotify_api import SPOTIFY_MAX_WORKERS, get_spotify_token
+from youtube_api import YOUTUBE_DAILY_QUOTA
 
 st.set_page_config(page_title="YouTube & Spotify Analyzer", layout="wide")
 
+RESPONSE_CACHE_PATH = "cache/responses.sqlite"
+JOB_POLL_SECONDS = 1.0   # how often a running batch's panel refreshes
+JOB_INLINE_MESSAGES = 20  # longer job logs are collapsed into an expander
+JOB_INLINE_REJECTED = 200  # unparsed input lines listed on the page (all of them are downloadable)
+# parsed uploads and comparison results are memoized across reruns, bounded by count and age
+MEMO_MAX_ENTRIES = 16
+MEMO_TTL = 3600  # seconds; a "1h" string would make Streamlit import pandas just to parse it
+COMPARE_DIR = "cache/compare"  # change CSVs of out-of-core compares
+COMPARE_KEEP = MEMO_MAX_ENTRIES  # newest change CSVs kept there; older ones are deleted
+# st.download_button holds its data in memory, so larger change CSVs stay on disk instead of being offered
+COMPARE_DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
+# per-tab widgets ("yt_"/"sp_" + name) whose values survive while the other tab is shown;
+# file uploaders cannot be restored and start empty again
+TAB_WIDGET_STATE = ("input", "mode", "quota", "max_videos", "workers",
+                    "source", "s1", "s2", "c1", "c2", "ts_source", "ts_window", "ts_metric", "min_score",
+                    "lb_source", "lb_dimension", "lb_metric", "lb_capture", "lb_by", "lb_top", "lb_group")
+
 # -----------------------
-# Helpers
+# Load credentials (once per process; the file mtimes in the key pick up edited or newly created files)
 # -----------------------
-def now_ts():
-    return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-
-def timestamped_filename(prefix):
-    return f"{prefix}_{now_ts()}.csv"
-
-def sanitize_filename(s: str) -> str:
-    return s.replace(" ", "_").replace(":", "-")
-
-def extract_datetime_from_filename(filename: str) -> str:
-    name = filename
-    if name.lower().endswith(".csv"):
-        name = name[:-4]
-    parts = name.split("_")
-    if len(parts) >= 3:
-        date_part = parts[-2]
-        time_part = parts[-1]
-        return f"{date_part} {time_part.replace('-', ':')}"
-    return "Unknown Date"
+def file_mtime(path: str):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+@st.cache_resource(show_spinner=False)
+def load_credentials_memo(youtube_mtime, spotify_mtime):
+    # returns ([youtube_api_keys], [(spotify_client_id, spotify_client_secret)], warnings)
+    warnings = []
+    try:
+        youtube_keys = load_youtube_api_keys()
+    except Exception:
+        youtube_keys = []
+        warnings.append("google_api_key.txt not found or unreadable. Put your YouTube API key in that file.")
+    try:
+        spotify_pairs = [pair for pair in load_spotify_credential_pairs() if all(pair)]
+    except Exception:
+        spotify_pairs = []
+        warnings.append("spotify_credentials.txt not found or unreadable. "
+                        "Create it with CLIENT_ID=... and CLIENT_SECRET=...")
+    return youtube_keys, spotify_pairs, warnings
+
+youtube_api_keys, spotify_credential_pairs, credential_warnings = load_credentials_memo(
+    file_mtime(YOUTUBE_KEY_PATH), file_mtime(SPOTIFY_CREDENTIALS_PATH))
+# several keys / client pairs (one per line / pair in the files) are rotated by credential_pool.py
+youtube_pool = get_credential_pool("youtube")
+youtube_pool.configure(youtube_api_keys)
+spotify_pool = get_credential_pool("spotify")
+spotify_pool.configure(spotify_credential_pairs)
+youtube_api_key = youtube_api_keys[0] if youtube_api_keys else ""
+spotify_client_id, spotify_client_secret = spotify_credential_pairs[0] if spotify_credential_pairs else ("", "")
+for warning in credential_warnings:
+    st.warning(warning)
 
 # -----------------------
-# Load credentials
+# Memoized parsing / comparison (keyed by content hash, so reruns with unchanged inputs are free).
+# pandas and compare.py are imported inside, so a cold start that never compares does not load them.
 # -----------------------
-# YouTube key (single-line file)
-try:
-    with open("secrets/google_api_key.txt", "r", encoding="utf-8") as f:
-        youtube_api_key = f.read().strip()
-except Exception:
-    youtube_api_key = ""
-    st.warning("google_api_key.txt not found or unreadable. Put your YouTube API key in that file.")
-
-# Spotify credentials (CLIENT_ID=..., CLIENT_SECRET=...)
-spotify_client_id = ""
-spotify_client_secret = ""
-try:
-    with open("secrets/spotify_credentials.txt", "r", encoding="utf-8") as f:
-        for line in f:
-            if "=" in line:
-                k, v = line.strip().split("=", 1)
-                if k.strip().upper() == "CLIENT_ID":
-                    spotify_client_id = v.strip()
-                elif k.strip().upper() == "CLIENT_SECRET":
-                    spotify_client_secret = v.strip()
-except Exception:
-    spotify_client_id = ""
-    spotify_client_secret = ""
-    st.warning("spotify_credentials.txt not found or unreadable. Create it with CLIENT_ID=... and CLIENT_SECRET=...")
+# cache_resource hands back the same objects without copying; callers treat them as read-only
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def read_csv_memo(service: str, digest: str, _data: bytes):
+    import pandas as pd
+    return schema.apply_schema(service, pd.read_csv(io.BytesIO(_data)))
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def load_stored_snapshot_memo(service: str, path: str, mtime: float):
+    return schema.apply_schema(service, SnapshotStore().load(path)[0])
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def pairwise_changes_memo(service: str, key1: str, key2: str, _df1, _df2):
+    # returns (change DataFrame, CSV bytes, error)
+    import compare
+    change_df, err = compare.pairwise_changes(service, _df1, _df2)
+    if err:
+        return None, None, err
+    return change_df, change_df.to_csv(index=False).encode("utf-8"), None
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def timeseries_base_memo(service: str, keys: tuple, _snapshots):
+    # _snapshots are (captured_at, load, content key) and are only loaded on a miss: keyed per snapshot,
+    # a history longer than MEMO_MAX_ENTRIES would evict itself and every rerun would read it all again
+    import compare
+    return compare.build_timeseries(service, [(t, load()) for t, load, _ in _snapshots])
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def timeseries_memo(service: str, keys: tuple, window: int, _snapshots):
+    # returns (long frame, summary); the CSV export is built only when it is downloaded
+    import compare
+    long = compare.add_changes(timeseries_base_memo(service, keys, _snapshots), compare.METRICS[service], window)
+    return long, compare.summarize(long, service)
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def timeseries_wide_memo(service: str, keys: tuple, window: int, metric: str, _long):
+    import compare
+    return compare.to_wide(_long, metric)
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def rebuild_delta_memo(service: str, captured_at):
+    # the delta log is append-only, so a rebuilt point in time never changes
+    return get_collector().log.rebuild(service, captured_at)
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def chunked_compare_memo(service: str, id1: str, id2: str, _f1, _f2):
+    # returns (change CSV path, rows, preview, error); the change CSV is written to disk, not kept in memory
+    import compare
+    os.makedirs(COMPARE_DIR, exist_ok=True)
+    path = os.path.join(COMPARE_DIR, f"{service}_{sanitize_filename(id1)}_{sanitize_filename(id2)}.csv")
+    rows, preview, err = compare.compare_csv_chunked(service, _f1, _f2, path)
+    prune_compare_dir()
+    return path, rows, preview, err
+
+def prune_compare_dir(keep: int = COMPARE_KEEP):
+    # one change CSV per distinct pair of uploads would otherwise pile up forever
+    try:
+        paths = [os.path.join(COMPARE_DIR, name) for name in os.listdir(COMPARE_DIR) if name.endswith(".csv")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+    except OSError:
+        return
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@st.cache_resource(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)
+def match_memo(key_yt: str, key_sp: str, min_score: float, _yt, _sp):
+    # returns (unified table, stats, CSV bytes)
+    table, stats = unified_table(_yt, _sp, min_score)
+    return table, stats, table.to_csv(index=False).encode("utf-8")
+
+def upload_digest(f):
+    # hashing a large upload is itself slow, so the digest is remembered per upload for the lifetime of the session
+    digests = st.session_state.setdefault("upload_digests", {})
+    upload_id = getattr(f, "file_id", None) or f"{f.name}:{f.size}"
+    if upload_id not in digests:
+        digests[upload_id] = hashlib.blake2b(f.getvalue(), digest_size=16).hexdigest()
+    return digests[upload_id]
+
+def read_uploaded_csv(service: str, f):
+    # returns (DataFrame, content key)
+    digest = upload_digest(f)
+    return read_csv_memo(service, digest, f.getvalue()), digest
+
+def read_stored_snapshot(service: str, path: str):
+    # returns (DataFrame, content key); stored runs are immutable, so path + mtime identifies them
+    mtime = os.path.getmtime(path)
+    return load_stored_snapshot_memo(service, path, mtime), f"{path}:{mtime}"
 
 # -----------------------
-# YouTube helpers
+# Snapshot selection (uploaded CSVs or the local snapshot store)
 # -----------------------
-YOUTUBE_CATEGORIES = {
-    "1": "Film & Animation", "2": "Autos & Vehicles", "10": "Music", "15": "Pets & Animals",
-    "17": "Sports", "18": "Short Movies", "19": "Travel & Events", "20": "Gaming",
-    "21": "Videoblogging", "22": "People & Blogs", "23": "Comedy", "24": "Entertainment",
-    "25": "News & Politics", "26": "Howto & Style", "27": "Education",
-    "28": "Science & Technology", "29": "Nonprofits & Activism", "30": "Movies",
-    "31": "Anime/Animation", "32": "Action/Adventure", "33": "Classics", "34": "Comedy",
-    "35": "Documentary", "36": "Drama", "37": "Family", "38": "Foreign", "39": "Horror",
-    "40": "Sci-Fi/Fantasy", "41": "Thriller", "42": "Shorts", "43": "Shows", "44": "Trailers"
-}
-
-def extract_youtube_id(url: str) -> str:
-    s = url.strip()
-    if "v=" in s:
-        return s.split("v=")[1].split("&")[0]
-    if "youtu.be/" in s:
-        return s.split("youtu.be/")[1].split("?")[0]
-    return ""
-
-def chunkify(lst, n):
-    for i in range(0, len(lst), n):
-        yield lst[i:i+n]
-
-def fetch_youtube_videos(video_ids):
-    results = {}
-    if not youtube_api_key:
-        return results
-    base = "https://www.googleapis.com/youtube/v3/videos"
-    for chunk in chunkify(video_ids, 50):  # batch 50 per request
-        params = {
-            "part": "snippet,statistics,contentDetails",
-            "id": ",".join(chunk),
-            "key": youtube_api_key
-        }
+def render_large_compare(service: str, key: str):
+    # out-of-core pairwise compare: the uploads are never parsed into full DataFrames, but Streamlit
+    # still holds each upload in memory, so truly large exports belong in cli.py compare
+    st.caption("Only the join key, title and counter columns are read, in chunks, and the change CSV is written to "
+               "disk. Rows are grouped by key hash rather than kept in file order.")
+    st.caption(f"Uploads are held in memory (up to {st.get_option('server.maxUploadSize')} MB each). For "
+               f"multi-gigabyte exports run `python cli.py compare {service} old.csv new.csv`, which reads the files "
+               "from disk.")
+    f1 = st.file_uploader("Upload First CSV (older)", type=["csv"], key=f"{key}_big1")
+    f2 = st.file_uploader("Upload Second CSV (newer)", type=["csv"], key=f"{key}_big2")
+    if not (f1 and f2):
+        return
+    id1 = getattr(f1, "file_id", None) or f"{f1.name}:{f1.size}"
+    id2 = getattr(f2, "file_id", None) or f"{f2.name}:{f2.size}"
+    with st.spinner("Comparing…"):
         try:
-            r = requests.get(base, params=params, timeout=20)
+            path, rows, preview, err = chunked_compare_memo(service, id1, id2, f1, f2)
+            if not err and not os.path.exists(path):
+                # pruned since it was memoized
+                chunked_compare_memo.clear()
+                path, rows, preview, err = chunked_compare_memo(service, id1, id2, f1, f2)
         except Exception as e:
-            st.error(f"YouTube request error: {e}")
-            continue
-        if r.status_code != 200:
-            st.error(f"YouTube API error {r.status_code}: {r.text}")
-            continue
-        data = r.json()
-        for item in data.get("items", []):
-            vid = item.get("id")
-            if vid:
-                results[vid] = item
-    return results
-
-def build_youtube_row(item, input_url):
-    snippet = item.get("snippet", {})
-    stats = item.get("statistics", {})
-    content = item.get("contentDetails", {})
-    cat = snippet.get("categoryId", "")
-    return {
-        "Title": snippet.get("title"),
-        "URL": input_url,
-        "Video ID": item.get("id"),
-        "Published Date": snippet.get("publishedAt"),
-        "Channel Name": snippet.get("channelTitle"),
-        "Tags": ", ".join(snippet.get("tags", [])),
-        "Category ID": cat,
-        "Category Name": YOUTUBE_CATEGORIES.get(cat, "Unknown"),
-        "Duration": content.get("duration", ""),
-        "Views": stats.get("viewCount", ""),
-        "Likes": stats.get("likeCount", "Not available"),
-        "Comments": stats.get("commentCount", "Not available"),
-        "Reporting Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+            st.error(f"Error comparing CSVs: {e}")
+            return
+    if err:
+        st.error(err)
+        return
+    d1, d2 = extract_datetime_from_filename(f1.name), extract_datetime_from_filename(f2.name)
+    st.write(f"Snapshot 1: **{d1}**  →  Snapshot 2: **{d2}** — {rows:,} matched rows")
+    if preview is not None:
+        st.caption(f"Showing the first {len(preview):,} rows.")
+        st.dataframe(preview, use_container_width=True)
+    size = os.path.getsize(path)
+    if size > COMPARE_DOWNLOAD_MAX_BYTES:
+        st.info(f"The change CSV ({size / 1024 / 1024:,.0f} MB) is too large to download through the browser; "
+                f"it is on the server at `{path}`.")
+        return
+    fname = f"{service}_changes_{sanitize_filename(d1)}_to_{sanitize_filename(d2)}.csv"
+    with open(path, "rb") as f:
+        st.download_button("📥 Download Changes CSV", data=f, file_name=fname, mime="text/csv", key=f"{key}_big_download")
 
-# -----------------------
-# Spotify helpers (requests-only)
-# -----------------------
-def extract_spotify_id(s: str) -> str:
-    s = s.strip()
-    if s.startswith("spotify:track:"):
-        return s.split("spotify:track:")[1].split(":")[0]
-    if "open.spotify.com/track/" in s:
-        return s.split("open.spotify.com/track/")[1].split("?")[0]
-    # maybe user pasted just an id or a url with query removed
-    if len(s) >= 8 and all(c.isalnum() or c in "-_" for c in s):
-        return s
-    return ""
-
-def get_spotify_token(client_id: str, client_secret: str) -> str:
-    if not client_id or not client_secret:
-        return ""
-    url = "https://accounts.spotify.com/api/token"
-    try:
-        resp = requests.post(url, data={"grant_type": "client_credentials"}, auth=(client_id, client_secret), timeout=10)
-    except Exception:
-        return ""
-    if resp.status_code != 200:
-        return ""
-    return resp.json().get("access_token", "")
-
-def search_spotify_track(query: str, token: str):
-    # returns top track item or None
-    url = "https://api.spotify.com/v1/search"
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {"q": query, "type": "track", "limit": 1}
-    try:
-        r = requests.get(url, headers=headers, params=params, timeout=10)
-    except Exception:
-        return None
-    if r.status_code != 200:
+def snapshot_sources():
+    sources = ["Upload CSVs", "Large CSVs (out-of-core)"]
+    if store_available():
+        sources.append("Snapshot store")
+    if delta_log_exists():
+        sources.append("Collector delta log")
+    return sources
+
+def select_snapshot_pair(service: str, key: str):
+    # renders the snapshot pickers for one compare section; returns (df1, df2, label1, label2, key1, key2) or None
+    source = st.radio("Snapshot source", snapshot_sources(), horizontal=True, key=f"{key}_source")
+    if source == "Large CSVs (out-of-core)":
+        render_large_compare(service, key)
         return None
-    data = r.json()
-    items = data.get("tracks", {}).get("items", [])
-    return items[0] if items else None
+    if source == "Upload CSVs":
+        f1 = st.file_uploader("Upload First CSV (older)", type=["csv"], key=f"{key}_f1")
+        f2 = st.file_uploader("Upload Second CSV (newer)", type=["csv"], key=f"{key}_f2")
+        if not (f1 and f2):
+            return None
+        try:
+            df1, k1 = read_uploaded_csv(service, f1)
+            df2, k2 = read_uploaded_csv(service, f2)
+        except Exception as e:
+            st.error(f"Error reading CSVs: {e}")
+            return None
+        return df1, df2, extract_datetime_from_filename(f1.name), extract_datetime_from_filename(f2.name), k1, k2
+
+    if source == "Collector delta log":
+        captures = get_collector().log.captures(service)
+        if len(captures) < 2:
+            st.info("The collector needs at least two captures for this service.")
+            return None
+        labels = [c.strftime("%Y-%m-%d %H:%M:%S") for c in captures]
+        i1 = st.selectbox("First capture (older)", range(len(labels)), index=len(labels) - 2,
+                          format_func=lambda i: labels[i], key=f"{key}_c1")
+        i2 = st.selectbox("Second capture (newer)", range(len(labels)), index=len(labels) - 1,
+                          format_func=lambda i: labels[i], key=f"{key}_c2")
+        df1 = rebuild_delta_memo(service, captures[i1])
+        df2 = rebuild_delta_memo(service, captures[i2])
+        return df1, df2, labels[i1], labels[i2], f"delta:{labels[i1]}", f"delta:{labels[i2]}"
 
-def fetch_spotify_track_details(track_id: str, token: str):
-    headers = {"Authorization": f"Bearer {token}"}
+    store = SnapshotStore()
+    snapshots = store.list_snapshots(service)
+    if len(snapshots) < 2:
+        st.info("The snapshot store needs at least two saved runs for this service.")
+        return None
+    labels = [captured_at.strftime("%Y-%m-%d %H:%M:%S") for captured_at, _ in snapshots]
+    i1 = st.selectbox("First snapshot (older)", range(len(labels)), index=len(labels) - 2,
+                      format_func=lambda i: labels[i], key=f"{key}_s1")
+    i2 = st.selectbox("Second snapshot (newer)", range(len(labels)), index=len(labels) - 1,
+                      format_func=lambda i: labels[i], key=f"{key}_s2")
     try:
-        r = requests.get(f"https://api.spotify.com/v1/tracks/{track_id}", headers=headers, timeout=10)
+        df1, k1 = read_stored_snapshot(service, snapshots[i1][1])
+        df2, k2 = read_stored_snapshot(service, snapshots[i2][1])
     except Exception as e:
-        return None, f"Request error: {e}"
-    if r.status_code != 200:
-        return None, f"HTTP {r.status_code}: {r.text}"
-    t = r.json()
+        st.error(f"Error reading snapshots: {e}")
+        return None
+    return df1, df2, labels[i1], labels[i2], k1, k2
 
-    # audio features (tempo, danceability, energy)
-    features = {}
-    try:
-        fresp = requests.get(f"https://api.spotify.com/v1/audio-features/{track_id}", headers=headers, timeout=10)
-        if fresp.status_code == 200:
-            features = fresp.json()
-    except Exception:
-        features = {}
+def select_snapshot_series(service: str, key: str):
+    # renders the pickers for the time-series section; returns [(captured_at, load, content key)].
+    # Nothing is parsed here when the capture time is known without it: timeseries_memo loads the
+    # snapshots only when the series is not memoized yet
+    sources = [s for s in snapshot_sources() if s != "Large CSVs (out-of-core)"]
+    source = st.radio("Snapshot source", sources, horizontal=True, key=f"{key}_ts_source")
+    snapshots = []
+    if source == "Upload CSVs":
+        files = st.file_uploader("Upload snapshot CSVs (any number)", type=["csv"],
+                                 accept_multiple_files=True, key=f"{key}_ts_files")
+        for f in files or []:
+            import pandas as pd
+            load = lambda f=f: read_uploaded_csv(service, f)[0]
+            captured_at = pd.to_datetime(extract_datetime_from_filename(f.name), errors="coerce")
+            if pd.isna(captured_at):
+                try:
+                    df = load()
+                except Exception as e:
+                    st.error(f"Error reading {f.name}: {e}")
+                    continue
+                if "Reporting Date" in df.columns:
+                    captured_at = pd.to_datetime(df["Reporting Date"], errors="coerce").min()
+            if pd.isna(captured_at):
+                st.warning(f"Could not determine the capture time of {f.name}; skipped.")
+                continue
+            snapshots.append((captured_at, load, upload_digest(f)))
+    elif source == "Collector delta log":
+        log = get_collector().log
+        for captured_at in log.captures(service):
+            snapshots.append((captured_at, lambda at=captured_at: log.rebuild(service, at), f"delta:{captured_at}"))
+    else:
+        store = SnapshotStore()
+        for captured_at, path in store.list_snapshots(service):
+            load = lambda path=path: schema.apply_schema(service, store.load(path)[0])
+            snapshots.append((captured_at, load, f"{path}:{os.path.getmtime(path)}"))
+    return snapshots
 
-    # artist followers (first artist)
-    artist_followers = None
+def render_timeseries_section(service: str, key: str):
+    snapshots = select_snapshot_series(service, key)
+    if len(snapshots) < 2:
+        st.info("Provide at least two snapshots to build a time series.")
+        return
+    window = st.number_input("Velocity window (snapshots)", min_value=1, max_value=365, value=7, step=1, key=f"{key}_ts_window")
+    keys = tuple((str(t), k) for t, _, k in snapshots)
     try:
-        if t.get("artists"):
-            artist_id = t["artists"][0].get("id")
-            if artist_id:
-                ar = requests.get(f"https://api.spotify.com/v1/artists/{artist_id}", headers=headers, timeout=10)
-                if ar.status_code == 200:
-                    artist_followers = ar.json().get("followers", {}).get("total")
-    except Exception:
-        artist_followers = None
-
-    artists = ", ".join([a.get("name") for a in t.get("artists", []) if a.get("name")])
-    return {
-        "Track Name": t.get("name"),
-        "Track URL": t.get("external_urls", {}).get("spotify", f"https://open.spotify.com/track/{track_id}"),
-        "Artists": artists,
-        "Album": t.get("album", {}).get("name"),
-        "Release Date": t.get("album", {}).get("release_date"),
-        "Duration (ms)": t.get("duration_ms"),
-        "Popularity": t.get("popularity"),
-        "Artist Followers": artist_followers,
-        "Tempo": features.get("tempo"),
-        "Danceability": features.get("danceability"),
-        "Energy": features.get("energy"),
-        "Reporting Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }, None
+        with st.spinner("Loading snapshots…"):
+            long, summary = timeseries_memo(service, keys, int(window), snapshots)
+    except Exception as e:
+        st.error(f"Error building the time series: {e}")
+        return
+    st.write(f"{len(summary)} items across {len(snapshots)} snapshots")
+    st.dataframe(summary, use_container_width=True)
+    metric = st.selectbox("Metric by snapshot", schema.METRICS[service], key=f"{key}_ts_metric")
+    st.dataframe(timeseries_wide_memo(service, keys, int(window), metric, long), use_container_width=True)
+    # a callable is only run when the button is clicked, so the (possibly multi-GB) CSV is not kept per rerun
+    st.download_button("📥 Download Time Series CSV", data=lambda: long.to_csv(index=False).encode("utf-8"),
+                       file_name=timestamped_filename(f"{service}_timeseries"), mime="text/csv",
+                       key=f"{key}_ts_download")
+
+# -----------------------
+# Leaderboards (read from rollups.py; only snapshots added since the last visit are rolled up)
+# -----------------------
+def synced_rollups(service: str, source: str):
+    if source == "Collector delta log":
+        rollups, snapshots = get_rollup_store(COLLECTOR_ROLLUPS_PATH), collector_snapshots(service, get_collector().log)
+    else:
+        rollups, snapshots = get_rollup_store(STORE_ROLLUPS_PATH), store_snapshots(service, SnapshotStore())
+    with st.spinner("Rolling up new snapshots…"):
+        try:
+            rollups.sync(service, snapshots)
+        except Exception as e:
+            st.error(f"Error rolling up snapshots: {e}")
+            return None
+    return rollups
+
+def render_leaderboard_section(service: str, key: str):
+    sources = [s for s in snapshot_sources() if s in ("Snapshot store", "Collector delta log")]
+    if not sources:
+        st.info("Leaderboards are built from the snapshot store or the collector delta log; neither has data yet.")
+        return
+    # nothing is picked by default, so opening the tab does not load pyarrow or read the store
+    source = st.radio("Snapshot source", sources, index=None, horizontal=True, key=f"{key}_lb_source")
+    if source is None:
+        return
+    rollups = synced_rollups(service, source)
+    if rollups is None:
+        return
+    captures = rollups.captures(service)
+    if not captures:
+        st.info("No snapshots to rank yet.")
+        return
+    labels = [c.strftime("%Y-%m-%d %H:%M:%S") for c in captures]
+    lcol1, lcol2, lcol3 = st.columns(3)
+    dimension = lcol1.selectbox("Group by", list(DIMENSIONS[service]), format_func=str.title, key=f"{key}_lb_dimension")
+    metric = lcol2.selectbox("Metric", schema.METRICS[service], key=f"{key}_lb_metric",
+                             help="Popularity and Artist Followers are averaged per track; other counters are summed.")
+    i = lcol3.selectbox("Snapshot", range(len(labels)), index=len(labels) - 1, format_func=lambda i: labels[i],
+                        key=f"{key}_lb_capture")
+    lcol4, lcol5 = st.columns(2)
+    by = lcol4.radio("Rank by", ["change", "total"], horizontal=True, format_func=str.title, key=f"{key}_lb_by",
+                     help="Change since each item's previous snapshot, or the current total.")
+    top = int(lcol5.number_input("Top", min_value=1, max_value=500, value=10, step=5, key=f"{key}_lb_top"))
+    board = rollups.leaderboard(service, dimension, metric, captures[i], by, top)
+    st.dataframe(board, use_container_width=True)
+    if i == 0:
+        st.caption("Changes start with the second snapshot.")
+    gcol, fcol = st.columns(2)
+    gcol.caption("Top gainers")
+    gcol.dataframe(rollups.movers(service, metric, captures[i], "up", top), use_container_width=True)
+    fcol.caption("Top fallers")
+    fcol.dataframe(rollups.movers(service, metric, captures[i], "down", top), use_container_width=True)
+    if not board.empty:
+        group = st.selectbox(f"{dimension.title()} history", board.iloc[:, 0].tolist(), key=f"{key}_lb_group")
+        st.line_chart(rollups.history(service, dimension, group, metric).set_index("Captured At")[metric])
+
+# -----------------------
+# Cross-platform matching
+# -----------------------
+def latest_batch_frames():
+    # {service: (frame, key)} of this session's finished batches
+    runner = jobs.get_job_runner()
+    out = {}
+    for service, key in (("youtube", "yt"), ("spotify", "sp")):
+        job = runner.get(st.session_state.get(f"{key}_job"))
+        if job is not None and not job.active and job.result and job.result["frame"] is not None:
+            out[service] = (job.result["frame"], f"job:{job.id}")
+    return out
+
+def select_match_inputs(key: str):
+    # renders the pickers for the matching tab; returns (youtube df, key, spotify df, key) or None
+    latest = latest_batch_frames()
+    sources = ["Upload CSVs"]
+    if len(latest) == 2:
+        sources.append("This session's latest batches")
+    if store_available():
+        sources.append("Snapshot store (latest runs)")
+    source = st.radio("Source", sources, horizontal=True, key=f"{key}_source")
+    if source == "This session's latest batches":
+        return latest["youtube"] + latest["spotify"]
+    if source == "Upload CSVs":
+        f1 = st.file_uploader("YouTube CSV", type=["csv"], key=f"{key}_yt")
+        f2 = st.file_uploader("Spotify CSV", type=["csv"], key=f"{key}_sp")
+        if not (f1 and f2):
+            return None
+        try:
+            return read_uploaded_csv("youtube", f1) + read_uploaded_csv("spotify", f2)
+        except Exception as e:
+            st.error(f"Error reading CSVs: {e}")
+            return None
+
+    store = SnapshotStore()
+    picked = ()
+    for service in ("youtube", "spotify"):
+        snapshots = store.list_snapshots(service)
+        if not snapshots:
+            st.info(f"The snapshot store has no {service} runs yet.")
+            return None
+        captured_at, path = snapshots[-1]
+        st.caption(f"{service}: run of {captured_at:%Y-%m-%d %H:%M:%S}")
+        try:
+            picked += read_stored_snapshot(service, path)
+        except Exception as e:
+            st.error(f"Error reading snapshots: {e}")
+            return None
+    return picked
+
+# -----------------------
+# Background jobs (the batch runs on jobs.py's worker pool; the session only keeps the job id)
+# -----------------------
+def job_owner():
+    # one owner per browser session, for the runner's per-session fairness
+    if "job_owner" not in st.session_state:
+        st.session_state["job_owner"] = uuid.uuid4().hex
+    return st.session_state["job_owner"]
+
+def submit_job(service: str, key: str, fn, *args):
+    # a new batch replaces this tab's previous one
+    runner = jobs.get_job_runner()
+    previous = runner.get(st.session_state.get(f"{key}_job"))
+    if previous is not None and previous.active:
+        runner.cancel(previous.id)
+    st.session_state[f"{key}_job"] = runner.submit(job_owner(), service, lambda job: fn(job, *args))
+
+def render_job_panel(service: str, key: str):
+    # a running job is polled by render_job_progress; a finished one is rendered once, outside the timer,
+    # so its table and CSV are not rebuilt every JOB_POLL_SECONDS for the rest of the session
+    job = jobs.get_job_runner().get(st.session_state.get(f"{key}_job"))
+    if job is None:
+        return
+    st.subheader("📋 Video Data Table" if service == "youtube" else "📋 Track Data Table")
+    if job.active:
+        render_job_progress(service, key)
+    else:
+        render_job_result(service, key, job.snapshot())
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_progress(service: str, key: str):
+    # re-runs on its own every JOB_POLL_SECONDS while the job runs; the rest of the page is not re-executed.
+    # Once the job has finished the whole page reruns once, which stops the timer
+    runner = jobs.get_job_runner()
+    job = runner.get(st.session_state.get(f"{key}_job"))
+    if job is None or not job.active:
+        st.rerun()
+    snap = job.snapshot()
+    if snap["status"] == "queued":
+        st.info("Waiting for a free worker…")
+    render_job_status(service, snap)
+    if st.button("Cancel", key=f"{key}_job_cancel"):
+        runner.cancel(job.id)
+    render_job_log(service, key, snap)
+    if snap["rows"]:
+        st.dataframe(schema.to_frame(service, snap["rows"]), use_container_width=True)
+
+def render_job_status(service: str, snap):
+    noun = "videos" if service == "youtube" else "tracks"
+    status, total = snap["status"], snap["total"]
+    st.progress(snap["done"] / total if total else 0.0,
+                text=f"{status.capitalize()}: {snap['done']} of {total} {noun}" if total else status.capitalize())
+
+def render_job_log(service: str, key: str, snap):
+    messages = snap["messages"]
+    if len(messages) <= JOB_INLINE_MESSAGES:
+        levels = {"info": st.write, "warning": st.warning, "error": st.error}
+        for level, text in messages:
+            levels[level](text)
+    else:
+        with st.expander(f"📝 {len(messages) + snap['dropped_messages']} messages"):
+            st.text("\n".join(text for _, text in messages))
+    if snap["rejected"]:
+        with st.expander(f"🚫 {len(snap['rejected'])} input lines could not be parsed"):
+            st.text("\n".join(snap["rejected"][:JOB_INLINE_REJECTED]))
+            st.download_button("📥 Download unparsed lines", data="\n".join(snap["rejected"]).encode("utf-8"),
+                               file_name=f"{service}_unparsed.txt", mime="text/plain", key=f"{key}_job_rejected")
+
+def render_job_result(service: str, key: str, snap):
+    noun = "videos" if service == "youtube" else "tracks"
+    status = snap["status"]
+    render_job_status(service, snap)
+    render_job_log(service, key, snap)
+    if status == "failed":
+        st.error(f"Batch failed: {snap['error']}")
+    result = snap["result"]
+    if status == "cancelled":
+        st.warning(f"Cancelled. Submit the same input again to resume from the {len(snap['rows'])} {noun} already fetched.")
+    if result and result["frame"] is not None:
+        st.dataframe(result["frame"], use_container_width=True)
+        label = "📥 Download CSV" if status == "done" else "📥 Download partial CSV"
+        st.download_button(label, data=result["csv"], file_name=timestamped_filename(f"{service}_analysis"),
+                           mime="text/csv", key=f"{key}_job_download")
+        if result["stored"]:
+            st.caption(f"💾 Saved to snapshot store: {result['stored']}")
+    elif status in ("done", "cancelled"):
+        st.warning(f"No valid {'video' if service == 'youtube' else 'track'} data found.")
+    if result and "quota_spent" in result:
+        st.caption(f"YouTube quota used by this run: {result['quota_spent']} of {result['quota_limit']} units")
+
+def stats_table(stats):
+    # {row: {column: value}} as a table, for the sidebar diagnostics
+    import pandas as pd
+    st.dataframe(pd.DataFrame(stats).T, use_container_width=True)
+
+def keep_tab_state(key: str):
+    # widgets that are not rendered in a run lose their state; re-assigning it keeps it for the next visit
+    for name in TAB_WIDGET_STATE:
+        widget_key = f"{key}_{name}"
+        if widget_key in st.session_state:
+            st.session_state[widget_key] = st.session_state[widget_key]
 
 # -----------------------
 # UI: Tabs
 # -----------------------
+persist_cache = st.sidebar.checkbox("Persist response cache on disk (SQLite)", value=False, key="cache_persist")
+response_cache.configure_response_cache(RESPONSE_CACHE_PATH if persist_cache else None)
+save_to_store = st.sidebar.checkbox("Save each run to the snapshot store (Parquet)", value=store_available(),
+                                    disabled=not store_available(), key="save_to_store",
+                                    help="Requires pyarrow. Stored runs can be compared without uploading CSVs.")
+
+collector = get_collector()
+collector.configure(youtube_api_key, spotify_client_id, spotify_client_secret)
+with st.sidebar.expander("⏱️ Scheduled collector"):
+    st.caption("Re-polls a watch list on a schedule and stores only the counters that changed. "
+               "Captures can be compared like snapshots (source: Collector delta log).")
+    watchlist = load_watchlist()
+    wl_yt = st.text_area("YouTube video URLs", "\n".join(watchlist["youtube"]), key="wl_yt")
+    wl_sp = st.text_area("Spotify track URLs/URIs", "\n".join(watchlist["spotify"]), key="wl_sp")
+    wl_interval = st.number_input("Interval (minutes)", min_value=MIN_INTERVAL_MINUTES,
+                                  value=max(MIN_INTERVAL_MINUTES, int(watchlist["interval_minutes"])), step=5, key="wl_interval")
+    if st.button("Save watch list", key="wl_save"):
+        save_watchlist({"youtube": [l.strip() for l in wl_yt.splitlines() if l.strip()],
+                        "spotify": [l.strip() for l in wl_sp.splitlines() if l.strip()],
+                        "interval_minutes": int(wl_interval)})
+        st.success("Watch list saved.")
+    ccol1, ccol2 = st.columns(2)
+    if collector.running:
+        if ccol1.button("Stop schedule", key="collector_stop"):
+            collector.stop()
+    elif ccol1.button("Start schedule", key="collector_start"):
+        collector.start()
+    if ccol2.button("Capture now", key="collector_now"):
+        for service in ("youtube", "spotify"):
+            items, changed, errors = collector.capture(service)
+            if items:
+                st.write(f"{service}: {items} items, {changed} changed values stored")
+    st.caption("Schedule running" if collector.running else "Schedule stopped")
+    for service, errors in collector.last_errors.items():
+        for err in errors[:5]:
+            st.warning(f"{service}: {err}")
+    if delta_log_exists():
+        stats_table(collector.log.stats())
+
 st.title("📊 Media Stats Analyzer — YouTube & Spotify")
-tab_yt, tab_sp = st.tabs(["YouTube", "Spotify"])
 
 # ---- YouTube tab ----
-with tab_yt:
+def render_youtube_tab():
     st.header("📺 YouTube Video Analyzer")
-    st.info("Paste multiple YouTube URLs (one per line). Example: https://www.youtube.com/watch?v=VIDEO_ID or https://youtu.be/VIDEO_ID")
-    yt_input = st.text_area("YouTube URLs (one per line)", height=200, placeholder="https://www.youtube.com/watch?v=...")
+    st.info("Paste multiple YouTube URLs (one per line). Example: https://www.youtube.com/watch?v=VIDEO_ID or https://youtu.be/VIDEO_ID. "
+            "Channel (https://www.youtube.com/@handle, /channel/UC...) and playlist (?list=...) URLs are expanded to all of their videos.")
+    yt_input = st.text_area("YouTube URLs (one per line)", height=200, placeholder="https://www.youtube.com/watch?v=...",
+                            key="yt_input")
+    yt_files = st.file_uploader("…or upload URL lists (.txt, or .csv with a url column)", type=["txt", "csv"],
+                                accept_multiple_files=True, key="yt_files")
+    qcol1, qcol2 = st.columns(2)
+    yt_quota = qcol1.number_input("Quota budget for this run (units)", min_value=1,
+                                  value=YOUTUBE_DAILY_QUOTA * max(1, len(youtube_pool)), step=100, key="yt_quota",
+                                  help="Defaults to one daily quota per API key.")
+    yt_max_videos = qcol2.number_input("Max videos per channel/playlist", min_value=1, value=5000, step=50, key="yt_max_videos")
     if st.button("Analyze YouTube Videos", key="analyze_yt"):
-        if not yt_input.strip():
+        lines, file_errors = collect_inputs(yt_input, [(f.name, f.getvalue()) for f in yt_files or []])
+        for err in file_errors:
+            st.error(err)
+        if not lines:
             st.error("Please enter at least one YouTube URL.")
-        elif not youtube_api_key:
+        elif not youtube_pool:
             st.error("YouTube API key missing. Add your key to google_api_key.txt.")
         else:
-            lines = [l.strip() for l in yt_input.splitlines() if l.strip()]
-            ids = []
-            url_map = {}
-            for l in lines:
-                vid = extract_youtube_id(l)
-                if not vid:
-                    st.warning(f"Could not parse video id from: {l}")
-                    continue
-                ids.append(vid)
-                url_map[vid] = l
-            if not ids:
-                st.error("No valid YouTube IDs parsed.")
-            else:
-                items_map = fetch_youtube_videos(ids)
-                rows = []
-                for vid in ids:
-                    item = items_map.get(vid)
-                    if not item:
-                        st.warning(f"No data returned for video id: {vid} (input: {url_map.get(vid)})")
-                        continue
-                    row = build_youtube_row(item, url_map.get(vid))
-                    rows.append(row)
-                if rows:
-                    df_yt = pd.DataFrame(rows)
-                    st.subheader("📋 Video Data Table")
-                    st.dataframe(df_yt, use_container_width=True)
-                    csv_bytes = df_yt.to_csv(index=False).encode("utf-8")
-                    fname = timestamped_filename("youtube_analysis")
-                    st.download_button("📥 Download CSV", data=csv_bytes, file_name=fname, mime="text/csv")
-                else:
-                    st.warning("No valid video data found.")
+            submit_job("youtube", "yt", jobs.youtube_batch, lines, youtube_pool, int(yt_quota), int(yt_max_videos),
+                       SnapshotStore() if save_to_store else None)
+    render_job_panel("youtube", "yt")
 
     st.markdown("---")
     st.subheader("📊 Compare Two YouTube Data Snapshots")
-    st.write("Upload two CSVs downloaded from this app (filenames must include the timestamp).")
-    f1 = st.file_uploader("Upload First CSV (older)", type=["csv"], key="yt_f1")
-    f2 = st.file_uploader("Upload Second CSV (newer)", type=["csv"], key="yt_f2")
-    if f1 and f2:
-        try:
-            df1 = pd.read_csv(f1)
-            df2 = pd.read_csv(f2)
-        except Exception as e:
-            st.error(f"Error reading CSVs: {e}")
+    st.write("Upload two CSVs downloaded from this app (filenames must include the timestamp) or pick two runs from the snapshot store.")
+    pair = select_snapshot_pair("youtube", "yt")
+    if pair:
+        df1, df2, d1, d2, k1, k2 = pair
+        st.write(f"Snapshot 1: **{d1}**  →  Snapshot 2: **{d2}**")
+        change_df, change_csv, err = pairwise_changes_memo("youtube", k1, k2, df1, df2)
+        if err:
+            st.error(err)
         else:
-            d1 = extract_datetime_from_filename(f1.name)
-            d2 = extract_datetime_from_filename(f2.name)
-            st.write(f"Snapshot 1: **{d1}**  →  Snapshot 2: **{d2}**")
-            if "URL" not in df1.columns or "URL" not in df2.columns:
-                st.error("Both CSVs must contain 'URL' column to compare.")
-            else:
-                merged = pd.merge(df1, df2, on="URL", suffixes=("_old", "_new"))
-                for col in ["Views", "Likes", "Comments"]:
-                    oldc = f"{col}_old"
-                    newc = f"{col}_new"
-                    if oldc in merged.columns and newc in merged.columns:
-                        merged[oldc] = pd.to_numeric(merged[oldc], errors="coerce").fillna(0)
-                        merged[newc] = pd.to_numeric(merged[newc], errors="coerce").fillna(0)
-                        merged[f"{col} Change"] = merged[newc] - merged[oldc]
-                display_cols = [c for c in [
-                    "Title_old", "URL",
-                    "Views_old", "Views_new", "Views Change",
-                    "Likes_old", "Likes_new", "Likes Change",
-                    "Comments_old", "Comments_new", "Comments Change"
-                ] if c in merged.columns]
-                change_df = merged[display_cols].rename(columns={"Title_old": "Title"})
-                st.subheader("📈 Changes between snapshots")
-                st.dataframe(change_df, use_container_width=True)
-                change_csv = change_df.to_csv(index=False).encode("utf-8")
-                fname = f"youtube_changes_{sanitize_filename(d1)}_to_{sanitize_filename(d2)}.csv"
-                st.download_button("📥 Download Changes CSV", data=change_csv, file_name=fname, mime="text/csv")
+            st.subheader("📈 Changes between snapshots")
+            st.dataframe(change_df, use_container_width=True)
+            fname = f"youtube_changes_{sanitize_filename(d1)}_to_{sanitize_filename(d2)}.csv"
+            st.download_button("📥 Download Changes CSV", data=change_csv, file_name=fname, mime="text/csv")
+
+    st.markdown("---")
+    st.subheader("📈 YouTube Trends Across Many Snapshots")
+    st.write("Combine any number of snapshots into one time series with per-video deltas, growth rates and velocity.")
+    render_timeseries_section("youtube", "yt")
+
+    st.markdown("---")
+    st.subheader("🏆 YouTube Leaderboards")
+    st.write("Totals, changes and top movers by channel and category, from rollups updated as new snapshots arrive.")
+    render_leaderboard_section("youtube", "yt")
 
 # ---- Spotify tab ----
-with tab_sp:
+def render_spotify_tab():
     st.header("🎧 Spotify Track Analyzer")
     st.info("You can either paste Spotify track URLs/URIs (one per line) OR paste track titles (one per line) and the app will search Spotify for the top match.")
-    input_mode = st.radio("Input mode", ["Track URLs/URIs", "Track Titles (search)"], index=0)
-    sp_input = st.text_area("Enter items (one per line)", height=200, placeholder="Either spotify URLs/URIs or titles like 'Blinding Lights - The Weeknd'")
+    input_mode = st.radio("Input mode", ["Track URLs/URIs", "Track Titles (search)"], index=0, key="sp_mode")
+    sp_input = st.text_area("Enter items (one per line)", height=200, placeholder="Either spotify URLs/URIs or titles like 'Blinding Lights - The Weeknd'",
+                            key="sp_input")
+    sp_files = st.file_uploader("…or upload lists (.txt, or .csv with a url/title column)", type=["txt", "csv"],
+                                accept_multiple_files=True, key="sp_files")
 
     # --- UX tip shown when Track Titles mode is selected ---
     if input_mode == "Track Titles (search)":
         st.caption("💡 Tip: include the artist name with the track title for better search accuracy — for example: `Blinding Lights - The Weeknd`.")
 
+    sp_workers = st.number_input("Concurrent requests", min_value=1, max_value=32, value=SPOTIFY_MAX_WORKERS, step=1, key="sp_workers")
+
     if st.button("Analyze Spotify Tracks", key="analyze_sp"):
-        if not sp_input.strip():
+        lines, file_errors = collect_inputs(sp_input, [(f.name, f.getvalue()) for f in sp_files or []])
+        for err in file_errors:
+            st.error(err)
+        if not lines:
             st.error("Please enter at least one line.")
-        elif not spotify_client_id or not spotify_client_secret:
+        elif not spotify_pool:
             st.error("Spotify credentials missing. Add CLIENT_ID and CLIENT_SECRET to spotify_credentials.txt.")
         else:
-            token = get_spotify_token(spotify_client_id, spotify_client_secret)
-            if not token:
+            if not any(get_spotify_token(client_id, secret) for client_id, secret in spotify_credential_pairs):
                 st.error("Could not obtain Spotify access token. Check CLIENT_ID/CLIENT_SECRET.")
             else:
-                lines = [l.strip() for l in sp_input.splitlines() if l.strip()]
-                rows = []
-                for l in lines:
-                    if input_mode == "Track URLs/URIs":
-                        tid = extract_spotify_id(l)
-                        if not tid:
-                            st.warning(f"Could not extract track id from: {l}")
-                            continue
-                        st.write(f"🔍 Extracted track ID: `{tid}`")
-                        data, err = fetch_spotify_track_details(tid, token)
-                        if err:
-                            st.warning(f"{l} -> {err}")
-                            continue
-                        # ensure Track URL column contains original input if external url missing
-                        if not data.get("Track URL"):
-                            data["Track URL"] = l
-                        rows.append(data)
-                    else:  # Track Titles
-                        # search for title
-                        st.write(f"🔎 Searching for: `{l}`")
-                        item = search_spotify_track(l, token)
-                        if not item:
-                            st.warning(f"No match found for title: {l}")
-                            continue
-                        tid = item.get("id")
-                        if not tid:
-                            st.warning(f"No track id for search result: {l}")
-                            continue
-                        st.write(f"✔ Top match: `{item.get('name')}` by {', '.join([a.get('name') for a in item.get('artists', [])])}")
-                        data, err = fetch_spotify_track_details(tid, token)
-                        if err:
-                            st.warning(f"{l} -> {err}")
-                            continue
-                        rows.append(data)
-
-                if rows:
-                    df_sp = pd.DataFrame(rows)
-                    st.subheader("📋 Track Data Table")
-                    st.dataframe(df_sp, use_container_width=True)
-                    csv_bytes = df_sp.to_csv(index=False).encode("utf-8")
-                    fname = timestamped_filename("spotify_analysis")
-                    st.download_button("📥 Download CSV", data=csv_bytes, file_name=fname, mime="text/csv")
-                else:
-                    st.warning("No valid track data found.")
+                submit_job("spotify", "sp", jobs.spotify_batch, lines, input_mode, spotify_pool, int(sp_workers),
+                           SnapshotStore() if save_to_store else None)
+    render_job_panel("spotify", "sp")
 
     st.markdown("---")
     st.subheader("📊 Compare Two Spotify Data Snapshots")
-    st.write("Upload two CSVs downloaded from this app and the app will compute changes in Popularity and Artist Followers when available.")
-    s1 = st.file_uploader("Upload First CSV (older)", type=["csv"], key="sp_f1")
-    s2 = st.file_uploader("Upload Second CSV (newer)", type=["csv"], key="sp_f2")
-    if s1 and s2:
-        try:
-            df1 = pd.read_csv(s1)
-            df2 = pd.read_csv(s2)
-        except Exception as e:
-            st.error(f"Error reading CSVs: {e}")
+    st.write("Upload two CSVs downloaded from this app (or pick two runs from the snapshot store) and the app will compute changes in Popularity and Artist Followers when available.")
+    pair = select_snapshot_pair("spotify", "sp")
+    if pair:
+        df1, df2, d1, d2, k1, k2 = pair
+        st.write(f"Snapshot 1: **{d1}**  →  Snapshot 2: **{d2}**")
+        change_df, change_csv, err = pairwise_changes_memo("spotify", k1, k2, df1, df2)
+        if err:
+            st.error(err)
         else:
-            d1 = extract_datetime_from_filename(s1.name)
-            d2 = extract_datetime_from_filename(s2.name)
-            st.write(f"Snapshot 1: **{d1}**  →  Snapshot 2: **{d2}**")
-            # prefer Track URL, fallback to Track Name
-            merge_key = None
-            if "Track URL" in df1.columns and "Track URL" in df2.columns:
-                merge_key = "Track URL"
-            elif "Track Name" in df1.columns and "Track Name" in df2.columns:
-                merge_key = "Track Name"
-            else:
-                st.error("CSV files must contain 'Track URL' or 'Track Name' columns to compare.")
-            if merge_key:
-                merged = pd.merge(df1, df2, on=merge_key, suffixes=("_old", "_new"))
-                for col in ["Popularity", "Artist Followers"]:
-                    oldc = f"{col}_old"
-                    newc = f"{col}_new"
-                    if oldc in merged.columns and newc in merged.columns:
-                        merged[oldc] = pd.to_numeric(merged[oldc], errors="coerce").fillna(0)
-                        merged[newc] = pd.to_numeric(merged[newc], errors="coerce").fillna(0)
-                        merged[f"{col} Change"] = merged[newc] - merged[oldc]
-                display_cols = []
-                if "Track Name_old" in merged.columns:
-                    display_cols.append("Track Name_old")
-                display_cols.append(merge_key)
-                for col in ["Popularity", "Artist Followers"]:
-                    for c in (f"{col}_old", f"{col}_new", f"{col} Change"):
-                        if c in merged.columns:
-                            display_cols.append(c)
-                display_cols = [c for c in display_cols if c in merged.columns]
-                change_df = merged[display_cols].rename(columns={"Track Name_old": "Track Name"})
-                st.subheader("📈 Changes between snapshots")
-                st.dataframe(change_df, use_container_width=True)
-                change_csv = change_df.to_csv(index=False).encode("utf-8")
-                fname = f"spotify_changes_{sanitize_filename(d1)}_to_{sanitize_filename(d2)}.csv"
-                st.download_button("📥 Download Changes CSV", data=change_csv, file_name=fname, mime="text/csv")
+            st.subheader("📈 Changes between snapshots")
+            st.dataframe(change_df, use_container_width=True)
+            fname = f"spotify_changes_{sanitize_filename(d1)}_to_{sanitize_filename(d2)}.csv"
+            st.download_button("📥 Download Changes CSV", data=change_csv, file_name=fname, mime="text/csv")
+
+    st.markdown("---")
+    st.subheader("📈 Spotify Trends Across Many Snapshots")
+    st.write("Combine any number of snapshots into one time series with per-track deltas, growth rates and velocity.")
+    render_timeseries_section("spotify", "sp")
+
+    st.markdown("---")
+    st.subheader("🏆 Spotify Leaderboards")
+    st.write("Totals, changes and top movers by artist and album, from rollups updated as new snapshots arrive.")
+    render_leaderboard_section("spotify", "sp")
+
+# ---- Cross-platform tab ----
+def render_match_tab():
+    st.header("🔗 Cross-platform Matching")
+    st.info("Pairs YouTube videos with Spotify tracks by title, artist/channel and duration, so a song's views can be "
+            "read next to its Spotify popularity. Each video and each track is used in at most one pair.")
+    picked = select_match_inputs("mt")
+    min_score = st.slider("Minimum match score", min_value=0.3, max_value=1.0, value=MIN_SCORE, step=0.05,
+                          key="mt_min_score")
+    if not picked:
+        return
+    yt_df, yt_key, sp_df, sp_key = picked
+    missing = missing_columns(yt_df, sp_df)
+    if missing:
+        st.error(f"Missing column(s) needed for matching: {', '.join(missing)}")
+        return
+    with st.spinner("Matching…"):
+        table, stats, csv = match_memo(yt_key, sp_key, float(min_score), yt_df, sp_df)
+    st.write(f"{stats['matched']:,} pairs from {stats['videos']:,} videos and {stats['tracks']:,} tracks")
+    st.dataframe(table, use_container_width=True)
+    st.download_button("📥 Download Unified CSV", data=csv, file_name=timestamped_filename("cross_platform"),
+                       mime="text/csv", key="mt_download")
+
+# only the open tab runs: switching tabs reruns the script, and the other tabs' widgets are not built
+tab_yt, tab_sp, tab_mt = st.tabs(["YouTube", "Spotify", "Cross-platform"], key="service_tab", on_change="rerun")
+for tab, key, render_tab in ((tab_yt, "yt", render_youtube_tab), (tab_sp, "sp", render_spotify_tab),
+                             (tab_mt, "mt", render_match_tab)):
+    with tab:
+        if tab.open:
+            render_tab()
+        else:
+            keep_tab_state(key)
+
+with st.sidebar.expander("📡 API diagnostics"):
+    metrics = get_metrics()
+    snap = metrics.snapshot()
+    if snap["endpoints"]:
+        stats_table(snap["endpoints"])
+    else:
+        st.caption("No API calls yet.")
+    if snap["quota_units"].get("youtube"):
+        st.caption(f"YouTube quota units spent (estimated): {snap['quota_units']['youtube']:,}")
+    client = get_client(create=False)
+    if client is not None:
+        st.caption("HTTP client")
+        st.json(client.stats())
+    st.caption("Background jobs")
+    st.json(jobs.get_job_runner().stats())
+    st.download_button("📥 Metrics (JSON)", data=metrics.to_json(), file_name="api_metrics.json",
+                       mime="application/json", key="metrics_json")
+    st.download_button("📥 Metrics (Prometheus)", data=metrics.to_prometheus(), file_name="api_metrics.prom",
+                       mime="text/plain", key="metrics_prom")
+    if st.button("Reset metrics", key="metrics_reset"):
+        metrics.reset()
+
+with st.sidebar.expander("🔑 API keys"):
+    st.caption("Requests are spread over every key / client pair in the credential files. A key that runs out of "
+               "quota or is throttled (429) leaves the rotation until its quota resets or the cooldown ends.")
+    for service, pool in (("YouTube", youtube_pool), ("Spotify", spotify_pool)):
+        if pool:
+            st.caption(f"{service}: {pool.summary()}")
+            stats_table(pool.stats())
+
+with st.sidebar.expander("🗄️ Response cache"):
+    cache = get_response_cache()
+    st.caption(f"{len(cache.backend)} cached entries")
+    cache_stats = cache.stats()
+    if cache_stats:
+        stats_table(cache_stats)
+    else:
+        st.caption("No lookups yet.")
+    if st.button("Clear cache", key="cache_clear"):
+        cache.clear()
 
 st.markdown("---")
 st.info("Keep credential files out of version control (add to .gitignore): google_api_key.txt, spotify_credentials.txt")
@@ -0,0 +1,253 @@
+# mock_api.py
+# Local stand-in for the YouTube Data API and the Spotify Web API, for offline benchmarks.
+# Serves /youtube/v3/videos, /v1/search, /v1/tracks, /v1/audio-features, /v1/artists and
+# /api/token with deterministic fake data. /youtube/v3/channels, playlists and playlistItems
+# replay recorded responses from fixtures/youtube_sources.json (a channel with a 3-page uploads
+# playlist and a 2-page playlist), paged by their nextPageToken.
+# Latency, the share of 500 responses and the share of 429 responses (with Retry-After) are
+# configurable, so retry paths cost realistic time.
+# A per-key quota makes YouTube answer 403 quotaExceeded once a key has made that many requests.
+#
+# Standalone:  python benchmarks/mock_api.py --port 8765 --latency 0.05 --throttle-rate 0.02
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+YOUTUBE_SOURCES_PATH = os.path.join(FIXTURES_DIR, "youtube_sources.json")
+
+
+class MockConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=0.05, seed=0,
+                 key_quota=0):
+        self.latency = latency            # seconds added to every response
+        self.jitter = jitter              # extra uniform [0, jitter] seconds
+        self.error_rate = error_rate      # share of requests answered with 500
+        self.throttle_rate = throttle_rate  # share of requests answered with 429
+        self.retry_after = retry_after    # Retry-After sent with 429s (seconds)
+        self.key_quota = key_quota        # YouTube requests allowed per API key (0: unlimited)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def roll(self):
+        with self._lock:
+            return self._random.random()
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            return self.counts[key]
+
+
+def _num(seed: str, lo: int, hi: int) -> int:
+    # stable pseudo-random number per id, so repeated runs return the same data
+    return lo + int(hashlib.md5(seed.encode("utf-8")).hexdigest()[:8], 16) % (hi - lo + 1)
+
+
+def youtube_video(vid: str):
+    return {
+        "id": vid,
+        "snippet": {
+            "title": f"Video {vid}",
+            "publishedAt": "2021-03-04T05:06:07Z",
+            "channelTitle": f"Channel {_num(vid, 1, 50)}",
+            "tags": ["bench", "mock"],
+            "categoryId": "10",
+        },
+        "contentDetails": {"duration": f"PT{_num(vid, 1, 9)}M{_num(vid + 's', 0, 59)}S"},
+        "statistics": {
+            "viewCount": str(_num(vid, 1_000, 10_000_000)),
+            "likeCount": str(_num(vid + "l", 10, 100_000)),
+            "commentCount": str(_num(vid + "c", 0, 10_000)),
+        },
+    }
+
+
+def spotify_track(tid: str):
+    artist_id = f"artist{_num(tid, 1, 500)}"
+    return {
+        "id": tid,
+        "name": f"Track {tid}",
+        "popularity": _num(tid, 0, 100),
+        "duration_ms": _num(tid, 120_000, 360_000),
+        "artists": [{"id": artist_id, "name": f"Artist {artist_id}"}],
+        "album": {"name": f"Album {_num(tid, 1, 200)}", "release_date": "2020-01-01"},
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{tid}"},
+    }
+
+
+def spotify_features(tid: str):
+    return {"id": tid, "tempo": float(_num(tid, 60, 180)), "danceability": _num(tid, 0, 100) / 100,
+            "energy": _num(tid + "e", 0, 100) / 100}
+
+
+def spotify_artist(aid: str):
+    return {"id": aid, "name": f"Artist {aid}", "followers": {"total": _num(aid, 100, 5_000_000)}}
+
+
+def load_youtube_sources(path: str = YOUTUBE_SOURCES_PATH):
+    # {"channels": {lookup: {value: response}}, "playlists": {id: response}, "playlistItems": {id: [pages]}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def youtube_error(code: int, reason: str, message: str):
+    return {"error": {"code": code, "message": message, "errors": [{"reason": reason, "message": message}]}}
+
+
+def search_track_id(query: str) -> str:
+    return "s" + hashlib.md5(query.lower().encode("utf-8")).hexdigest()[:21]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    config = MockConfig()
+    sources = {"channels": {}, "playlists": {}, "playlistItems": {}}
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, obj, code=200, headers=None):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self, endpoint):
+        # returns True when the request was answered with an injected 429/500
+        cfg = self.config
+        cfg.count(endpoint)
+        if cfg.latency or cfg.jitter:
+            time.sleep(cfg.latency + (cfg.roll() * cfg.jitter if cfg.jitter else 0))
+        roll = cfg.roll()
+        if roll < cfg.throttle_rate:
+            cfg.count("429")
+            self._send({"error": {"status": 429, "message": "rate limited"}}, 429,
+                       {"Retry-After": str(cfg.retry_after)})
+            return True
+        if roll < cfg.throttle_rate + cfg.error_rate:
+            cfg.count("500")
+            self._send({"error": {"status": 500, "message": "injected error"}}, 500)
+            return True
+        return False
+
+    def _youtube_source(self, resource, q):
+        sources = self.sources
+        if resource == "channels":
+            for lookup in ("id", "forHandle", "forUsername"):
+                if lookup in q:
+                    found = sources["channels"].get(lookup, {}).get(q[lookup])
+                    return self._send(found or {"kind": "youtube#channelListResponse",
+                                                "pageInfo": {"totalResults": 0, "resultsPerPage": 5}})
+            return self._send(youtube_error(400, "missingRequiredParameter", "No filter selected."), 400)
+        if resource == "playlists":
+            found = sources["playlists"].get(q.get("id", ""))
+            return self._send(found or {"kind": "youtube#playlistListResponse",
+                                        "pageInfo": {"totalResults": 0, "resultsPerPage": 5}, "items": []})
+        if resource == "playlistItems":
+            pages = sources["playlistItems"].get(q.get("playlistId", ""))
+            if pages is None:
+                return self._send(youtube_error(404, "playlistNotFound", "Playlist not found."), 404)
+            # page n is requested with the nextPageToken of page n - 1
+            by_token = {None: pages[0]}
+            by_token.update((page["nextPageToken"], pages[i + 1]) for i, page in enumerate(pages[:-1]))
+            page = by_token.get(q.get("pageToken"))
+            if page is None:
+                return self._send(youtube_error(400, "invalidPageToken", "Invalid page token."), 400)
+            return self._send(page)
+        self._send({}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if urlsplit(self.path).path != "/api/token":
+            return self._send({}, 404)
+        if self._delay_or_fail("token"):
+            return
+        # one token per client id, so requests can be told apart per client
+        auth = self.headers.get("Authorization", "")
+        client_id = base64.b64decode(auth[6:]).decode("utf-8").split(":")[0] if auth.startswith("Basic ") else ""
+        self.config.count(f"client:{client_id}")
+        self._send({"access_token": f"mock-token-{client_id}", "token_type": "Bearer", "expires_in": 3600})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        ids = q["ids"].split(",") if q.get("ids") else []
+
+        if path.startswith("/youtube/v3/"):
+            resource = path[len("/youtube/v3/"):]
+            if self._delay_or_fail(f"youtube.{resource}"):
+                return
+            used = self.config.count(f"key:{q.get('key', '')}")
+            if self.config.key_quota and used > self.config.key_quota:
+                return self._send(youtube_error(403, "quotaExceeded", "quota exceeded"), 403)
+            if resource == "videos":
+                vids = [v for v in q.get("id", "").split(",") if v]
+                return self._send({"items": [youtube_video(v) for v in vids]})
+            return self._youtube_source(resource, q)
+
+        if not path.startswith("/v1/"):
+            return self._send({}, 404)
+        resource, _, single = path[len("/v1/"):].partition("/")
+        if self._delay_or_fail(f"spotify.{resource}"):
+            return
+        self.config.count(f"token:{self.headers.get('Authorization', '')[len('Bearer '):]}")
+        if resource == "search":
+            return self._send({"tracks": {"items": [spotify_track(search_track_id(q.get("q", "")))]}})
+        if resource == "tracks":
+            return self._send(spotify_track(single) if single else {"tracks": [spotify_track(i) for i in ids]})
+        if resource == "audio-features":
+            return self._send(spotify_features(single) if single
+                              else {"audio_features": [spotify_features(i) for i in ids]})
+        if resource == "artists":
+            return self._send(spotify_artist(single) if single else {"artists": [spotify_artist(i) for i in ids]})
+        self._send({}, 404)
+
+
+def start_server(config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+    # runs in a daemon thread; returns (server, base_url)
+    handler = type("ConfiguredMockHandler", (MockHandler,),
+                   {"config": config or MockConfig(), "sources": load_youtube_sources()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock YouTube/Spotify API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--key-quota", type=int, default=0, help="YouTube requests per API key before quotaExceeded")
+    args = parser.parse_args()
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after,
+                        key_quota=args.key_quota)
+    server, base = start_server(config, port=args.port)
+    print(f"Mock API listening on {base} (YouTube: {base}/youtube/v3, Spotify: {base}/v1, token: {base}/api/token)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+# run_benchmarks.py
+# Offline throughput benchmarks: starts benchmarks/mock_api.py in-process, points the API
+# helpers at it and times end-to-end batches, then times snapshot compares, rollup updates,
+# delta-log rebuilds and cross-platform matching on synthetic data.
+# No real quota is spent and no credentials are needed.
+#
+# Usage (from the repo root):
+#   python benchmarks/run_benchmarks.py
+#   python benchmarks/run_benchmarks.py --sizes 10,1000 --latency 0.05 --throttle-rate 0.02 --json bench.json
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import compare
+from collector import DeltaLog
+from credential_pool import POOL_LIMITS, CredentialPool
+import matching
+import rollups
+import spotify_api
+import spotify_auth
+import youtube_api
+from metrics import get_metrics
+from mock_api import MockConfig, load_youtube_sources, start_server
+from response_cache import get_response_cache
+from spotify_auth import get_token_cache
+
+SPOTIFY_TITLES_MODE = "Track Titles (search)"
+DELTA_LOG_MAX_ROWS = 200_000  # recording goes row by row, so larger snapshots skip the delta-log benchmark
+DELTA_LOG_DROPPED = 0.1       # share of items missing from the newest capture
+# a channel (by handle) and a playlist served from the recorded fixtures, plus one plain video
+YOUTUBE_SOURCES_KEY = "mock-key-sources"  # its own key: --key-quota may have used up the others by then
+YOUTUBE_SOURCE_LINES = ["https://www.youtube.com/@mockartist",
+                        "https://www.youtube.com/playlist?list=PLm0ckPl4ylistF1xtureAAAAAAAAAAAAA",
+                        "https://youtu.be/vid00000001"]
+
+
+def _point_at(base: str):
+    youtube_api.YOUTUBE_API_BASE = f"{base}/youtube/v3"
+    spotify_api.SPOTIFY_API_BASE = f"{base}/v1"
+    spotify_auth.TOKEN_URL = f"{base}/api/token"
+
+
+def _timed(name: str, size: int, fn):
+    # every run starts cold: empty response cache, fresh metrics
+    get_response_cache().clear()
+    metrics = get_metrics()
+    metrics.reset()
+    start = time.perf_counter()
+    error = None
+    try:
+        produced = fn()
+    except Exception as e:
+        # a failed check is reported with the other results instead of discarding them
+        produced, error = "failed", str(e)
+    seconds = time.perf_counter() - start
+    endpoints = metrics.snapshot()["endpoints"].values()
+    return {
+        "benchmark": name,
+        "error": error,
+        "items": size,
+        "produced": produced,
+        "seconds": round(seconds, 3),
+        "items_per_s": round(size / seconds, 1) if seconds and not error else None,
+        "requests": sum(ep["calls"] for ep in endpoints),
+        "retries": sum(ep["retries"] for ep in endpoints),
+        "errors": sum(ep["errors"] for ep in endpoints),
+    }
+
+
+def bench_youtube(size: int, api_key="mock-key"):
+    ids = [f"vid{i:08d}" for i in range(size)]
+    results, _ = youtube_api.fetch_youtube_videos(ids, api_key)
+    return len(results)
+
+
+def youtube_source_expectation():
+    # (video ids, quota units) that walking YOUTUBE_SOURCE_LINES must produce, read off the fixture pages:
+    # one channels/playlists call per source, one unit per playlistItems page, then videos.list per 50 ids
+    sources = load_youtube_sources()
+    pages = [p for playlist in sources["playlistItems"].values() for p in playlist]
+    ids = list(dict.fromkeys([item["contentDetails"]["videoId"] for p in pages for item in p["items"]] + ["vid00000001"]))
+    return ids, 2 + len(pages) + youtube_api.estimate_video_quota(len(ids))
+
+
+def bench_youtube_sources():
+    # resolves the channel and the playlist, follows nextPageToken through every page and fetches the
+    # videos; fails when the ids or the quota spent differ from youtube_source_expectation()
+    expected_ids, expected_units = youtube_source_expectation()
+    budget = youtube_api.QuotaBudget()
+    lines, _, errors = youtube_api.expand_youtube_sources(YOUTUBE_SOURCE_LINES, YOUTUBE_SOURCES_KEY, budget)
+    ids, _, _ = youtube_api.parse_youtube_lines(lines)
+    results, video_errors = youtube_api.fetch_youtube_videos(ids, YOUTUBE_SOURCES_KEY, budget)
+    errors += video_errors
+    if errors:
+        raise RuntimeError(f"channel/playlist walk failed: {'; '.join(errors)}")
+    if sorted(ids) != sorted(expected_ids) or budget.spent != expected_units:
+        raise RuntimeError(f"channel/playlist walk: {len(ids)} ids for {budget.spent} units, "
+                           f"expected {len(expected_ids)} ids for {expected_units} units")
+    return len(results)
+
+
+def bench_pools(keys: int):
+    # fresh pools of fake YouTube keys and Spotify client pairs, so every size starts with full quotas
+    youtube = CredentialPool("youtube", *POOL_LIMITS["youtube"])
+    youtube.configure([f"mock-key-{i:04d}-pooled" for i in range(keys)])
+    spotify = CredentialPool("spotify", *POOL_LIMITS["spotify"])
+    spotify.configure([(f"bench-client-{i:04d}", "bench-secret") for i in range(keys)])
+    return youtube, spotify
+
+
+def bench_spotify_batch(size: int, token, workers: int):
+    ids = [f"trk{i:019d}" for i in range(size)]
+    out = spotify_api.fetch_spotify_tracks_batch(ids, token, workers)
+    return sum(1 for row, err in out.values() if row)
+
+
+def bench_spotify_single(size: int, token: str):
+    # the one-track-at-a-time path (three requests per track)
+    ok = 0
+    for i in range(size):
+        row, _ = spotify_api.fetch_spotify_track_details(f"trk{i:019d}", token)
+        ok += row is not None
+    return ok
+
+
+def bench_spotify_search(size: int, token: str, workers: int):
+    lines = [f"Song number {i} - Artist {i % 97}" for i in range(size)]
+    rows = spotify_api.enrich_spotify_lines(lines, SPOTIFY_TITLES_MODE, token, workers)
+    return sum(1 for row, err, notes in rows if row)
+
+
+def synthetic_snapshot(service: str, rows: int, seed: int):
+    # shaped like the app's CSV exports; later seeds have grown counters and a shuffled order
+    rng = np.random.default_rng(seed)
+    idx = rng.permutation(rows)
+    growth = seed + 1
+    if service == "youtube":
+        vids = pd.Series(idx).map("v{:010d}".format)
+        return pd.DataFrame({
+            "Title": "Video " + vids,
+            "URL": "https://www.youtube.com/watch?v=" + vids,
+            "Video ID": vids,
+            "Channel Name": "Channel " + pd.Series(idx % max(1, rows // 50)).astype(str),
+            "Category Name": pd.Series(idx % 5).map(["Music", "Gaming", "Comedy", "Education", "News"].__getitem__),
+            "Views": idx * 10 + rng.integers(0, 1000, rows) * growth,
+            "Likes": idx + rng.integers(0, 100, rows) * growth,
+            "Comments": rng.integers(0, 50, rows) * growth,
+        })
+    tids = pd.Series(idx).map("t{:021d}".format)
+    return pd.DataFrame({
+        "Track Name": "Track " + tids,
+        "Track URL": "https://open.spotify.com/track/" + tids,
+        "Artists": "Artist " + pd.Series(idx % max(1, rows // 20)).astype(str),
+        "Album": "Album " + pd.Series(idx % max(1, rows // 10)).astype(str),
+        "Popularity": rng.integers(0, 100, rows),
+        "Artist Followers": idx * 3 + rng.integers(0, 1000, rows) * growth,
+    })
+
+
+def bench_pairwise(service: str, frames):
+    changes, _ = compare.pairwise_changes(service, frames[0][1], frames[1][1])
+    return len(changes)
+
+
+def localized_track_urls(frames):
+    # the newest Spotify snapshot with track links shared from a localized page (open.spotify.com/intl-de/...)
+    captured_at, df = frames[-1]
+    urls = df["Track URL"].str.replace("open.spotify.com/track/", "open.spotify.com/intl-de/track/", regex=False)
+    return frames[:-1] + [(captured_at, df.assign(**{"Track URL": urls}))]
+
+
+def bench_timeseries(service: str, frames):
+    # every synthetic snapshot has the same items, so any extra series means a track was keyed two ways
+    long = compare.add_changes(compare.build_timeseries(service, frames), compare.METRICS[service])
+    items = len(compare.summarize(long, service))
+    if items != len(frames[0][1]):
+        raise RuntimeError(f"{items} series for {len(frames[0][1])} items")
+    return items
+
+
+def bench_rollup_add(service: str, store, frames):
+    # the newest snapshot on top of a rolled-up history: costs its own rows, whatever the history length
+    captured_at, df = frames[-1]
+    return store.add(service, df, captured_at.to_pydatetime())[0]
+
+
+def record_delta_log(service: str, log, frames):
+    # every snapshot but the newest in full, then the newest without DELTA_LOG_DROPPED of its items
+    # (removed from the watch list, or failed to fetch); returns the newest capture's item count
+    for i, (captured_at, df) in enumerate(frames):
+        if i == len(frames) - 1:
+            df = df.iloc[:int(len(df) * (1 - DELTA_LOG_DROPPED))]
+        log.record(service, dict(zip(compare.item_keys(service, df).astype(str), df.to_dict("records"))),
+                   captured_at.to_pydatetime())
+    return len(df)
+
+
+def bench_delta_rebuild(service: str, log, captured_at, expected: int):
+    # the newest capture as a full snapshot; items that dropped out before it must not come back
+    rebuilt = log.rebuild(service, captured_at.to_pydatetime())
+    if len(rebuilt) != expected:
+        raise RuntimeError(f"rebuilt {len(rebuilt)} items, the capture had {expected}")
+    return len(rebuilt)
+
+
+def synthetic_catalogs(rows: int, seed: int = 0):
+    # a Spotify catalog and YouTube uploads of 80% of it ("Artist - Track (Official Video)",
+    # "ArtistVEVO" channels, durations a few seconds off, some misspelled), plus 20% unrelated videos
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ra", "te", "su", "no", "vi", "da", "re", "shi", "ba", "ne", "po", "lu", "ga"]
+    vocab = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(3, 4))) for _ in range(rows // 2 + 100)})
+    common = ["love", "you", "me", "the", "night", "heart", "remix", "i", "my", "a"]
+    artists = [" ".join(rng.choice(vocab).title() for _ in range(rng.randint(1, 2))) for _ in range(rows // 15 + 1)]
+    tracks = []
+    for _ in range(rows):
+        name = " ".join(rng.choice(common) if rng.random() < 0.3 else rng.choice(vocab)
+                        for _ in range(rng.randint(1, 4))).title()
+        tracks.append({"Track Name": name, "Artists": rng.choice(artists), "Duration (ms)": rng.randint(120, 360) * 1000})
+    videos = []
+    for track in rng.sample(tracks, rows):
+        if rng.random() < 0.2:
+            videos.append({"Title": " ".join(rng.choice(vocab) for _ in range(4)), "Channel Name": "Some Label",
+                           "Duration (s)": rng.randint(120, 360)})
+            continue
+        name = track["Track Name"]
+        if rng.random() < 0.1:
+            name = name[:-1]
+        title = rng.choice(["{a} - {t} (Official Video)", "{t}", "{a} - {t} [Lyrics]", "{t} | {a}"])
+        channel = rng.choice([track["Artists"].replace(" ", "") + "VEVO", track["Artists"] + " - Topic", "Some Label"])
+        videos.append({"Title": title.format(a=track["Artists"], t=name), "Channel Name": channel,
+                       "Duration (s)": track["Duration (ms)"] // 1000 + rng.randint(-2, 2)})
+    return pd.DataFrame(videos), pd.DataFrame(tracks)
+
+
+def bench_matching(catalogs):
+    return len(matching.match_catalogs(*catalogs))
+
+
+def print_table(results):
+    cols = ["benchmark", "items", "produced", "seconds", "items_per_s", "requests", "retries", "errors"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in cols))
+    for r in results:
+        if r["error"]:
+            print(f"\n{r['benchmark']} failed: {r['error']}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock API")
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma-separated batch sizes")
+    parser.add_argument("--single-max", type=int, default=1000,
+                        help="largest size for per-item request paths (single-track fetch, title search)")
+    parser.add_argument("--workers", type=int, default=spotify_api.SPOTIFY_MAX_WORKERS)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="Retry-After sent with 429s (s)")
+    parser.add_argument("--keys", type=int, default=3,
+                        help="credentials in the pooled runs (rate-limited per key; 0 skips them)")
+    parser.add_argument("--key-quota", type=int, default=0,
+                        help="YouTube requests the mock allows per key before quotaExceeded (0: unlimited)")
+    parser.add_argument("--merge-rows", default="100000,1000000", help="rows per snapshot for compare benchmarks")
+    parser.add_argument("--series-snapshots", type=int, default=10, help="snapshots in the time-series benchmark")
+    parser.add_argument("--match-rows", default="10000,50000", help="videos and tracks per catalog for matching")
+    parser.add_argument("--skip-api", action="store_true", help="skip the API benchmarks")
+    parser.add_argument("--skip-compare", action="store_true", help="skip the compare, rollup and matching benchmarks")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    merge_rows = [int(s) for s in args.merge_rows.split(",") if s.strip()]
+    match_rows = [int(s) for s in args.match_rows.split(",") if s.strip()]
+    results = []
+
+    if not args.skip_api:
+        config = MockConfig(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after,
+                            key_quota=args.key_quota)
+        server, base = start_server(config)
+        _point_at(base)
+        token = get_token_cache().get("bench-client", "bench-secret")
+        for size in sizes:
+            results.append(_timed("youtube.fetch_videos", size, lambda: bench_youtube(size)))
+            if args.keys:
+                youtube_pool, spotify_pool = bench_pools(args.keys)
+                results.append(_timed(f"youtube.fetch_videos_pool{args.keys}", size,
+                                      lambda: bench_youtube(size, youtube_pool)))
+            results.append(_timed("spotify.tracks_batch", size, lambda: bench_spotify_batch(size, token, args.workers)))
+            if args.keys:
+                results.append(_timed(f"spotify.tracks_batch_pool{args.keys}", size,
+                                      lambda: bench_spotify_batch(size, spotify_pool, args.workers)))
+            if size <= args.single_max:
+                results.append(_timed("spotify.track_details", size, lambda: bench_spotify_single(size, token)))
+                results.append(_timed("spotify.title_search", size,
+                                      lambda: bench_spotify_search(size, token, args.workers)))
+        results.append(_timed("youtube.channel_playlist_walk", len(youtube_source_expectation()[0]),
+                              bench_youtube_sources))
+        server.shutdown()
+
+    if not args.skip_compare:
+        for service in ("youtube", "spotify"):
+            for rows in merge_rows:
+                # data generation is kept out of the timings
+                start = pd.Timestamp("2024-01-01")
+                frames = [(start + pd.Timedelta(days=i), synthetic_snapshot(service, rows, i))
+                          for i in range(max(2, args.series_snapshots))]
+                results.append(_timed(f"{service}.pairwise_compare", rows, lambda: bench_pairwise(service, frames)))
+                series = localized_track_urls(frames) if service == "spotify" else frames
+                results.append(_timed(f"{service}.timeseries_x{len(frames)}", rows,
+                                      lambda: bench_timeseries(service, series)))
+                with tempfile.TemporaryDirectory() as tmp:
+                    store = rollups.RollupStore(os.path.join(tmp, "rollups.sqlite"))
+                    for captured_at, df in frames[:-1]:
+                        store.add(service, df, captured_at.to_pydatetime())
+                    results.append(_timed(f"{service}.rollup_add_after_{len(frames) - 1}", rows,
+                                          lambda: bench_rollup_add(service, store, frames)))
+                    store.close()
+                if rows <= DELTA_LOG_MAX_ROWS:
+                    with tempfile.TemporaryDirectory() as tmp:
+                        log = DeltaLog(os.path.join(tmp, "deltas.sqlite"))
+                        expected = record_delta_log(service, log, frames[:3])
+                        results.append(_timed(f"{service}.delta_rebuild", rows,
+                                              lambda: bench_delta_rebuild(service, log, frames[2][0], expected)))
+                        log.close()
+        for rows in match_rows:
+            catalogs = synthetic_catalogs(rows)
+            results.append(_timed("cross_platform.match", rows, lambda: bench_matching(catalogs)))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    return 1 if any(r["error"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# startup.py
+# Cold start and rerun timings for app.py. Each sample runs in a fresh interpreter: Streamlit itself
+# is imported first (the server has it loaded before any session connects), then the first script
+# run is timed (the app's own imports, credential loading and the first render), followed by reruns
+# of the default tab and of the other tab. Also reports which heavy dependencies the first run loaded.
+#
+# Usage (from the repo root):
+#   python benchmarks/startup.py
+#   python benchmarks/startup.py --repeat 10 --reruns 20 --json startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "requests")
+
+
+def child(reruns: int):
+    # one sample; prints a JSON line
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    def timed_reruns(tab):
+        out = []
+        for _ in range(reruns):
+            # AppTest does not send tab state back, so the selection is set before every run
+            at.session_state["service_tab"] = tab
+            start = time.perf_counter()
+            at.run()
+            out.append(time.perf_counter() - start)
+        return statistics.median(out)
+
+    result = {
+        "first_run": first,
+        "rerun_youtube": timed_reruns("YouTube"),
+        "rerun_spotify": timed_reruns("Spotify"),
+        "loaded": loaded,
+        "exceptions": len(at.exception),
+    }
+    print(json.dumps(result))
+
+
+def sample(reruns: int):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--reruns", str(reruns)],
+                         cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold start and rerun timings for app.py")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes to sample")
+    parser.add_argument("--reruns", type=int, default=10, help="reruns per tab in each process")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.reruns)
+        return 0
+
+    samples = [sample(args.reruns) for _ in range(args.repeat)]
+    results = {
+        key: round(statistics.median(s[key] for s in samples) * 1000, 1)
+        for key in ("first_run", "rerun_youtube", "rerun_spotify")
+    }
+    print(f"first run (cold):   {results['first_run']} ms")
+    print(f"rerun, YouTube tab: {results['rerun_youtube']} ms")
+    print(f"rerun, Spotify tab: {results['rerun_spotify']} ms")
+    print(f"loaded by the first run: {', '.join(samples[0]['loaded']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+    if any(s["exceptions"] for s in samples):
+        print("warning: the app raised exceptions during the benchmark")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results_ms": results, "samples": samples}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
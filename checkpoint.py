@@ -0,0 +1,86 @@
+# checkpoint.py
+# On-disk checkpoints for long batches: every finished row is appended to a CSV (same columns as
+# the downloaded snapshot) and its input key to a sidecar ".keys" file. Re-running the same input
+# list picks the checkpoint up again and only fetches the keys that are not in it yet.
+import csv
+import hashlib
+import os
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+def checkpoint_path(prefix: str, lines, directory: str = CHECKPOINT_DIR) -> str:
+    # the same input list always maps to the same checkpoint file
+    digest = hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"{prefix}_{digest}.csv")
+
+
+class CsvCheckpoint:
+    def __init__(self, path: str):
+        self.path = path
+        self.keys_path = path + ".keys"
+        self.rows, self.done = self._load()
+        self.resumed = len(self.rows)
+        self._columns = None
+        self._f = None
+        self._writer = None
+        self._keys_f = None
+
+    def _load(self):
+        if not os.path.exists(self.path) or not os.path.exists(self.keys_path):
+            return [], set()
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            keys = [l.rstrip("\n") for l in f if l.strip()]
+        with open(self.path, "r", newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        # keys are written after their row, so a crash in between leaves at most one extra row
+        n = min(len(keys), len(rows))
+        return rows[:n], set(keys[:n])
+
+    def _open(self, row):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.rows:
+            self._columns = list(self.rows[0].keys())
+            # rewrite the committed rows so a torn trailing row from a crash is dropped
+            with open(self.path, "w", newline="", encoding="utf-8") as f:
+                w = csv.DictWriter(f, fieldnames=self._columns, extrasaction="ignore")
+                w.writeheader()
+                w.writerows(self.rows)
+        else:
+            self._columns = list(row.keys())
+            with open(self.path, "w", newline="", encoding="utf-8") as f:
+                csv.DictWriter(f, fieldnames=self._columns).writeheader()
+            open(self.keys_path, "w", encoding="utf-8").close()
+        self._f = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._f, fieldnames=self._columns, extrasaction="ignore")
+        self._keys_f = open(self.keys_path, "a", encoding="utf-8")
+
+    def append(self, key: str, row: dict):
+        if self._writer is None:
+            self._open(row)
+        self._writer.writerow(row)
+        self._f.flush()
+        self._keys_f.write(f"{key}\n")
+        self._keys_f.flush()
+        self.rows.append(row)
+        self.done.add(key)
+
+    def close(self):
+        for f in (self._f, self._keys_f):
+            if f is not None:
+                f.close()
+        self._f = self._writer = self._keys_f = None
+
+    def discard(self):
+        # called once a batch has completed and its snapshot has been produced
+        self.close()
+        for p in (self.path, self.keys_path):
+            if os.path.exists(p):
+                os.remove(p)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
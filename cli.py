@@ -0,0 +1,332 @@
+# cli.py
+# Headless batch mode: runs the same YouTube/Spotify fetch pipeline as app.py without Streamlit.
+#
+#   python cli.py --out snapshots/ youtube urls.txt
+#   cat titles.txt | python cli.py --out snapshots/ spotify --mode titles
+#   python cli.py compare youtube old.csv new.csv   # out-of-core, for exports too large for memory
+#   python cli.py match youtube.csv spotify.csv     # pair videos with tracks into one table
+#   python cli.py leaderboard youtube --group channel   # top channels by views change, from the rollups
+#   python cli.py collect            # scheduled collector for collector/watchlist.json (Ctrl+C to stop)
+#   python cli.py collect --once     # capture the watch list once, e.g. from cron
+import argparse
+import csv
+import os
+import sys
+import time
+
+import response_cache
+from checkpoint import CHECKPOINT_DIR, CsvCheckpoint, checkpoint_path
+import schema
+from collector import (DELTA_LOG_PATH, POLL_SECONDS, SERVICES, WATCHLIST_PATH, Collector, DeltaLog,
+                       delta_log_exists)
+from credential_pool import get_credential_pool
+from credentials import (SPOTIFY_CREDENTIALS_PATH, YOUTUBE_KEY_PATH, load_spotify_credential_pairs,
+                         load_spotify_credentials, load_youtube_api_key, load_youtube_api_keys)
+from helpers import CHUNK_ROWS, timestamped_filename
+from ingest import read_input_file, split_lines, summarize_unparsed
+from matching import MIN_SCORE, missing_columns, unified_table
+from rollups import DIMENSIONS, RollupStore, collector_snapshots, store_snapshots
+from snapshot_store import STORE_ROOT, SnapshotStore
+from spotify_api import SPOTIFY_MAX_WORKERS, get_spotify_token, iter_spotify_rows, prepare_spotify_lines
+from youtube_api import (YOUTUBE_DAILY_QUOTA, QuotaBudget, expand_youtube_sources, iter_youtube_rows,
+                         parse_youtube_lines)
+
+SPOTIFY_MODES = {"urls": "Track URLs/URIs", "titles": "Track Titles (search)"}
+
+
+def read_lines(paths):
+    # reads every non-empty line from the given files (.csv: the url/title column), or from stdin
+    # when no file (or "-") is given
+    lines = []
+    for path in paths or ["-"]:
+        if path == "-":
+            lines.extend(split_lines(sys.stdin.read()))
+            continue
+        with open(path, "rb") as f:
+            file_lines, err = read_input_file(path, f.read())
+        if err:
+            warn(err)
+        lines.extend(file_lines)
+    return lines
+
+
+def write_snapshot(rows, out_dir: str, prefix: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, timestamped_filename(prefix))
+    columns = list(dict.fromkeys(k for row in rows for k in row))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def save_outputs(rows, args, service: str):
+    print(write_snapshot(rows, args.out, f"{service}_analysis"))
+    if args.store:
+        import pandas as pd
+        print(SnapshotStore(args.store_root).save(service, pd.DataFrame(rows)))
+
+
+def warn(msg: str):
+    print(f"warning: {msg}", file=sys.stderr)
+
+
+def report_pool(pool, service: str):
+    for label, stats in pool.stats().items():
+        warn(f"{service} {label}: " + ", ".join(f"{k} {v}" for k, v in stats.items()))
+
+
+def run_youtube(args) -> int:
+    try:
+        keys = load_youtube_api_keys(args.youtube_key)
+    except OSError as e:
+        print(f"error: could not read YouTube API key: {e}", file=sys.stderr)
+        return 2
+    if not keys:
+        print(f"error: YouTube API key missing in {args.youtube_key}", file=sys.stderr)
+        return 2
+    # every key in the file is rotated, and the default budget is one daily quota per key
+    pool = get_credential_pool("youtube")
+    pool.configure(keys)
+    budget = QuotaBudget(args.quota_budget or YOUTUBE_DAILY_QUOTA * len(keys))
+    lines, notes, errors = expand_youtube_sources(read_lines(args.inputs), pool, budget, args.max_videos)
+    for msg in notes + errors:
+        warn(msg)
+    ids, url_map, unparsed = parse_youtube_lines(lines)
+    if unparsed:
+        warn(summarize_unparsed(unparsed, "video id"))
+    if not ids:
+        print("error: no valid YouTube IDs parsed", file=sys.stderr)
+        return 1
+    with CsvCheckpoint(checkpoint_path("youtube", ids, args.checkpoint_dir)) as ckpt:
+        if ckpt.resumed:
+            warn(f"resuming from {ckpt.path}: {ckpt.resumed} videos already fetched")
+        for vid, row, msg in iter_youtube_rows(ids, url_map, pool, skip=ckpt.done, budget=budget):
+            if msg:
+                warn(msg)
+            else:
+                ckpt.append(vid, row)
+    warn(f"YouTube quota used: {budget.spent} of {budget.limit} units")
+    if len(keys) > 1:
+        report_pool(pool, "youtube")
+    if not ckpt.rows:
+        print("error: no valid video data found", file=sys.stderr)
+        return 1
+    save_outputs(ckpt.rows, args, "youtube")
+    ckpt.discard()
+    return 0
+
+
+def run_spotify(args) -> int:
+    try:
+        pairs = [pair for pair in load_spotify_credential_pairs(args.spotify_credentials) if all(pair)]
+    except OSError as e:
+        print(f"error: could not read Spotify credentials: {e}", file=sys.stderr)
+        return 2
+    if not pairs:
+        print(f"error: CLIENT_ID/CLIENT_SECRET missing in {args.spotify_credentials}", file=sys.stderr)
+        return 2
+    if not any(get_spotify_token(client_id, client_secret) for client_id, client_secret in pairs):
+        print("error: could not obtain Spotify access token", file=sys.stderr)
+        return 2
+    pool = get_credential_pool("spotify")
+    pool.configure(pairs)
+    input_mode = SPOTIFY_MODES[args.mode]
+    lines, unparsed, _ = prepare_spotify_lines(read_lines(args.inputs), input_mode)
+    if unparsed:
+        warn(summarize_unparsed(unparsed, "track id"))
+    with CsvCheckpoint(checkpoint_path("spotify", [input_mode] + lines, args.checkpoint_dir)) as ckpt:
+        if ckpt.resumed:
+            warn(f"resuming from {ckpt.path}: {ckpt.resumed} tracks already fetched")
+        for line, data, err, _ in iter_spotify_rows(lines, input_mode, pool, args.workers, skip=ckpt.done):
+            if err:
+                warn(err)
+            else:
+                ckpt.append(line, data)
+    if len(pairs) > 1:
+        report_pool(pool, "spotify")
+    if not ckpt.rows:
+        print("error: no valid track data found", file=sys.stderr)
+        return 1
+    save_outputs(ckpt.rows, args, "spotify")
+    ckpt.discard()
+    return 0
+
+
+def run_compare(args) -> int:
+    # compare.py loads pandas, so it is imported only by the subcommand that needs it
+    from compare import compare_csv_chunked
+    output = args.output or os.path.join(args.out, timestamped_filename(f"{args.kind}_changes"))
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    rows, _, err = compare_csv_chunked(args.kind, args.old, args.new, output, chunk_rows=args.chunk_rows)
+    if err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+    warn(f"{rows} matched rows")
+    print(output)
+    return 0
+
+
+def run_match(args) -> int:
+    import pandas as pd
+    from schema import apply_schema
+    try:
+        youtube_df = apply_schema("youtube", pd.read_csv(args.youtube))
+        spotify_df = apply_schema("spotify", pd.read_csv(args.spotify))
+    except (OSError, ValueError) as e:
+        print(f"error: could not read snapshot CSVs: {e}", file=sys.stderr)
+        return 2
+    missing = missing_columns(youtube_df, spotify_df)
+    if missing:
+        print(f"error: missing column(s): {', '.join(missing)}", file=sys.stderr)
+        return 1
+    table, stats = unified_table(youtube_df, spotify_df, args.min_score)
+    output = args.output or os.path.join(args.out, timestamped_filename("cross_platform"))
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    table.to_csv(output, index=False)
+    warn(f"{stats['matched']} pairs from {stats['videos']} videos and {stats['tracks']} tracks")
+    print(output)
+    return 0
+
+
+def run_leaderboard(args) -> int:
+    # rollups live next to their source; snapshots added since the last call are rolled up first
+    if args.source == "collector":
+        if not delta_log_exists(args.delta_log):
+            print(f"error: no collector delta log at {args.delta_log}", file=sys.stderr)
+            return 1
+        rollups = RollupStore(os.path.join(os.path.dirname(args.delta_log), "rollups.sqlite"))
+        snapshots = collector_snapshots(args.kind, DeltaLog(args.delta_log))
+    else:
+        rollups = RollupStore(os.path.join(args.store_root, "rollups.sqlite"))
+        snapshots = store_snapshots(args.kind, SnapshotStore(args.store_root))
+    group = args.group or next(iter(DIMENSIONS[args.kind]))
+    metric = args.metric or schema.METRICS[args.kind][0]
+    if group not in DIMENSIONS[args.kind] or metric not in schema.METRICS[args.kind]:
+        print(f"error: {args.kind} groups are {', '.join(DIMENSIONS[args.kind])} and metrics are "
+              f"{', '.join(schema.METRICS[args.kind])}", file=sys.stderr)
+        return 2
+    try:
+        added = rollups.sync(args.kind, snapshots)
+    except Exception as e:
+        print(f"error: could not roll up snapshots: {e}", file=sys.stderr)
+        return 1
+    if added:
+        warn(f"{added} snapshots rolled up")
+    if not rollups.captures(args.kind):
+        print(f"error: no {args.kind} snapshots in the {args.source}", file=sys.stderr)
+        return 1
+    print(rollups.leaderboard(args.kind, group, metric, by=args.by, n=args.top).to_string(index=False))
+    if args.movers:
+        for direction, title in (("up", "top gainers"), ("down", "top fallers")):
+            movers = rollups.movers(args.kind, metric, direction=direction, n=args.top)
+            print(f"\n{title}:")
+            print(movers.to_string(index=False) if not movers.empty else "none")
+    return 0
+
+
+def run_collect(args) -> int:
+    # credentials are optional here: a service without them just reports an error per capture
+    try:
+        api_key = load_youtube_api_key(args.youtube_key)
+    except OSError:
+        api_key = ""
+    try:
+        client_id, client_secret = load_spotify_credentials(args.spotify_credentials)
+    except OSError:
+        client_id, client_secret = "", ""
+    collector = Collector(DeltaLog(args.delta_log), args.watchlist)
+    collector.configure(api_key, client_id, client_secret)
+
+    def report(results):
+        for service, (items, changed, errors) in results.items():
+            for err in errors:
+                warn(f"{service}: {err}")
+            print(f"{service}: {items} items captured, {changed} changed values stored")
+
+    if args.once:
+        report({service: collector.capture(service) for service in SERVICES})
+        return 0
+    try:
+        while True:
+            report(collector.run_pending())
+            time.sleep(POLL_SECONDS)
+    except KeyboardInterrupt:
+        return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fetch YouTube/Spotify stats and write timestamped snapshot CSVs.")
+    parser.add_argument("--out", default=".", help="directory for snapshot files (default: current directory)")
+    parser.add_argument("--cache", default=None, help="SQLite response cache path (default: in-memory)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR,
+                        help="where in-flight batches are checkpointed; re-running the same input resumes from there")
+    parser.add_argument("--store", action="store_true", help="also save the run to the Parquet snapshot store (needs pyarrow)")
+    parser.add_argument("--store-root", default=STORE_ROOT, help="snapshot store directory")
+    sub = parser.add_subparsers(dest="service", required=True)
+
+    yt = sub.add_parser("youtube", help="analyze YouTube video, channel or playlist URLs")
+    yt.add_argument("inputs", nargs="*", help="files with one URL per line ('-' or none for stdin)")
+    yt.add_argument("--quota-budget", type=int, default=None,
+                    help=f"max YouTube quota units for this run (default: {YOUTUBE_DAILY_QUOTA} per API key)")
+    yt.add_argument("--max-videos", type=int, default=None, help="max videos taken from each channel/playlist url")
+    yt.add_argument("--youtube-key", default=YOUTUBE_KEY_PATH, help="path to the YouTube API key file (one key per line)")
+    yt.set_defaults(func=run_youtube)
+
+    sp = sub.add_parser("spotify", help="analyze Spotify track URLs/URIs or titles")
+    sp.add_argument("inputs", nargs="*", help="files with one item per line ('-' or none for stdin)")
+    sp.add_argument("--mode", choices=sorted(SPOTIFY_MODES), default="urls", help="input lines are track URLs/URIs or titles")
+    sp.add_argument("--workers", type=int, default=SPOTIFY_MAX_WORKERS, help="concurrent requests")
+    sp.add_argument("--spotify-credentials", default=SPOTIFY_CREDENTIALS_PATH,
+                    help="path to the Spotify credentials file (one or more CLIENT_ID/CLIENT_SECRET pairs)")
+    sp.set_defaults(func=run_spotify)
+
+    cmp_ = sub.add_parser("compare", help="compare two snapshot CSVs of any size (chunked, bounded memory)")
+    cmp_.add_argument("kind", choices=["youtube", "spotify"])
+    cmp_.add_argument("old", help="older snapshot CSV")
+    cmp_.add_argument("new", help="newer snapshot CSV")
+    cmp_.add_argument("--output", help="change CSV path (default: timestamped file in --out)")
+    cmp_.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows read per chunk")
+    cmp_.set_defaults(func=run_compare)
+
+    mt = sub.add_parser("match", help="pair YouTube videos with Spotify tracks (title, artist, duration) in one table")
+    mt.add_argument("youtube", help="YouTube snapshot CSV")
+    mt.add_argument("spotify", help="Spotify snapshot CSV")
+    mt.add_argument("--output", help="unified CSV path (default: timestamped file in --out)")
+    mt.add_argument("--min-score", type=float, default=MIN_SCORE, help="pairs scoring below this (0-1) are left out")
+    mt.set_defaults(func=run_match)
+
+    lb = sub.add_parser("leaderboard", help="rank channels/categories or artists/albums in the latest snapshot")
+    lb.add_argument("kind", choices=["youtube", "spotify"])
+    lb.add_argument("--group", help="youtube: channel or category; spotify: artist or album (default: the first)")
+    lb.add_argument("--metric", help="counter to rank by (default: Views / Popularity)")
+    lb.add_argument("--by", choices=["change", "total"], default="change", help="rank by change or by current total")
+    lb.add_argument("--top", type=int, default=10, help="rows to print")
+    lb.add_argument("--movers", action="store_true", help="also print the items that rose and fell most")
+    lb.add_argument("--source", choices=["store", "collector"], default="store",
+                    help="snapshot store (--store-root) or collector delta log (--delta-log)")
+    lb.add_argument("--delta-log", default=DELTA_LOG_PATH, help="SQLite delta log path")
+    lb.set_defaults(func=run_leaderboard)
+
+    co = sub.add_parser("collect", help="re-poll the collector watch list on its interval, storing only changed counters")
+    co.add_argument("--once", action="store_true", help="capture every service once and exit")
+    co.add_argument("--watchlist", default=WATCHLIST_PATH, help="watch list JSON (edit it in the app sidebar)")
+    co.add_argument("--delta-log", default=DELTA_LOG_PATH, help="SQLite delta log path")
+    co.add_argument("--youtube-key", default=YOUTUBE_KEY_PATH, help="path to the YouTube API key file")
+    co.add_argument("--spotify-credentials", default=SPOTIFY_CREDENTIALS_PATH, help="path to the Spotify credentials file")
+    co.set_defaults(func=run_collect)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.cache:
+        response_cache.configure_response_cache(args.cache)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
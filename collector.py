@@ -0,0 +1,303 @@
+# collector.py
+# Scheduled snapshot collector. A watch list of YouTube video and Spotify track URLs is re-polled
+# at a fixed interval through the regular batch fetchers, and each capture is written to a SQLite
+# delta log: a counter (views, likes, comments, popularity, followers) is only stored when it
+# differs from the item's previous value, so the log grows with activity, not with catalog
+# size x frequency. Which items each capture contained is kept as well, so any captured point in time
+# can be rebuilt as a full snapshot for the compare views, without items that dropped out before it.
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import schema
+from ingest import summarize_unparsed
+from spotify_api import fetch_spotify_tracks_batch, get_spotify_token, parse_spotify_lines
+from youtube_api import build_youtube_row, fetch_youtube_videos, first_url, parse_youtube_lines
+
+COLLECTOR_DIR = "collector"
+WATCHLIST_PATH = os.path.join(COLLECTOR_DIR, "watchlist.json")
+DELTA_LOG_PATH = os.path.join(COLLECTOR_DIR, "deltas.sqlite")
+DEFAULT_INTERVAL_MINUTES = 60
+# counters are served from the response cache for 15 minutes, so polling faster gains nothing
+MIN_INTERVAL_MINUTES = 15
+POLL_SECONDS = 30  # how often the background thread checks whether a capture is due
+SERVICES = ("youtube", "spotify")
+TRACKED_FIELDS = schema.METRICS
+
+
+def load_watchlist(path: str = WATCHLIST_PATH):
+    # {"youtube": [urls], "spotify": [urls], "interval_minutes": n}; a missing file is an empty list
+    watchlist = {"youtube": [], "spotify": [], "interval_minutes": DEFAULT_INTERVAL_MINUTES}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            watchlist.update(json.load(f))
+    return watchlist
+
+
+def save_watchlist(watchlist, path: str = WATCHLIST_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    watchlist = dict(watchlist, interval_minutes=max(MIN_INTERVAL_MINUTES, int(watchlist.get("interval_minutes")
+                                                                                 or DEFAULT_INTERVAL_MINUTES)))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(watchlist, f, indent=2)
+    return watchlist
+
+
+def delta_log_exists(path: str = DELTA_LOG_PATH) -> bool:
+    return os.path.exists(path)
+
+
+def _value(v):
+    # counters as float (or None), so 10 and 10.0 compare equal and NaN/<NA> become NULL
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(v) else v
+
+
+def _stamp(dt: datetime) -> str:
+    # fixed-width ISO text sorts chronologically in SQLite
+    return dt.isoformat(timespec="seconds")
+
+
+class DeltaLog:
+    def __init__(self, path: str = DELTA_LOG_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS captures ("
+            " service TEXT NOT NULL, captured_at TEXT NOT NULL, items INTEGER NOT NULL, changed INTEGER NOT NULL,"
+            " PRIMARY KEY (service, captured_at));"
+            # descriptive fields (title, channel, album, ...) as of the latest capture
+            "CREATE TABLE IF NOT EXISTS items ("
+            " service TEXT NOT NULL, item_id TEXT NOT NULL, row TEXT NOT NULL, PRIMARY KEY (service, item_id));"
+            "CREATE TABLE IF NOT EXISTS deltas ("
+            " service TEXT NOT NULL, item_id TEXT NOT NULL, field TEXT NOT NULL, captured_at TEXT NOT NULL, value REAL,"
+            " PRIMARY KEY (service, item_id, field, captured_at));"
+            # latest value per counter, so a capture is compared without scanning the log
+            "CREATE TABLE IF NOT EXISTS current ("
+            " service TEXT NOT NULL, item_id TEXT NOT NULL, field TEXT NOT NULL, value REAL,"
+            " PRIMARY KEY (service, item_id, field));"
+            # the items each capture returned; an item removed from the watch list or whose fetch failed
+            # is absent from that capture on, though its earlier deltas stay in the log
+            "CREATE TABLE IF NOT EXISTS capture_items ("
+            " service TEXT NOT NULL, captured_at TEXT NOT NULL, item_id TEXT NOT NULL,"
+            " PRIMARY KEY (service, captured_at, item_id)) WITHOUT ROWID;"
+        )
+        self._conn.commit()
+
+    def record(self, service: str, rows, captured_at: datetime = None):
+        # rows: {item_id: row dict}; returns the number of counter values written
+        captured_at = captured_at or datetime.now().replace(microsecond=0)
+        at = _stamp(captured_at)
+        fields = TRACKED_FIELDS[service]
+        changed = 0
+        with self._lock:
+            current = {(item_id, field): value for item_id, field, value in self._conn.execute(
+                "SELECT item_id, field, value FROM current WHERE service = ?", (service,))}
+            deltas = []
+            items = []
+            for item_id, row in rows.items():
+                meta = {k: v for k, v in row.items() if k not in fields}
+                items.append((service, item_id, json.dumps(meta, default=str)))
+                for field in fields:
+                    value = _value(row.get(field))
+                    key = (item_id, field)
+                    if key in current and current[key] == value:
+                        continue
+                    deltas.append((service, item_id, field, at, value))
+            changed = len(deltas)
+            self._conn.executemany("INSERT OR REPLACE INTO items (service, item_id, row) VALUES (?, ?, ?)", items)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO deltas (service, item_id, field, captured_at, value) VALUES (?, ?, ?, ?, ?)",
+                deltas)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO current (service, item_id, field, value) VALUES (?, ?, ?, ?)",
+                [(s, i, f, v) for s, i, f, _, v in deltas])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO captures (service, captured_at, items, changed) VALUES (?, ?, ?, ?)",
+                (service, at, len(rows), changed))
+            self._conn.execute("DELETE FROM capture_items WHERE service = ? AND captured_at = ?", (service, at))
+            self._conn.executemany("INSERT INTO capture_items (service, captured_at, item_id) VALUES (?, ?, ?)",
+                                   ((service, at, item_id) for item_id in rows))
+            self._conn.commit()
+        return changed
+
+    def captures(self, service: str):
+        # capture times, oldest first
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT captured_at FROM captures WHERE service = ? ORDER BY captured_at", (service,)).fetchall()
+        return [datetime.fromisoformat(r[0]) for r in rows]
+
+    def rebuild(self, service: str, at: datetime):
+        # full snapshot as of `at`: the items of the latest capture at or before it, each with the latest
+        # value of every counter recorded at or before it
+        import pandas as pd
+        stamp = _stamp(at)
+        with self._lock:
+            capture = self._conn.execute(
+                "SELECT captured_at, items FROM captures WHERE service = ? AND captured_at <= ?"
+                " ORDER BY captured_at DESC LIMIT 1", (service, stamp)).fetchone()
+            if capture is None:
+                return schema.to_frame(service, [])
+            members = {r[0] for r in self._conn.execute(
+                "SELECT item_id FROM capture_items WHERE service = ? AND captured_at = ?", (service, capture[0]))}
+            values = self._conn.execute(
+                "SELECT d.item_id, d.field, d.value FROM deltas d JOIN ("
+                " SELECT item_id, field, MAX(captured_at) AS last FROM deltas"
+                " WHERE service = ? AND captured_at <= ? GROUP BY item_id, field"
+                ") l ON d.item_id = l.item_id AND d.field = l.field AND d.captured_at = l.last"
+                " WHERE d.service = ?", (service, stamp, service)).fetchall()
+            meta = dict(self._conn.execute("SELECT item_id, row FROM items WHERE service = ?", (service,)).fetchall())
+        # logs written before capture_items existed have no members for their captures: keep every item
+        if members or not capture[1]:
+            values = [v for v in values if v[0] in members]
+        if not values:
+            return schema.to_frame(service, [])
+        counters = pd.DataFrame(values, columns=["item_id", "field", "value"]).pivot(
+            index="item_id", columns="field", values="value")
+        rows = []
+        for item_id, counts in counters.iterrows():
+            row = json.loads(meta.get(item_id, "{}"))
+            row.update(counts.to_dict())
+            row["Reporting Date"] = at
+            rows.append(row)
+        return schema.to_frame(service, rows)
+
+    def stats(self):
+        with self._lock:
+            out = {}
+            for service in SERVICES:
+                captures = self._conn.execute(
+                    "SELECT COUNT(*), MAX(captured_at) FROM captures WHERE service = ?", (service,)).fetchone()
+                items = self._conn.execute("SELECT COUNT(*) FROM items WHERE service = ?", (service,)).fetchone()[0]
+                deltas = self._conn.execute("SELECT COUNT(*) FROM deltas WHERE service = ?", (service,)).fetchone()[0]
+                out[service] = {"captures": captures[0], "last_capture": captures[1], "items": items, "deltas": deltas}
+        return out
+
+    def close(self):
+        self._conn.close()
+
+
+class Collector:
+    def __init__(self, log: DeltaLog = None, watchlist_path: str = WATCHLIST_PATH, clock=time.time):
+        self._log = log
+        self.watchlist_path = watchlist_path
+        self._clock = clock
+        self._youtube_api_key = ""
+        self._spotify_credentials = ("", "")
+        self._thread = None
+        self._stop = threading.Event()
+        self._capture_lock = threading.Lock()
+        self.last_errors = {}  # service -> [error messages] of its latest capture
+
+    @property
+    def log(self) -> DeltaLog:
+        # opened on first use, so loading the app does not create the collector directory
+        if self._log is None:
+            self._log = DeltaLog()
+        return self._log
+
+    def configure(self, youtube_api_key: str = "", spotify_client_id: str = "", spotify_client_secret: str = ""):
+        self._youtube_api_key = youtube_api_key
+        self._spotify_credentials = (spotify_client_id, spotify_client_secret)
+
+    def _fetch_youtube(self, lines):
+        # returns ({video_id: row}, errors)
+        ids, url_map, unparsed = parse_youtube_lines(lines)
+        errors = [summarize_unparsed(unparsed, "video id")] if unparsed else []
+        if not self._youtube_api_key:
+            return {}, errors + ["YouTube API key missing"]
+        items, fetch_errors = fetch_youtube_videos(ids, self._youtube_api_key)
+        errors += fetch_errors
+        rows = {vid: build_youtube_row(items[vid], first_url(url_map, vid)) for vid in ids if vid in items}
+        errors += [f"No data returned for video id: {vid}" for vid in ids if vid not in items]
+        return rows, errors
+
+    def _fetch_spotify(self, lines):
+        ids, url_map, unparsed = parse_spotify_lines(lines)
+        errors = [summarize_unparsed(unparsed, "track id")] if unparsed else []
+        token = get_spotify_token(*self._spotify_credentials) if all(self._spotify_credentials) else ""
+        if not token:
+            return {}, errors + ["Spotify credentials missing or rejected"]
+        rows = {}
+        for tid, (row, err) in fetch_spotify_tracks_batch(ids, token).items():
+            if err:
+                errors.append(f"{url_map[tid][0]}: {err}")
+            else:
+                rows[tid] = row
+        return rows, errors
+
+    def capture(self, service: str, captured_at: datetime = None):
+        # polls the watch list for one service now; returns (items captured, values written, errors)
+        lines = [l.strip() for l in load_watchlist(self.watchlist_path).get(service, []) if l.strip()]
+        if not lines:
+            return 0, 0, []
+        with self._capture_lock:
+            rows, errors = (self._fetch_youtube if service == "youtube" else self._fetch_spotify)(lines)
+            changed = self.log.record(service, rows, captured_at) if rows else 0
+        self.last_errors[service] = errors
+        return len(rows), changed, errors
+
+    def due(self):
+        # services with a non-empty watch list whose last capture is older than the interval
+        watchlist = load_watchlist(self.watchlist_path)
+        interval = max(MIN_INTERVAL_MINUTES, int(watchlist.get("interval_minutes") or DEFAULT_INTERVAL_MINUTES)) * 60
+        now = self._clock()
+        out = []
+        for service in SERVICES:
+            if not watchlist.get(service):
+                continue
+            captures = self.log.captures(service)
+            if not captures or now - captures[-1].timestamp() >= interval:
+                out.append(service)
+        return out
+
+    def run_pending(self):
+        return {service: self.capture(service) for service in self.due()}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="collector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                self.last_errors["collector"] = [str(e)]
+            self._stop.wait(POLL_SECONDS)
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def get_collector() -> Collector:
+    # process-wide collector: one schedule no matter how many sessions are open
+    global _collector
+    if _collector is None:
+        with _collector_lock:
+            if _collector is None:
+                _collector = Collector()
+    return _collector
@@ -0,0 +1,264 @@
+# compare.py
+# N-way snapshot comparison: all snapshots are stacked into one long frame (item × capture time)
+# and deltas, growth rates and velocities are computed in a single vectorized pass per metric,
+# instead of merging snapshots pairwise. Pairwise compares of CSV exports too large for memory go
+# through compare_csv_chunked, a hash-partitioned join over temporary files.
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from helpers import CHUNK_ROWS
+from schema import METRICS
+from spotify_api import SPOTIFY_TRACK_URL_RE
+
+ITEM_KEY = "Item ID"
+TIME_COL = "Captured At"
+
+LABEL_COLUMNS = {
+    "youtube": "Title",
+    "spotify": "Track Name",
+}
+
+def item_keys(service: str, df):
+    # Video ID for YouTube (URL as fallback), track id parsed from Track URL for Spotify
+    if service == "youtube":
+        if "Video ID" in df.columns:
+            return df["Video ID"].astype("string")
+        return df["URL"].astype("string")
+    if "Track URL" in df.columns:
+        # the same pattern the fetchers parse input with, so intl-xx/ and embed/ urls key the same track
+        ids = df["Track URL"].astype("string").str.extract(SPOTIFY_TRACK_URL_RE, expand=False)
+        return ids.fillna(df["Track URL"].astype("string"))
+    return df["Track Name"].astype("string")
+
+
+def build_timeseries(service: str, snapshots):
+    # snapshots: iterable of (captured_at, DataFrame); returns the long frame
+    # [Item ID, Captured At, <label>, <metrics...>] sorted by item then time
+    metrics = METRICS[service]
+    label = LABEL_COLUMNS[service]
+    parts = []
+    for captured_at, df in snapshots:
+        part = pd.DataFrame({ITEM_KEY: item_keys(service, df)})
+        part[TIME_COL] = pd.Timestamp(captured_at)
+        part[label] = df[label] if label in df.columns else pd.NA
+        for m in metrics:
+            part[m] = pd.to_numeric(df[m], errors="coerce") if m in df.columns else float("nan")
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=[ITEM_KEY, TIME_COL, label] + metrics)
+    long = pd.concat(parts, ignore_index=True)
+    long = long.dropna(subset=[ITEM_KEY])
+    # categorical keys make the sort and every groupby below work on integer codes
+    long[ITEM_KEY] = long[ITEM_KEY].astype("category")
+    # one observation per item per snapshot (duplicate input lines resolve to the same item)
+    long = long.drop_duplicates(subset=[ITEM_KEY, TIME_COL], keep="last")
+    return long.sort_values([ITEM_KEY, TIME_COL], kind="stable").reset_index(drop=True)
+
+
+def add_changes(long, metrics, window: int = 7):
+    # adds per-item <m> Change, <m> Growth (fraction of previous value), <m> Velocity (change per day
+    # since the previous snapshot) and <m> Rolling Velocity (per day over the last `window` snapshots)
+    out = long.copy()
+    grouped = out.groupby(ITEM_KEY, sort=False, observed=True)
+    elapsed = grouped[TIME_COL].diff().dt.total_seconds() / 86400
+    window_elapsed = (out[TIME_COL] - grouped[TIME_COL].shift(window)).dt.total_seconds() / 86400
+    for m in metrics:
+        prev = grouped[m].shift(1)
+        delta = out[m] - prev
+        out[f"{m} Change"] = delta
+        out[f"{m} Growth"] = delta / prev.where(prev != 0)
+        out[f"{m} Velocity"] = delta / elapsed.where(elapsed > 0)
+        # rolling velocity from the window endpoints, so no per-group rolling objects are built
+        window_delta = out[m] - grouped[m].shift(window)
+        first_delta = out[m] - grouped[m].transform("first")
+        first_elapsed = (out[TIME_COL] - grouped[TIME_COL].transform("first")).dt.total_seconds() / 86400
+        span_delta = window_delta.fillna(first_delta)
+        span_elapsed = window_elapsed.fillna(first_elapsed)
+        out[f"{m} Rolling Velocity"] = span_delta / span_elapsed.where(span_elapsed > 0)
+    return out
+
+
+def to_wide(long, metric: str):
+    # item × snapshot matrix for one metric
+    return long.pivot(index=ITEM_KEY, columns=TIME_COL, values=metric)
+
+
+def summarize(long, service: str):
+    # one row per item: first/last value, total change and growth, latest rolling velocity
+    metrics = METRICS[service]
+    label = LABEL_COLUMNS[service]
+    grouped = long.groupby(ITEM_KEY, sort=False, observed=True)
+    summary = pd.DataFrame({
+        label: grouped[label].last(),
+        "Snapshots": grouped[TIME_COL].count(),
+        "First Seen": grouped[TIME_COL].first(),
+        "Last Seen": grouped[TIME_COL].last(),
+    })
+    for m in metrics:
+        first = grouped[m].first()
+        last = grouped[m].last()
+        summary[f"{m} First"] = first
+        summary[f"{m} Last"] = last
+        summary[f"{m} Total Change"] = last - first
+        summary[f"{m} Total Growth"] = (last - first) / first.where(first != 0)
+        if f"{m} Rolling Velocity" in long.columns:
+            summary[f"{m} Velocity (per day)"] = grouped[f"{m} Rolling Velocity"].last()
+    return summary.reset_index()
+
+
+# -----------------------
+# Pairwise comparison (the two-snapshot compare sections)
+# -----------------------
+def _numeric_changes(merged, metrics):
+    for col in metrics:
+        oldc = f"{col}_old"
+        newc = f"{col}_new"
+        if oldc in merged.columns and newc in merged.columns:
+            merged[oldc] = pd.to_numeric(merged[oldc], errors="coerce").fillna(0)
+            merged[newc] = pd.to_numeric(merged[newc], errors="coerce").fillna(0)
+            merged[f"{col} Change"] = merged[newc] - merged[oldc]
+    return merged
+
+
+def youtube_changes(df1, df2):
+    # returns (change DataFrame, error message)
+    if "URL" not in df1.columns or "URL" not in df2.columns:
+        return None, "Both CSVs must contain 'URL' column to compare."
+    merged = _numeric_changes(pd.merge(df1, df2, on="URL", suffixes=("_old", "_new")), METRICS["youtube"])
+    display_cols = [c for c in [
+        "Title_old", "URL",
+        "Views_old", "Views_new", "Views Change",
+        "Likes_old", "Likes_new", "Likes Change",
+        "Comments_old", "Comments_new", "Comments Change"
+    ] if c in merged.columns]
+    return merged[display_cols].rename(columns={"Title_old": "Title"}), None
+
+
+def spotify_changes(df1, df2):
+    # returns (change DataFrame, error message); prefers Track URL, falls back to Track Name
+    if "Track URL" in df1.columns and "Track URL" in df2.columns:
+        merge_key = "Track URL"
+    elif "Track Name" in df1.columns and "Track Name" in df2.columns:
+        merge_key = "Track Name"
+    else:
+        return None, "CSV files must contain 'Track URL' or 'Track Name' columns to compare."
+    merged = _numeric_changes(pd.merge(df1, df2, on=merge_key, suffixes=("_old", "_new")), METRICS["spotify"])
+    display_cols = []
+    if "Track Name_old" in merged.columns:
+        display_cols.append("Track Name_old")
+    display_cols.append(merge_key)
+    for col in METRICS["spotify"]:
+        for c in (f"{col}_old", f"{col}_new", f"{col} Change"):
+            if c in merged.columns:
+                display_cols.append(c)
+    display_cols = [c for c in display_cols if c in merged.columns]
+    return merged[display_cols].rename(columns={"Track Name_old": "Track Name"}), None
+
+
+def pairwise_changes(service: str, df1, df2):
+    if service == "youtube":
+        return youtube_changes(df1, df2)
+    return spotify_changes(df1, df2)
+
+
+# -----------------------
+# Out-of-core pairwise comparison for very large CSV exports
+# -----------------------
+BUCKET_BYTES = 64 * 1024 * 1024      # target input bytes per partition; bounds peak memory
+PREVIEW_ROWS = 1_000
+
+
+def compare_key(service: str, columns):
+    # the join column pairwise_changes would use, or None
+    if service == "youtube":
+        return "URL" if "URL" in columns else None
+    for key in ("Track URL", "Track Name"):
+        if key in columns:
+            return key
+    return None
+
+
+def _csv_columns(src):
+    columns = list(pd.read_csv(src, nrows=0).columns)
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return columns
+
+
+def _source_size(src) -> int:
+    if hasattr(src, "seek"):
+        size = src.seek(0, os.SEEK_END)
+        src.seek(0)
+        return size
+    return os.path.getsize(src)
+
+
+def _partition(src, service: str, key: str, label: str, buckets: int, prefix: str, chunk_rows: int):
+    # streams one CSV into `buckets` files by key hash, keeping only the key, label and metric columns
+    columns = _csv_columns(src)
+    metrics = [m for m in METRICS[service] if m in columns]
+    usecols = [key] + ([label] if label in columns and label != key else []) + metrics
+    dtypes = {c: "string" for c in usecols}  # metrics are coerced per chunk ("Not available" in old exports)
+    written = set()
+    for chunk in pd.read_csv(src, usecols=usecols, dtype=dtypes, chunksize=chunk_rows):
+        chunk = chunk.dropna(subset=[key])
+        for m in metrics:
+            chunk[m] = pd.to_numeric(chunk[m], errors="coerce")
+        bucket_of = pd.util.hash_pandas_object(chunk[key], index=False).to_numpy() % buckets
+        for b, part in chunk.groupby(bucket_of, sort=False):
+            path = f"{prefix}_{b}.csv"
+            part.to_csv(path, mode="a", header=b not in written, index=False)
+            written.add(b)
+    return usecols
+
+
+def compare_csv_chunked(service: str, old, new, out, chunk_rows: int = CHUNK_ROWS, buckets: int = None,
+                        tmp_dir: str = None):
+    # pairwise_changes for CSVs of any size. old/new are paths or binary file objects; the change
+    # CSV is streamed to `out` (path or text file object). Both inputs are hash-partitioned on the join
+    # key into temporary files and each partition pair is joined on its own, so memory is bounded
+    # by one partition. returns (rows written, preview DataFrame, error)
+    key = compare_key(service, _csv_columns(old))
+    if key is None or key != compare_key(service, _csv_columns(new)):
+        if service == "youtube":
+            return 0, None, "Both CSVs must contain 'URL' column to compare."
+        return 0, None, "CSV files must contain 'Track URL' or 'Track Name' columns to compare."
+    if buckets is None:
+        total = _source_size(old) + _source_size(new)
+        buckets = max(1, -(-total // BUCKET_BYTES))
+    label = LABEL_COLUMNS[service]
+    work = tempfile.mkdtemp(prefix="compare_", dir=tmp_dir)
+    own = isinstance(out, str)
+    f = open(out, "w", newline="", encoding="utf-8") if own else out
+    rows = 0
+    preview = []
+    try:
+        cols_old = _partition(old, service, key, label, buckets, os.path.join(work, "old"), chunk_rows)
+        cols_new = _partition(new, service, key, label, buckets, os.path.join(work, "new"), chunk_rows)
+        dtypes = {key: "string", label: "string"}
+        header = True
+        for b in range(buckets):
+            paths = (os.path.join(work, f"old_{b}.csv"), os.path.join(work, f"new_{b}.csv"))
+            if not all(os.path.exists(p) for p in paths):
+                continue  # no key of this partition is in both files
+            df_old = pd.read_csv(paths[0], dtype={c: t for c, t in dtypes.items() if c in cols_old})
+            df_new = pd.read_csv(paths[1], dtype={c: t for c, t in dtypes.items() if c in cols_new})
+            changes, err = pairwise_changes(service, df_old, df_new)
+            if err:
+                return rows, None, err
+            if changes.empty:
+                continue
+            changes.to_csv(f, header=header, index=False)
+            header = False
+            rows += len(changes)
+            if sum(len(p) for p in preview) < PREVIEW_ROWS:
+                preview.append(changes.head(PREVIEW_ROWS))
+    finally:
+        if own:
+            f.close()
+        shutil.rmtree(work, ignore_errors=True)
+    preview_df = pd.concat(preview, ignore_index=True).head(PREVIEW_ROWS) if preview else None
+    return rows, preview_df, None
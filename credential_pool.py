@@ -0,0 +1,170 @@
+# credential_pool.py
+# Several YouTube API keys or Spotify client-credential pairs used as one. Each credential has its own
+# token bucket (requests per second, with a burst), and each request goes to the least-used credential
+# that has a token, so a batch spreads over all of them. A key whose daily quota is exhausted
+# (quotaExceeded) leaves the rotation until the quota resets; a throttled (429) or rejected credential
+# leaves it for a cooldown. Per-credential usage is kept for the sidebar and the CLI.
+# A pool can be passed wherever the API helpers take an api_key / token.
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from http_client import MAX_RETRIES, RETRY_STATUSES
+
+# a throttled credential is switched out rather than waited on
+POOLED_RETRY_STATUSES = RETRY_STATUSES - {429}
+YOUTUBE_KEY_RATE = 10.0     # requests per second per key
+YOUTUBE_KEY_BURST = 20
+SPOTIFY_CLIENT_RATE = 20.0  # requests per second per client id
+SPOTIFY_CLIENT_BURST = 40
+POOL_LIMITS = {"youtube": (YOUTUBE_KEY_RATE, YOUTUBE_KEY_BURST), "spotify": (SPOTIFY_CLIENT_RATE, SPOTIFY_CLIENT_BURST)}
+THROTTLE_COOLDOWN = 30.0    # seconds out of rotation after a 429 without Retry-After
+REJECTED_COOLDOWN = 600.0   # seconds out of rotation for a key or client pair the API refused
+MAX_WAIT = 30.0             # longest a request waits for a credential to come back
+QUOTA_RESET_TZ = "America/Los_Angeles"  # YouTube daily quotas reset at midnight Pacific time
+
+
+def seconds_until_quota_reset(now: datetime = None) -> float:
+    try:
+        from zoneinfo import ZoneInfo
+        tz = ZoneInfo(QUOTA_RESET_TZ)
+    except Exception:
+        tz = timezone(timedelta(hours=-8))  # no tz database: Pacific standard time
+    now = (now or datetime.now(timezone.utc)).astimezone(tz)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+def mask(value: str) -> str:
+    # "AIzaSyA...x9k2" -> "AIza…x9k2", so keys can be told apart on screen without showing them
+    return f"{value[:4]}…{value[-4:]}" if len(value) > 12 else f"{value[:2]}…"
+
+
+class TokenBucket:
+    # not locked itself: CredentialPool holds its lock around every call
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self.updated = clock()
+
+    def wait_time(self, n: float = 1) -> float:
+        # seconds until n tokens are available (0 if they are now)
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n: float = 1):
+        self.tokens -= n
+
+
+class PooledCredential:
+    def __init__(self, value, label: str, rate: float, burst: float, clock=time.monotonic):
+        self.value = value  # a YouTube key, or a Spotify (client_id, client_secret) pair
+        self.label = label
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.requests = 0
+        self.units = 0
+        self.throttled = 0
+        self.out_until = 0.0
+        self.out_reason = ""
+
+
+class CredentialPool:
+    def __init__(self, service: str, rate: float, burst: float, clock=time.monotonic, sleep=time.sleep):
+        self.service = service
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._credentials = []
+
+    def configure(self, credentials):
+        # credentials: keys or (client_id, client_secret) pairs; ones already in the pool keep their
+        # usage and rotation state, so re-reading the credential files does not reset them
+        with self._lock:
+            known = {c.value: c for c in self._credentials}
+            values = [v for v in dict.fromkeys(credentials) if v and all(v)]
+            self._credentials = [
+                known.get(value) or PooledCredential(
+                    value, f"#{i} {mask(value[0] if isinstance(value, tuple) else value)}", self.rate, self.burst,
+                    self._clock)
+                for i, value in enumerate(values, start=1)]
+
+    def __len__(self):
+        return len(self._credentials)
+
+    def acquire(self, units: int = 1, max_wait: float = MAX_WAIT):
+        # the least-used credential in rotation with a token available, waiting for one if needed;
+        # None when every credential stays unavailable for longer than max_wait
+        deadline = self._clock() + max_wait
+        while True:
+            with self._lock:
+                now = self._clock()
+                best, wait = None, None
+                for cred in self._credentials:
+                    if cred.out_until > now:
+                        ready = cred.out_until - now
+                    else:
+                        ready = cred.bucket.wait_time()
+                        if ready == 0 and (best is None or cred.units < best.units):
+                            best = cred
+                    wait = ready if wait is None else min(wait, ready)
+                if best is not None:
+                    best.bucket.take()
+                    best.requests += 1
+                    best.units += units
+                    return best
+            if wait is None or now + wait > deadline:
+                return None
+            self._sleep(wait)
+
+    def take_out(self, cred: PooledCredential, reason: str, seconds: float):
+        with self._lock:
+            cred.out_until = max(cred.out_until, self._clock() + seconds)
+            cred.out_reason = reason
+
+    def throttled(self, cred: PooledCredential, retry_after: float = None):
+        with self._lock:
+            cred.throttled += 1
+        self.take_out(cred, "throttled (429)", THROTTLE_COOLDOWN if retry_after is None else retry_after)
+
+    def attempts(self) -> int:
+        # requests one call may try before giving up: every credential, plus the usual retries
+        return len(self._credentials) + MAX_RETRIES
+
+    def in_rotation(self) -> int:
+        with self._lock:
+            now = self._clock()
+            return sum(1 for c in self._credentials if c.out_until <= now)
+
+    def summary(self) -> str:
+        return f"{self.in_rotation()} of {len(self._credentials)} in rotation"
+
+    def stats(self):
+        # {label: {...}} for the sidebar and the CLI
+        with self._lock:
+            now = self._clock()
+            out = {}
+            for c in self._credentials:
+                out[c.label] = {"requests": c.requests, "throttled": c.throttled,
+                                "status": "in rotation" if c.out_until <= now else
+                                f"{c.out_reason}, back in {int(c.out_until - now) + 1}s"}
+                if self.service == "youtube":
+                    out[c.label]["quota_units"] = c.units
+            return out
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_credential_pool(service: str) -> CredentialPool:
+    # one pool per service per process, shared by every session and worker thread
+    with _pools_lock:
+        if service not in _pools:
+            _pools[service] = CredentialPool(service, *POOL_LIMITS[service])
+        return _pools[service]
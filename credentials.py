@@ -0,0 +1,45 @@
+# credentials.py
+# Credential file loaders shared by the Streamlit app and the CLI.
+# All raise OSError when the file is missing or unreadable; callers decide how to report it.
+# Either file may hold several credentials, which credential_pool.py rotates through.
+YOUTUBE_KEY_PATH = "secrets/google_api_key.txt"
+SPOTIFY_CREDENTIALS_PATH = "secrets/spotify_credentials.txt"
+
+
+def load_youtube_api_keys(path: str = YOUTUBE_KEY_PATH):
+    # one key per line; blank lines and # comments are skipped, repeated keys kept once
+    with open(path, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")))
+
+
+def load_youtube_api_key(path: str = YOUTUBE_KEY_PATH) -> str:
+    # first key of the file
+    keys = load_youtube_api_keys(path)
+    return keys[0] if keys else ""
+
+
+def load_spotify_credential_pairs(path: str = SPOTIFY_CREDENTIALS_PATH):
+    # CLIENT_ID=... / CLIENT_SECRET=... lines; a repeated name starts the next pair.
+    # returns [(client_id, client_secret)] in file order (either part may be "")
+    pairs = []
+    current = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if "=" in line:
+                k, v = line.strip().split("=", 1)
+                k = k.strip().upper()
+                if k not in ("CLIENT_ID", "CLIENT_SECRET"):
+                    continue
+                if k in current:
+                    pairs.append(current)
+                    current = {}
+                current[k] = v.strip()
+    if current:
+        pairs.append(current)
+    return [(p.get("CLIENT_ID", ""), p.get("CLIENT_SECRET", "")) for p in pairs]
+
+
+def load_spotify_credentials(path: str = SPOTIFY_CREDENTIALS_PATH):
+    # Spotify credentials (CLIENT_ID=..., CLIENT_SECRET=...); returns the first (client_id, client_secret)
+    pairs = load_spotify_credential_pairs(path)
+    return pairs[0] if pairs else ("", "")
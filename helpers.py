@@ -0,0 +1,39 @@
+# helpers.py
+# Small filename/list helpers shared by the Streamlit app and the CLI (no Streamlit imports).
+from datetime import datetime
+
+CHUNK_ROWS = 200_000  # rows per pd.read_csv chunk in out-of-core compares; here so the CLI can default to it without pandas
+
+
+def now_ts():
+    return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+
+def batch_timestamp():
+    # one "Reporting Date" shared by every row of a run
+    return datetime.now().replace(microsecond=0)
+
+
+def timestamped_filename(prefix):
+    return f"{prefix}_{now_ts()}.csv"
+
+
+def sanitize_filename(s: str) -> str:
+    return s.replace(" ", "_").replace(":", "-")
+
+
+def extract_datetime_from_filename(filename: str) -> str:
+    name = filename
+    if name.lower().endswith(".csv"):
+        name = name[:-4]
+    parts = name.split("_")
+    if len(parts) >= 3:
+        date_part = parts[-2]
+        time_part = parts[-1]
+        return f"{date_part} {time_part.replace('-', ':')}"
+    return "Unknown Date"
+
+
+def chunkify(lst, n):
+    for i in range(0, len(lst), n):
+        yield lst[i:i+n]
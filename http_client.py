@@ -0,0 +1,155 @@
+# http_client.py
+# Shared, pooled HTTP client used by the YouTube and Spotify helpers.
+# One requests.Session keeps connections alive across calls; 429/5xx responses and
+# connection errors are retried with exponential backoff + jitter, honouring Retry-After.
+# Every logical request (retries included) is reported to metrics.py under an endpoint label.
+# requests is imported when the first client is built, not when the API helpers are imported.
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from metrics import get_metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5   # seconds, doubled per attempt
+BACKOFF_CAP = 30.0   # upper bound for any single wait, including Retry-After
+POOL_SIZE = 32       # connections kept alive per host
+
+
+def parse_retry_after(value):
+    # Retry-After is either delta-seconds or an HTTP-date; returns seconds or None
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HttpClient:
+    def __init__(self, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP,
+                 pool_size=POOL_SIZE, sleep=time.sleep, metrics=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.metrics = metrics or get_metrics()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._sleep = sleep
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # per-thread retry count of the request in flight
+        self._counters = {"requests": 0, "retries": 0, "throttled": 0, "server_errors": 0, "connection_errors": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def backoff(self, attempt: int) -> float:
+        # "full jitter": uniform wait in [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, endpoint: str = None, retry_statuses=RETRY_STATUSES, **kwargs):
+        # endpoint is the metrics label ("youtube.videos", "spotify.tracks", ...); defaults to the host.
+        # retry_statuses are retried here; credential_pool.py leaves 429 out and switches keys instead
+        endpoint = endpoint or urlsplit(url).netloc
+        start = time.perf_counter()
+        try:
+            r = self._request(method, url, retry_statuses, **kwargs)
+        except Exception:
+            self.metrics.record_call(endpoint, time.perf_counter() - start, None, 0, self._last_retries())
+            raise
+        self.metrics.record_call(endpoint, time.perf_counter() - start, r.status_code,
+                                 len(r.content or b""), self._last_retries())
+        return r
+
+    def _last_retries(self):
+        return getattr(self._local, "retries", 0)
+
+    def _request(self, method: str, url: str, retry_statuses=RETRY_STATUSES, **kwargs):
+        import requests
+        attempt = 0
+        self._local.retries = 0
+        while True:
+            self._count("requests")
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count("connection_errors")
+                if attempt >= self.max_retries:
+                    raise
+                self._count("retries")
+                self._local.retries += 1
+                self._sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            if r.status_code not in retry_statuses or attempt >= self.max_retries:
+                return r
+            if r.status_code == 429:
+                self._count("throttled")
+            else:
+                self._count("server_errors")
+            wait = parse_retry_after(r.headers.get("Retry-After"))
+            if wait is None:
+                wait = self.backoff(attempt)
+            self._count("retries")
+            self._local.retries += 1
+            r.close()
+            self._sleep(min(wait, self.backoff_cap))
+            attempt += 1
+
+    def get(self, url: str, endpoint: str = None, **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url: str, endpoint: str = None, **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def stats(self):
+        # counters plus connection reuse, read from the urllib3 pools behind the adapter
+        with self._lock:
+            out = dict(self._counters)
+        pools = self._adapter.poolmanager.pools
+        opened = 0
+        pooled_requests = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                pooled_requests += pool.num_requests
+        out["connections_opened"] = opened
+        out["connections_reused"] = max(0, pooled_requests - opened)
+        return out
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(create: bool = True) -> HttpClient:
+    # process-wide client, shared by every Streamlit session and worker thread;
+    # create=False returns None until something has actually made a request
+    global _client
+    if _client is None and create:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
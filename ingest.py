@@ -0,0 +1,51 @@
+# ingest.py
+# Input ingestion for large batches: pasted text plus uploaded .txt/.csv lists become one list of
+# non-empty lines. CSVs are read with pandas and the url/title column is picked by name.
+import io
+
+# first matching column name wins (case-insensitive); otherwise the first column is used
+INPUT_COLUMN_HINTS = ("url", "urls", "link", "video url", "track url", "uri", "track uri", "title", "track name")
+UNPARSED_PREVIEW = 5
+
+
+def split_lines(text: str):
+    return [l.strip() for l in (text or "").splitlines() if l.strip()]
+
+
+def read_input_file(name: str, data: bytes):
+    # returns (lines, error)
+    if name.lower().endswith(".csv"):
+        import pandas as pd
+        try:
+            df = pd.read_csv(io.BytesIO(data), dtype="string", keep_default_na=False)
+        except Exception as e:
+            return [], f"Could not read {name}: {e}"
+        if df.columns.empty:
+            return [], f"{name} has no columns"
+        by_name = {str(c).strip().lower(): c for c in df.columns}
+        column = next((by_name[h] for h in INPUT_COLUMN_HINTS if h in by_name), df.columns[0])
+        values = df[column].str.strip()
+        return values[values != ""].tolist(), None
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        return [], f"{name} is not UTF-8 text: {e}"
+    return split_lines(text), None
+
+
+def collect_inputs(text: str, files=()):
+    # files: iterable of (name, bytes); returns (lines, errors) with pasted lines first
+    lines = split_lines(text)
+    errors = []
+    for name, data in files:
+        file_lines, err = read_input_file(name, data)
+        if err:
+            errors.append(err)
+        lines.extend(file_lines)
+    return lines, errors
+
+
+def summarize_unparsed(unparsed, what: str = "id") -> str:
+    preview = ", ".join(unparsed[:UNPARSED_PREVIEW])
+    more = f" (+{len(unparsed) - UNPARSED_PREVIEW} more)" if len(unparsed) > UNPARSED_PREVIEW else ""
+    return f"Could not parse a {what} from {len(unparsed)} line(s): {preview}{more}"
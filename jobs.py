@@ -0,0 +1,285 @@
+# jobs.py
+# Background job runner for long batches. app.py submits a batch and keeps only the job id in
+# session state; the work runs on a process-wide worker pool, so widget interactions (script
+# reruns) no longer lose an in-flight batch. Jobs expose progress, partial rows and log messages
+# for polling, and can be cancelled. Dispatch is round-robin over owners (Streamlit sessions)
+# with a per-owner cap, so one user's large batches cannot starve everyone else.
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import schema
+from checkpoint import CHECKPOINT_DIR, CsvCheckpoint, checkpoint_path
+from ingest import summarize_unparsed
+from spotify_api import iter_spotify_rows, prepare_spotify_lines
+from youtube_api import QuotaBudget, expand_youtube_sources, iter_youtube_rows, parse_youtube_lines
+
+JOB_WORKERS = 4         # batches running at once across all sessions
+JOBS_PER_OWNER = 2      # batches running at once per session; the rest wait in its queue
+JOB_RETENTION = 3600    # seconds a finished job stays available for polling
+MAX_JOB_MESSAGES = 500  # log lines kept per job (newest win)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class Job:
+    def __init__(self, owner: str, kind: str, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.kind = kind
+        self.label = label
+        self.status = "queued"
+        self.total = 0
+        self.done = 0
+        self.rows = []
+        self.rejected = []  # input lines that could not be parsed, reported in bulk
+        self.messages = deque(maxlen=MAX_JOB_MESSAGES)  # (level, text); level: info/warning/error
+        self.dropped_messages = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def cancel(self):
+        self._cancel.set()
+
+    def set_total(self, total: int, done: int = 0):
+        with self._lock:
+            self.total = total
+            self.done = done
+
+    def advance(self, n: int = 1):
+        with self._lock:
+            self.done += n
+
+    def log(self, level: str, text: str):
+        with self._lock:
+            if len(self.messages) == self.messages.maxlen:
+                self.dropped_messages += 1
+            self.messages.append((level, text))
+
+    def snapshot(self):
+        # consistent copy for the UI thread; rows are copied so the worker can keep appending
+        with self._lock:
+            return {
+                "id": self.id, "kind": self.kind, "label": self.label, "status": self.status,
+                "total": self.total, "done": self.done, "rows": list(self.rows), "rejected": self.rejected,
+                "messages": list(self.messages), "dropped_messages": self.dropped_messages,
+                "result": self.result, "error": self.error,
+                "created_at": self.created_at, "started_at": self.started_at, "finished_at": self.finished_at,
+            }
+
+
+class JobRunner:
+    def __init__(self, max_workers: int = JOB_WORKERS, per_owner: int = JOBS_PER_OWNER,
+                 retention: float = JOB_RETENTION):
+        self.max_workers = max_workers
+        self.per_owner = per_owner
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}                 # job id -> Job
+        self._queues = OrderedDict()    # owner -> deque of (job, fn), in round-robin order
+        self._running = {}              # owner -> running job count
+        self._running_total = 0
+
+    def submit(self, owner: str, kind: str, fn, label: str = "") -> str:
+        # fn(job) runs on a worker thread and returns the job result
+        job = Job(owner, kind, label)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self._queues.setdefault(owner, deque()).append((job, fn))
+            self._dispatch()
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def jobs_for(self, owner: str):
+        with self._lock:
+            return [j for j in self._jobs.values() if j.owner == owner]
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is None:
+            return
+        job.cancel()
+        with self._lock:
+            # queued jobs are dropped right away; running ones stop at their next check
+            queue = self._queues.get(job.owner)
+            if queue is not None:
+                for entry in list(queue):
+                    if entry[0] is job:
+                        queue.remove(entry)
+                        job.status = "cancelled"
+                        job.finished_at = time.time()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._running_total,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "owners": len([o for o, n in self._running.items() if n]),
+                "jobs_kept": len(self._jobs),
+            }
+
+    def _dispatch(self):
+        # called with the lock held: start queued jobs, one owner at a time in rotation
+        while self._running_total < self.max_workers:
+            started = False
+            for owner in list(self._queues):
+                queue = self._queues[owner]
+                if not queue:
+                    del self._queues[owner]
+                    continue
+                if self._running.get(owner, 0) >= self.per_owner:
+                    continue
+                job, fn = queue.popleft()
+                # rotate: the owner that just got a slot goes to the back of the line
+                self._queues.move_to_end(owner)
+                self._running[owner] = self._running.get(owner, 0) + 1
+                self._running_total += 1
+                job.status = "running"
+                job.started_at = time.time()
+                self._executor.submit(self._run, job, fn)
+                started = True
+                break
+            if not started:
+                return
+
+    def _run(self, job: Job, fn):
+        try:
+            result = fn(job)
+        except Exception as e:
+            status, result, error = "failed", None, str(e)
+        else:
+            status, error = ("cancelled" if job.cancelled else "done"), None
+        with job._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+        with self._lock:
+            self._running[job.owner] -= 1
+            self._running_total -= 1
+            self._dispatch()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    # process-wide runner, shared by every Streamlit session
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
+
+
+# -----------------------
+# Batch jobs submitted by app.py (no Streamlit calls: they run on worker threads).
+# api_key / token may be a credential_pool.CredentialPool, shared by every batch of the process
+# -----------------------
+def _finish_batch(job: Job, service: str, ckpt: CsvCheckpoint, store=None, **extra):
+    # a cancelled batch keeps its checkpoint, so submitting the same input again resumes it
+    if job.cancelled:
+        ckpt.close()
+    frame = schema.to_frame(service, ckpt.rows) if ckpt.rows else None
+    result = dict(extra, frame=frame, csv=None, stored=None)
+    if frame is not None:
+        result["csv"] = frame.to_csv(index=False).encode("utf-8")
+        if store is not None and not job.cancelled:
+            result["stored"] = store.save(service, frame)
+    if not job.cancelled:
+        ckpt.discard()
+    return result
+
+
+def youtube_batch(job: Job, lines, api_key, quota: int, max_videos: int, store=None,
+                  checkpoint_dir: str = CHECKPOINT_DIR):
+    budget = QuotaBudget(quota)
+    lines, notes, errors = expand_youtube_sources(lines, api_key, budget, max_videos)
+    for note in notes:
+        job.log("info", f"📂 {note}")
+    for err in errors:
+        job.log("error", err)
+    ids, url_map, unparsed = parse_youtube_lines(lines)
+    if unparsed:
+        job.rejected = unparsed
+        job.log("warning", summarize_unparsed(unparsed, "video id"))
+    if len(ids) < len(lines) - len(unparsed):
+        job.log("info", f"{len(lines) - len(unparsed) - len(ids)} duplicate urls point to videos already in the batch.")
+    if not ids:
+        job.log("error", "No valid YouTube IDs parsed.")
+        return None
+    ckpt = CsvCheckpoint(checkpoint_path("youtube", ids, checkpoint_dir))
+    if ckpt.resumed:
+        job.log("info", f"Resuming interrupted batch: {ckpt.resumed} videos already fetched.")
+    job.rows = ckpt.rows  # shared list: partial results are visible while the batch runs
+    job.set_total(len(ids), sum(1 for vid in ids if vid in ckpt.done))
+    with ckpt:
+        for vid, row, msg in iter_youtube_rows(ids, url_map, api_key, skip=ckpt.done, budget=budget):
+            if job.cancelled:
+                break
+            if vid is None:
+                job.log("error", msg)
+                continue
+            if msg:
+                job.log("warning", msg)
+            else:
+                ckpt.append(vid, row)
+            job.advance()
+    return _finish_batch(job, "youtube", ckpt, store, quota_spent=budget.spent, quota_limit=budget.limit)
+
+
+def spotify_batch(job: Job, lines, input_mode: str, token, max_workers: int, store=None,
+                  checkpoint_dir: str = CHECKPOINT_DIR):
+    lines, unparsed, duplicates = prepare_spotify_lines(lines, input_mode)
+    if unparsed:
+        job.rejected = unparsed
+        job.log("warning", summarize_unparsed(unparsed, "track id"))
+    if duplicates:
+        job.log("info", f"{duplicates} duplicate lines point to tracks already in the batch.")
+    if not lines:
+        job.log("error", "No valid Spotify tracks parsed.")
+        return None
+    ckpt = CsvCheckpoint(checkpoint_path("spotify", [input_mode] + list(lines), checkpoint_dir))
+    if ckpt.resumed:
+        job.log("info", f"Resuming interrupted batch: {ckpt.resumed} tracks already fetched.")
+    job.rows = ckpt.rows
+    job.set_total(len(lines), sum(1 for l in lines if l in ckpt.done))
+    with ckpt:
+        for line, data, err, notes in iter_spotify_rows(lines, input_mode, token, max_workers, skip=ckpt.done):
+            if job.cancelled:
+                break
+            for note in notes:
+                job.log("info", note)
+            if err:
+                job.log("warning", err)
+            else:
+                ckpt.append(line, data)
+            job.advance()
+    return _finish_batch(job, "spotify", ckpt, store)
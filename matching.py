@@ -0,0 +1,232 @@
+# matching.py
+# Cross-platform join: pairs YouTube videos with Spotify tracks by title, artist and duration.
+# Track and artist names go into inverted token indexes; a video is only scored against tracks that
+# share a selective token with it (blocking), the best few by IDF-weighted overlap get the full score, and
+# pairs are then assigned greedily, best score first, so each video and each track is used once.
+# Work grows with candidates per video, not with videos x tracks.
+import heapq
+import math
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+MIN_SCORE = 0.6       # pairs scoring below this are left unmatched
+CANDIDATES = 5        # tracks per video that get the full score
+MAX_POSTINGS = 1000   # tokens in more track names than this ("love", "remix") are too common to block on
+BLOCK_SIZE = 64       # tracks gathered from rare tokens before commoner tokens only re-rank them
+WEIGHTS = {"title": 0.6, "artist": 0.25, "duration": 0.15}
+TITLE_PRECISION = 0.25  # share of the title score for extra words in the video title
+DURATION_TOLERANCE = 3  # seconds apart that still count as the same recording
+DURATION_CUTOFF = 30    # seconds apart that score zero
+FUZZY_TOKEN_RATIO = 0.8  # a misspelled token still counts when it is this close to a title token
+
+# decorations YouTube titles and channels carry that Spotify names never do
+YOUTUBE_NOISE_RE = re.compile(
+    r"[(\[][^)\]]*\b(?:official|video|audio|lyrics?|visuali[sz]er|hd|hq|4k|mv|m/v)\b[^)\]]*[)\]]"
+    r"|\b(?:official (?:music )?video|official audio|lyric video|with lyrics|music video)\b")
+CHANNEL_NOISE_RE = re.compile(r"(?:\s*-\s*topic|vevo|\s+official)$")
+FEAT_RE = re.compile(r"\b(?:feat|ft|featuring)\b\.?")
+TOKEN_RE = re.compile(r"\w+")
+
+YOUTUBE_COLUMNS = ["Title", "Channel Name", "URL", "Duration (s)", "Views", "Likes", "Comments"]
+SPOTIFY_COLUMNS = ["Track Name", "Artists", "Album", "Track URL", "Duration (ms)", "Popularity", "Artist Followers"]
+
+
+def normalize_text(value) -> str:
+    # casefolded, accents stripped ("Beyoncé" == "beyonce"), "ft." and "featuring" spelled "feat"
+    if not isinstance(value, str):
+        return ""
+    if not value.isascii():
+        value = unicodedata.normalize("NFKD", value)
+        value = "".join(c for c in value if not unicodedata.combining(c))
+    return FEAT_RE.sub("feat", value.casefold())
+
+
+def tokens(value: str):
+    return TOKEN_RE.findall(value)
+
+
+def _seconds(value, scale: float = 1.0):
+    try:
+        value = float(value) / scale
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def _duration_score(video_seconds, track_seconds):
+    # None when either side has no duration, so the other parts decide
+    if video_seconds is None or track_seconds is None:
+        return None
+    diff = abs(video_seconds - track_seconds)
+    if diff <= DURATION_TOLERANCE:
+        return 1.0
+    return max(0.0, 1 - (diff - DURATION_TOLERANCE) / (DURATION_CUTOFF - DURATION_TOLERANCE))
+
+
+def _coverage(wanted, have, idf, fuzzy=()):
+    # IDF-weighted share of `wanted` tokens found in `have`; misses may still match one of the
+    # `fuzzy` tokens closely enough (a misspelling)
+    total = found = 0.0
+    for tok in wanted:
+        weight = idf.get(tok, 1.0)
+        total += weight
+        if tok in have:
+            found += weight
+        elif fuzzy and len(tok) > 3:
+            best = max((SequenceMatcher(None, tok, h).ratio() for h in fuzzy
+                        if h[0] == tok[0] and abs(len(h) - len(tok)) <= 2), default=0.0)
+            if best >= FUZZY_TOKEN_RATIO:
+                found += weight * best
+    return found / total if total else 0.0
+
+
+class _Video:
+    __slots__ = ("tokens", "title_tokens", "squashed", "seconds")
+
+    def __init__(self, title, channel, seconds):
+        title = YOUTUBE_NOISE_RE.sub(" ", normalize_text(title))
+        channel = CHANNEL_NOISE_RE.sub("", normalize_text(channel).strip())
+        self.title_tokens = set(tokens(title))
+        self.tokens = self.title_tokens | set(tokens(channel))
+        # "TheWeeknd" channels match "The Weeknd" artists
+        self.squashed = "".join(tokens(title)) + " " + "".join(tokens(channel))
+        self.seconds = seconds
+
+
+class _Track:
+    __slots__ = ("tokens", "artists", "artist_tokens", "squashed", "seconds")
+
+    def __init__(self, name, artists, seconds):
+        self.tokens = set(tokens(normalize_text(name)))
+        self.artists = [tokens(a) for a in normalize_text(artists).split(",") if tokens(a)]
+        self.squashed = ["".join(a) for a in self.artists]
+        # the squashed name too, for "TheWeekndVEVO"-style channels
+        self.artist_tokens = {tok for artist in self.artists for tok in artist} | set(self.squashed)
+        self.seconds = seconds
+
+
+class TrackIndex:
+    # inverted indexes over track names and artist names: token -> positions of the tracks that contain it
+    def __init__(self, names, artists, durations_ms):
+        self.tracks = [_Track(n, a, _seconds(d, 1000)) for n, a, d in zip(names, artists, durations_ms)]
+        self.postings = {}
+        self.artist_postings = {}
+        for pos, track in enumerate(self.tracks):
+            for tok in track.tokens:
+                self.postings.setdefault(tok, []).append(pos)
+            for tok in track.artist_tokens:
+                self.artist_postings.setdefault(tok, []).append(pos)
+        n = len(self.tracks) or 1
+        self.idf = {tok: math.log(1 + n / len(p)) for tok, p in self.postings.items()}
+        self.artist_idf = {tok: math.log(1 + n / len(p)) for tok, p in self.artist_postings.items()}
+        # tokens too common to block on: membership sets, and the tracks in order of name length
+        self.common = {tok: set(p) for tok, p in self.postings.items() if len(p) > MAX_POSTINGS}
+        self.common_by_length = {tok: sorted(p, key=lambda pos: len(self.tracks[pos].tokens))
+                                 for tok, p in self.postings.items() if len(p) > MAX_POSTINGS}
+
+    def candidates(self, video: _Video, limit: int = CANDIDATES):
+        # blocking: tracks come in through the rarest tokens the video shares with track or artist
+        # names; once BLOCK_SIZE are in, commoner tokens only add to the rank of tracks already found
+        shared = []
+        for tok in video.tokens:
+            if tok in self.postings:
+                shared.append((len(self.postings[tok]), self.idf[tok], tok, False))
+            if tok in self.artist_postings:
+                shared.append((len(self.artist_postings[tok]), self.artist_idf[tok], tok, True))
+        shared.sort()
+        overlap = {}
+        common = []
+        for size, weight, tok, artist in shared:
+            if size <= MAX_POSTINGS and len(overlap) < BLOCK_SIZE:
+                for pos in (self.artist_postings if artist else self.postings)[tok]:
+                    overlap[pos] = overlap.get(pos, 0.0) + weight
+            elif overlap:
+                for pos in overlap:
+                    track = self.tracks[pos]
+                    if tok in (track.artist_tokens if artist else track.tokens):
+                        overlap[pos] += weight
+            elif not artist:
+                common.append(tok)
+        if not overlap and common:
+            # every shared token is common ("Love You"): the shortest names that have all of them
+            rarest, others = common[0], [self.common[tok] for tok in common[1:]]
+            block = []
+            for pos in self.common_by_length[rarest]:
+                if all(pos in other for other in others):
+                    block.append(pos)
+                    if len(block) == limit:
+                        break
+            return block or self.common_by_length[rarest][:limit]
+        return heapq.nlargest(limit, overlap, key=overlap.get)
+
+    def score(self, video: _Video, pos: int, min_score: float = MIN_SCORE):
+        track = self.tracks[pos]
+        # title: how much of the track name the video title covers, and (less) how much of the title
+        # the track and artist names explain, so "Cooking pasta at home" is not the track "Pasta"
+        coverage = _coverage(track.tokens, video.title_tokens, self.idf)
+        explained = len(video.title_tokens & (track.tokens | track.artist_tokens)) / (len(video.title_tokens) or 1)
+        parts = {"title": (1 - TITLE_PRECISION) * coverage + TITLE_PRECISION * explained}
+        if track.artists:
+            parts["artist"] = max(1.0 if squashed in video.squashed else _coverage(artist, video.tokens, {})
+                                  for artist, squashed in zip(track.artists, track.squashed))
+        duration = _duration_score(video.seconds, track.seconds)
+        if duration is not None:
+            parts["duration"] = duration
+        weight = sum(WEIGHTS[k] for k in parts)
+        score = sum(WEIGHTS[k] * v for k, v in parts.items()) / weight
+        # the fuzzy pass is slow, so it only runs when it could lift the pair over the threshold, and
+        # only title tokens no track name uses are tried as misspellings
+        lift = WEIGHTS["title"] * (1 - TITLE_PRECISION) / weight
+        if score < min_score and score + lift * (1 - coverage) >= min_score:
+            unknown = [tok for tok in video.title_tokens if tok not in self.idf]
+            if unknown:
+                score += lift * (_coverage(track.tokens, video.title_tokens, self.idf, unknown) - coverage)
+        return score
+
+
+def match_catalogs(youtube_df, spotify_df, min_score: float = MIN_SCORE, candidates: int = CANDIDATES):
+    # returns [(video position, track position, score)] sorted by video position
+    index = TrackIndex(spotify_df["Track Name"].tolist(),
+                       spotify_df["Artists"].tolist() if "Artists" in spotify_df.columns else [""] * len(spotify_df),
+                       spotify_df["Duration (ms)"].tolist() if "Duration (ms)" in spotify_df.columns
+                       else [None] * len(spotify_df))
+    channels = youtube_df["Channel Name"].tolist() if "Channel Name" in youtube_df.columns else [""] * len(youtube_df)
+    durations = youtube_df["Duration (s)"].tolist() if "Duration (s)" in youtube_df.columns else [None] * len(youtube_df)
+    scored = []
+    for vpos, (title, channel, seconds) in enumerate(zip(youtube_df["Title"].tolist(), channels, durations)):
+        video = _Video(title, channel, _seconds(seconds))
+        for tpos in index.candidates(video, candidates):
+            score = index.score(video, tpos, min_score)
+            if score >= min_score:
+                scored.append((score, vpos, tpos))
+    # greedy one-to-one assignment: an official video beats its lyric-video re-upload to the track
+    scored.sort(key=lambda s: -s[0])
+    used_videos, used_tracks, pairs = set(), set(), []
+    for score, vpos, tpos in scored:
+        if vpos in used_videos or tpos in used_tracks:
+            continue
+        used_videos.add(vpos)
+        used_tracks.add(tpos)
+        pairs.append((vpos, tpos, round(score, 3)))
+    return sorted(pairs)
+
+
+def missing_columns(youtube_df, spotify_df):
+    # the name columns matching cannot do without, absent from either table
+    return [c for c, df in (("Title", youtube_df), ("Track Name", spotify_df)) if c not in df.columns]
+
+
+def unified_table(youtube_df, spotify_df, min_score: float = MIN_SCORE):
+    # one row per matched pair: the video's columns, the track's columns and the match score;
+    # returns (DataFrame, {"videos", "tracks", "matched"})
+    import pandas as pd
+    pairs = match_catalogs(youtube_df, spotify_df, min_score)
+    vpos = [p[0] for p in pairs]
+    tpos = [p[1] for p in pairs]
+    left = youtube_df[[c for c in YOUTUBE_COLUMNS if c in youtube_df.columns]].iloc[vpos].reset_index(drop=True)
+    right = spotify_df[[c for c in SPOTIFY_COLUMNS if c in spotify_df.columns]].iloc[tpos].reset_index(drop=True)
+    table = pd.concat([left, right], axis=1)
+    table["Match Score"] = [p[2] for p in pairs]
+    stats = {"videos": len(youtube_df), "tracks": len(spotify_df), "matched": len(pairs)}
+    return table, stats
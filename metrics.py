@@ -0,0 +1,119 @@
+# metrics.py
+# Process-wide instrumentation for outbound API calls: per-endpoint call/error counts, latency
+# percentiles, bytes received, retries, response-cache hits and estimated YouTube quota units.
+# Recording is a dict update under a lock; latencies are kept in a bounded window per endpoint.
+import json
+import threading
+import time
+from collections import deque
+
+LATENCY_WINDOW = 2048  # most recent samples kept per endpoint for percentiles
+
+
+def _percentile(sorted_values, q: float):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+class MetricsRegistry:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self._cache = {}
+            self._quota = {}
+            self.started_at = time.time()
+
+    def _endpoint(self, name: str):
+        ep = self._endpoints.get(name)
+        if ep is None:
+            ep = {"calls": 0, "errors": 0, "retries": 0, "bytes": 0, "seconds": 0.0,
+                  "latencies": deque(maxlen=self.window)}
+            self._endpoints[name] = ep
+        return ep
+
+    def record_call(self, endpoint: str, seconds: float, status=None, nbytes: int = 0, retries: int = 0):
+        # status is the HTTP status, or None when the request raised
+        with self._lock:
+            ep = self._endpoint(endpoint)
+            ep["calls"] += 1
+            ep["retries"] += retries
+            ep["bytes"] += nbytes
+            ep["seconds"] += seconds
+            ep["latencies"].append(seconds)
+            if status is None or status >= 400:
+                ep["errors"] += 1
+
+    def record_cache(self, kind: str, hit: bool):
+        with self._lock:
+            c = self._cache.setdefault(kind, {"hits": 0, "misses": 0})
+            c["hits" if hit else "misses"] += 1
+
+    def record_quota(self, service: str, units: int):
+        with self._lock:
+            self._quota[service] = self._quota.get(service, 0) + units
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {name: dict(ep, latencies=sorted(ep["latencies"])) for name, ep in self._endpoints.items()}
+            cache = {k: dict(v) for k, v in self._cache.items()}
+            quota = dict(self._quota)
+            started_at = self.started_at
+        out = {"since": started_at, "endpoints": {}, "cache": cache, "quota_units": quota}
+        for name, ep in sorted(endpoints.items()):
+            lat = ep.pop("latencies")
+            ep["p50_ms"] = round(_percentile(lat, 0.50) * 1000, 1) if lat else None
+            ep["p95_ms"] = round(_percentile(lat, 0.95) * 1000, 1) if lat else None
+            ep["p99_ms"] = round(_percentile(lat, 0.99) * 1000, 1) if lat else None
+            ep["seconds"] = round(ep["seconds"], 3)
+            out["endpoints"][name] = ep
+        return out
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        snap = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_str}}} {value}")
+
+        eps = snap["endpoints"]
+        metric("media_api_requests_total", "counter", "Outbound API calls.",
+               [({"endpoint": n}, ep["calls"]) for n, ep in eps.items()])
+        metric("media_api_errors_total", "counter", "Outbound API calls that failed or returned >= 400.",
+               [({"endpoint": n}, ep["errors"]) for n, ep in eps.items()])
+        metric("media_api_retries_total", "counter", "Retries performed by the HTTP client.",
+               [({"endpoint": n}, ep["retries"]) for n, ep in eps.items()])
+        metric("media_api_response_bytes_total", "counter", "Response body bytes received.",
+               [({"endpoint": n}, ep["bytes"]) for n, ep in eps.items()])
+        metric("media_api_request_seconds_total", "counter", "Time spent in outbound calls.",
+               [({"endpoint": n}, ep["seconds"]) for n, ep in eps.items()])
+        metric("media_api_latency_seconds", "summary", "Latency over the most recent calls.",
+               [({"endpoint": n, "quantile": q}, ep[field] / 1000)
+                for n, ep in eps.items()
+                for q, field in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms"))
+                if ep[field] is not None])
+        metric("media_api_cache_lookups_total", "counter", "Response cache lookups.",
+               [({"kind": k, "result": r}, c[r]) for k, c in snap["cache"].items() for r in ("hits", "misses")])
+        metric("media_api_quota_units_total", "counter", "Estimated API quota units spent.",
+               [({"service": s}, u) for s, u in snap["quota_units"].items()])
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
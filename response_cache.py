@@ -0,0 +1,243 @@
+# response_cache.py
+# TTL + LRU cache for API metadata, keyed by video/track/artist id.
+# Items are split into field groups with their own TTL: fast-moving counters
+# (statistics, popularity, followers) expire quickly, descriptive metadata lives long.
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import get_metrics
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+
+DEFAULT_TTLS = {
+    "youtube.snippet": 7 * DAY,
+    "youtube.contentDetails": 7 * DAY,
+    "youtube.statistics": 15 * MINUTE,
+    "spotify_track.meta": 7 * DAY,
+    "spotify_track.popularity": 15 * MINUTE,
+    "spotify_features.meta": 30 * DAY,
+    "spotify_artist.meta": 7 * DAY,
+    "spotify_artist.followers": 15 * MINUTE,
+    # normalized title query -> top match; which track a title resolves to rarely changes
+    "spotify_search.match": 30 * DAY,
+}
+DEFAULT_MAX_ENTRIES = 50_000
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        # returns (value, stored_at) or None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._data[key] = (value, stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    # survives app restarts; LRU order is tracked with an accessed_at column
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time()),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttls=None, clock=time.time):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {}  # kind -> {"hits": n, "misses": n}
+
+    def _record(self, kind, hit):
+        with self._lock:
+            s = self._stats.setdefault(kind, {"hits": 0, "misses": 0})
+            s["hits" if hit else "misses"] += 1
+        get_metrics().record_cache(kind, hit)
+
+    def get(self, kind: str, key: str, fields):
+        # returns {field: value} when every field is fresh, else None (counted as a miss)
+        now = self._clock()
+        out = {}
+        for field in fields:
+            cache_key = f"{kind}:{key}:{field}"
+            entry = self.backend.get(cache_key)
+            if entry is None or now - entry[1] > self.ttls.get(f"{kind}.{field}", 0):
+                if entry is not None:
+                    self.backend.delete(cache_key)
+                self._record(kind, False)
+                return None
+            out[field] = entry[0]
+        self._record(kind, True)
+        return out
+
+    def put(self, kind: str, key: str, parts: dict):
+        now = self._clock()
+        for field, value in parts.items():
+            self.backend.set(f"{kind}:{key}:{field}", value, now)
+
+    def stats(self):
+        with self._lock:
+            out = {kind: dict(s) for kind, s in self._stats.items()}
+        for s in out.values():
+            total = s["hits"] + s["misses"]
+            s["hit_rate"] = round(s["hits"] / total, 3) if total else 0.0
+        return out
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._stats.clear()
+
+
+# -----------------------
+# Field-group splitting for each API object
+# -----------------------
+YOUTUBE_FIELDS = ("snippet", "contentDetails", "statistics")
+SPOTIFY_TRACK_FIELDS = ("meta", "popularity")
+SPOTIFY_FEATURES_FIELDS = ("meta",)
+SPOTIFY_ARTIST_FIELDS = ("meta", "followers")
+SPOTIFY_SEARCH_FIELDS = ("match",)
+
+
+def split_youtube_item(item):
+    return {f: item.get(f, {}) for f in YOUTUBE_FIELDS}
+
+
+def join_youtube_item(video_id, parts):
+    item = {"id": video_id}
+    item.update(parts)
+    return item
+
+
+def split_spotify_track(track):
+    meta = {k: v for k, v in track.items() if k != "popularity"}
+    return {"meta": meta, "popularity": track.get("popularity")}
+
+
+def join_spotify_track(parts):
+    track = dict(parts["meta"])
+    track["popularity"] = parts["popularity"]
+    return track
+
+
+def split_spotify_features(features):
+    return {"meta": features}
+
+
+def join_spotify_features(parts):
+    return parts["meta"]
+
+
+def split_spotify_artist(artist):
+    meta = {k: v for k, v in artist.items() if k != "followers"}
+    return {"meta": meta, "followers": artist.get("followers")}
+
+
+def join_spotify_artist(parts):
+    artist = dict(parts["meta"])
+    artist["followers"] = parts["followers"]
+    return artist
+
+
+_cache = ResponseCache()
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    return _cache
+
+
+def configure_response_cache(sqlite_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+    # swaps the process-wide backend; a no-op when the requested backend is already active
+    global _cache
+    with _cache_lock:
+        backend = _cache.backend
+        if sqlite_path:
+            if isinstance(backend, SQLiteBackend) and backend.path == sqlite_path:
+                return _cache
+            _cache = ResponseCache(SQLiteBackend(sqlite_path, max_entries), _cache.ttls)
+        else:
+            if isinstance(backend, MemoryBackend):
+                return _cache
+            _cache = ResponseCache(MemoryBackend(max_entries), _cache.ttls)
+        return _cache
@@ -0,0 +1,273 @@
+# rollups.py
+# Pre-aggregated rollups over snapshot history, for leaderboards. When a snapshot is added, each item's
+# counters are compared with the item's last rolled-up values (looked up for the snapshot's own items
+# only), and per-group totals and deltas — YouTube by channel and category, Spotify by artist and
+# album — plus the items that moved most are written to SQLite. Adding a snapshot costs O(its rows);
+# reading a leaderboard costs O(groups in one snapshot), however long the history is.
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import schema
+from collector import COLLECTOR_DIR
+from snapshot_store import STORE_ROOT
+
+STORE_ROLLUPS_PATH = os.path.join(STORE_ROOT, "rollups.sqlite")
+COLLECTOR_ROLLUPS_PATH = os.path.join(COLLECTOR_DIR, "rollups.sqlite")
+MOVERS_KEPT = 50  # top gainers and fallers kept per metric and snapshot
+
+# dimension -> column; a track counts towards each of its artists
+DIMENSIONS = {
+    "youtube": {"channel": "Channel Name", "category": "Category Name"},
+    "spotify": {"artist": "Artists", "album": "Album"},
+}
+MULTI_VALUED = {"artist": ", "}
+# per-item figures (a track's popularity, its artist's followers) are averaged over a group, not summed
+AVERAGED = {"Popularity", "Artist Followers"}
+LABEL_COLUMNS = {"youtube": "Title", "spotify": "Track Name"}
+
+
+def _stamp(dt: datetime) -> str:
+    # same fixed-width text as the delta log, so captures sort chronologically in SQLite
+    return dt.isoformat(timespec="seconds")
+
+
+def _item_frame(service: str, df):
+    # one row per item: id, label, dimension values and counters as floats
+    import pandas as pd
+    from compare import item_keys
+    frame = pd.DataFrame({"item_id": item_keys(service, df).astype(str).values})
+    label = LABEL_COLUMNS[service]
+    frame["label"] = df[label].astype("string").values if label in df.columns else pd.NA
+    for dimension, column in DIMENSIONS[service].items():
+        frame[dimension] = df[column].astype("string").str.strip().values if column in df.columns else pd.NA
+    for metric in schema.METRICS[service]:
+        values = df[metric] if metric in df.columns else pd.Series(pd.NA, index=df.index)
+        frame[metric] = pd.to_numeric(values, errors="coerce").astype("float64").values
+    return frame.drop_duplicates("item_id", keep="last").reset_index(drop=True)
+
+
+class RollupStore:
+    def __init__(self, path: str = STORE_ROLLUPS_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # rollups can always be rebuilt from their source, so a commit need not wait for the disk
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS captures ("
+            " service TEXT NOT NULL, captured_at TEXT NOT NULL, items INTEGER NOT NULL,"
+            " PRIMARY KEY (service, captured_at));"
+            # delta: summed change of the group's items that were seen before (matched of them)
+            "CREATE TABLE IF NOT EXISTS rollups ("
+            " service TEXT NOT NULL, captured_at TEXT NOT NULL, dimension TEXT NOT NULL, group_key TEXT NOT NULL,"
+            " metric TEXT NOT NULL, items INTEGER NOT NULL, total REAL NOT NULL, delta REAL NOT NULL,"
+            " matched INTEGER NOT NULL,"
+            " PRIMARY KEY (service, captured_at, dimension, metric, group_key));"
+            "CREATE TABLE IF NOT EXISTS movers ("
+            " service TEXT NOT NULL, captured_at TEXT NOT NULL, metric TEXT NOT NULL, direction TEXT NOT NULL,"
+            " rank INTEGER NOT NULL, item_id TEXT NOT NULL, label TEXT, value REAL, delta REAL NOT NULL,"
+            " PRIMARY KEY (service, captured_at, metric, direction, rank));"
+            "CREATE TEMP TABLE IF NOT EXISTS snapshot_items (item_id TEXT PRIMARY KEY);"
+        )
+        # each item's counters as of the latest snapshot that had them, one table per service
+        for service, metrics in schema.METRICS.items():
+            columns = ", ".join(f'"{m}" REAL' for m in metrics)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS last_{service} (item_id TEXT PRIMARY KEY, {columns})"
+                               " WITHOUT ROWID")
+        self._conn.commit()
+
+    def add(self, service: str, df, captured_at: datetime):
+        # rolls up one snapshot newer than every snapshot already added; returns (items, error).
+        # A snapshot that is already rolled up is skipped (0 items, no error). The check and every
+        # insert run under the lock in one transaction, so sessions adding the same snapshot at once
+        # cannot both write it.
+        import pandas as pd
+        at = _stamp(captured_at)
+        frame = _item_frame(service, df)
+        metrics = schema.METRICS[service]
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM captures WHERE service = ? AND captured_at = ?",
+                                  (service, at)).fetchone():
+                return 0, None
+            latest = self._conn.execute(
+                "SELECT MAX(captured_at) FROM captures WHERE service = ?", (service,)).fetchone()[0]
+            if latest is not None and at <= latest:
+                return 0, f"{at} is not newer than the latest rolled-up snapshot ({latest})"
+            try:
+                # previous values of this snapshot's items only, through the primary key
+                item_ids = frame["item_id"].tolist()
+                columns = ", ".join(f'"{m}"' for m in metrics)
+                self._conn.execute("DELETE FROM snapshot_items")
+                self._conn.executemany("INSERT INTO snapshot_items (item_id) VALUES (?)", ((i,) for i in item_ids))
+                previous = pd.DataFrame(self._conn.execute(
+                    f"SELECT item_id, {columns} FROM snapshot_items JOIN last_{service} USING (item_id)"
+                ).fetchall(), columns=["item_id"] + metrics).set_index("item_id").astype("float64")
+                before = frame[["item_id"]].join(previous, on="item_id")
+                for metric in metrics:
+                    frame[f"{metric} delta"] = frame[metric] - before[metric]
+
+                rollups = []
+                for dimension in DIMENSIONS[service]:
+                    groups = frame[[dimension] + metrics + [f"{m} delta" for m in metrics]]
+                    if dimension in MULTI_VALUED:
+                        groups = groups.assign(**{dimension: groups[dimension].str.split(MULTI_VALUED[dimension])})
+                        groups = groups.explode(dimension)
+                        groups[dimension] = groups[dimension].str.strip()
+                    groups = groups[groups[dimension].notna() & (groups[dimension] != "")]
+                    if groups.empty:
+                        continue
+                    grouped = groups.groupby(dimension, sort=False)
+                    items = grouped.size()
+                    for metric in metrics:
+                        totals = grouped[metric].sum()
+                        deltas = grouped[f"{metric} delta"].sum()
+                        matched = grouped[f"{metric} delta"].count()
+                        rollups.extend((service, at, dimension, str(g), metric, int(count), float(total), float(delta), int(n))
+                                       for g, count, total, delta, n in zip(items.index, items.values, totals.values,
+                                                                            deltas.values, matched.values))
+
+                movers = []
+                for metric in metrics:
+                    change = f"{metric} delta"
+                    for direction, top in (("up", frame[frame[change] > 0].nlargest(MOVERS_KEPT, change)),
+                                           ("down", frame[frame[change] < 0].nsmallest(MOVERS_KEPT, change))):
+                        movers.extend((service, at, metric, direction, rank, item_id, None if pd.isna(label) else label,
+                                       float(value), float(delta))
+                                      for rank, (item_id, label, value, delta) in enumerate(
+                                          zip(top["item_id"], top["label"], top[metric], top[change]), start=1))
+
+                values = frame[metrics].astype(object).where(frame[metrics].notna(), None)
+                latest_values = [[item_id] + row for item_id, row in zip(item_ids, values.to_numpy().tolist())]
+                self._conn.executemany(
+                    "INSERT INTO rollups (service, captured_at, dimension, group_key, metric, items, total, delta, matched)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rollups)
+                self._conn.executemany(
+                    "INSERT INTO movers (service, captured_at, metric, direction, rank, item_id, label, value, delta)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", movers)
+                # a counter missing from this snapshot keeps its earlier value
+                self._conn.executemany(
+                    f"INSERT INTO last_{service} (item_id, {columns}) VALUES (?{', ?' * len(metrics)})"
+                    " ON CONFLICT (item_id) DO UPDATE SET "
+                    + ", ".join(f'"{m}" = COALESCE(excluded."{m}", "{m}")' for m in metrics), latest_values)
+                self._conn.execute("INSERT INTO captures (service, captured_at, items) VALUES (?, ?, ?)",
+                                   (service, at, len(frame)))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return len(frame), None
+
+    def sync(self, service: str, snapshots):
+        # snapshots: [(captured_at, load)] with load() returning the DataFrame; only snapshots not rolled up
+        # yet are loaded. One older than the latest rolled-up snapshot (a backfill) makes the deltas after
+        # it stale, so the service is then rolled up again from the start. Returns the number added.
+        # Syncs are serialized, so one session's rebuild cannot interleave with another's adds.
+        snapshots = sorted(snapshots, key=lambda s: s[0])
+        with self._sync_lock:
+            done = {_stamp(c) for c in self.captures(service)}
+            pending = [s for s in snapshots if _stamp(s[0]) not in done]
+            if pending and done and _stamp(pending[0][0]) < max(done):
+                self.clear(service)
+                pending = snapshots
+            added = 0
+            for captured_at, load in pending:
+                items, err = self.add(service, load(), captured_at)
+                if err:
+                    raise ValueError(err)
+                added += bool(items)
+        return added
+
+    def captures(self, service: str):
+        # rolled-up snapshot times, oldest first
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT captured_at FROM captures WHERE service = ? ORDER BY captured_at", (service,)).fetchall()
+        return [datetime.fromisoformat(r[0]) for r in rows]
+
+    def latest(self, service: str):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(captured_at) FROM captures WHERE service = ?", (service,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def leaderboard(self, service: str, dimension: str, metric: str, captured_at: datetime = None,
+                    by: str = "change", n: int = 10):
+        # top n groups of one snapshot (default: the latest) by change or by total; averaged metrics
+        # are reported per item
+        import pandas as pd
+        at = _stamp(captured_at) if captured_at else None
+        value = "total * 1.0 / items" if metric in AVERAGED else "total"
+        change = "delta / NULLIF(matched, 0)" if metric in AVERAGED else "CASE WHEN matched THEN delta END"
+        order = "change" if by == "change" else "value"
+        with self._lock:
+            if at is None:
+                at = self._conn.execute(
+                    "SELECT MAX(captured_at) FROM captures WHERE service = ?", (service,)).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT group_key, items, {value} AS value, {change} AS change FROM rollups"
+                f" WHERE service = ? AND captured_at = ? AND dimension = ? AND metric = ?"
+                f" ORDER BY {order} IS NULL, {order} DESC LIMIT ?",
+                (service, at, dimension, metric, int(n))).fetchall()
+        return pd.DataFrame(rows, columns=[dimension.title(), "Items", metric, f"{metric} Change"])
+
+    def movers(self, service: str, metric: str, captured_at: datetime = None, direction: str = "up", n: int = 10):
+        # items with the largest rise ("up") or fall ("down") of one metric in one snapshot
+        import pandas as pd
+        with self._lock:
+            at = _stamp(captured_at) if captured_at else self._conn.execute(
+                "SELECT MAX(captured_at) FROM captures WHERE service = ?", (service,)).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT item_id, label, value, delta FROM movers"
+                " WHERE service = ? AND captured_at = ? AND metric = ? AND direction = ? AND rank <= ? ORDER BY rank",
+                (service, at, metric, direction, int(n))).fetchall()
+        return pd.DataFrame(rows, columns=["Item ID", LABEL_COLUMNS[service], metric, f"{metric} Change"])
+
+    def history(self, service: str, dimension: str, group_key: str, metric: str):
+        # one group's rollup in every snapshot it appears in, oldest first
+        import pandas as pd
+        value = "total * 1.0 / items" if metric in AVERAGED else "total"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT captured_at, items, {value} FROM rollups"
+                " WHERE service = ? AND dimension = ? AND metric = ? AND group_key = ? ORDER BY captured_at",
+                (service, dimension, metric, group_key)).fetchall()
+        out = pd.DataFrame(rows, columns=["Captured At", "Items", metric])
+        out["Captured At"] = pd.to_datetime(out["Captured At"])
+        return out
+
+    def clear(self, service: str):
+        with self._lock:
+            for table in ("captures", "rollups", "movers"):
+                self._conn.execute(f"DELETE FROM {table} WHERE service = ?", (service,))
+            self._conn.execute(f"DELETE FROM last_{service}")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def store_snapshots(service: str, store):
+    # sync() input for the Parquet snapshot store; only the footers are read until a snapshot is loaded
+    return [(captured_at, lambda path=path: store.load(path)[0]) for captured_at, path in store.list_snapshots(service)]
+
+
+def collector_snapshots(service: str, log):
+    # sync() input for the collector delta log; each capture is rebuilt as a full snapshot
+    return [(captured_at, lambda at=captured_at: log.rebuild(service, at)) for captured_at in log.captures(service)]
+
+
+_rollup_stores = {}
+_rollup_stores_lock = threading.Lock()
+
+
+def get_rollup_store(path: str = STORE_ROLLUPS_PATH) -> RollupStore:
+    # one store per file per process, shared by every session
+    with _rollup_stores_lock:
+        if path not in _rollup_stores:
+            _rollup_stores[path] = RollupStore(path)
+        return _rollup_stores[path]
@@ -0,0 +1,118 @@
+# schema.py
+# Declared column types for YouTube and Spotify records. Every table the app builds, exports,
+# stores or compares goes through to_frame/apply_schema, so counters are nullable integers
+# (missing values are <NA>, not "Not available"), repeated labels are categoricals and
+# timestamps are real datetimes. pandas is imported on first use, so the row builders
+# (parse_iso8601_duration, to_int) stay cheap to import.
+import re
+
+YOUTUBE_SCHEMA = {
+    "Title": "string",
+    "URL": "string",
+    "Video ID": "string",
+    "Published Date": "datetime64[ns, UTC]",
+    "Channel Name": "category",
+    "Tags": "string",
+    "Category ID": "string",
+    "Category Name": "category",
+    "Duration (s)": "Int64",
+    "Views": "Int64",
+    "Likes": "Int64",
+    "Comments": "Int64",
+    "Reporting Date": "datetime64[ns]",
+}
+
+SPOTIFY_SCHEMA = {
+    "Track Name": "string",
+    "Track URL": "string",
+    "Artists": "category",
+    "Album": "string",
+    "Release Date": "string",  # Spotify gives year, year-month or full dates depending on the album
+    "Duration (ms)": "Int64",
+    "Popularity": "Int64",
+    "Artist Followers": "Int64",
+    "Tempo": "Float64",
+    "Danceability": "Float64",
+    "Energy": "Float64",
+    "Reporting Date": "datetime64[ns]",
+}
+
+SCHEMAS = {"youtube": YOUTUBE_SCHEMA, "spotify": SPOTIFY_SCHEMA}
+
+# counters tracked across snapshots (compare.py, collector.py)
+METRICS = {
+    "youtube": ["Views", "Likes", "Comments"],
+    "spotify": ["Popularity", "Artist Followers"],
+}
+
+ISO8601_DURATION_RE = re.compile(
+    r"^P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$"
+)
+
+
+def parse_iso8601_duration(value):
+    # "PT1H2M3S" -> 3723; returns None for blanks or anything unparseable
+    if not value or not isinstance(value, str):
+        return None
+    m = ISO8601_DURATION_RE.match(value.strip())
+    if not m or value.strip() in ("P", "PT"):
+        return None
+    parts = {k: float(v) for k, v in m.groupdict().items() if v}
+    return int(parts.get("days", 0) * 86400 + parts.get("hours", 0) * 3600
+               + parts.get("minutes", 0) * 60 + parts.get("seconds", 0))
+
+
+def to_int(value):
+    # API counters arrive as strings; missing or hidden counters become None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _matches(series, dtype: str) -> bool:
+    import pandas as pd
+    if dtype.startswith("datetime64"):
+        # resolution (ns/us) is left to pandas; only naive vs UTC matters here
+        return (pd.api.types.is_datetime64_any_dtype(series)
+                and ("UTC" in dtype) == (getattr(series.dt, "tz", None) is not None))
+    return str(series.dtype) == dtype
+
+
+def _coerce(series, dtype: str):
+    import pandas as pd
+    if dtype == "Int64":
+        return pd.to_numeric(series, errors="coerce").round().astype("Int64")
+    if dtype == "Float64":
+        return pd.to_numeric(series, errors="coerce").astype("Float64")
+    if dtype == "datetime64[ns, UTC]":
+        return pd.to_datetime(series, errors="coerce", utc=True)
+    if dtype == "datetime64[ns]":
+        out = pd.to_datetime(series, errors="coerce")
+        return out.dt.tz_localize(None) if getattr(out.dt, "tz", None) is not None else out
+    if dtype == "category":
+        return series.astype("string").astype("category")
+    return series.astype(dtype)
+
+
+def apply_schema(service: str, df):
+    # coerces a frame (fresh rows, a parsed CSV or a stored snapshot) to the declared dtypes;
+    # unknown columns are kept as they are, declared columns keep the schema order
+    schema = SCHEMAS[service]
+    df = df.copy()
+    # snapshots written before Duration was parsed carry the raw ISO-8601 string
+    if service == "youtube" and "Duration" in df.columns and "Duration (s)" not in df.columns:
+        df["Duration (s)"] = df["Duration"].map(parse_iso8601_duration)
+        df = df.drop(columns=["Duration"])
+    for col, dtype in schema.items():
+        if col in df.columns and not _matches(df[col], dtype):
+            df[col] = _coerce(df[col], dtype)
+    ordered = [c for c in schema if c in df.columns]
+    return df[ordered + [c for c in df.columns if c not in schema]]
+
+
+def to_frame(service: str, rows):
+    import pandas as pd
+    if not rows:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in SCHEMAS[service].items()})
+    return apply_schema(service, pd.DataFrame(rows))
@@ -0,0 +1,89 @@
+# snapshot_store.py
+# Local snapshot repository: each run is stored as a typed (schema.py), zstd-compressed Parquet file under
+#   <root>/<service>/date=YYYY-MM-DD/<service>_YYYY-MM-DD_HH-MM-SS.parquet
+# with the capture timestamp kept in the file metadata (renaming a file does not lose it).
+# pyarrow is optional and, like pandas, only imported when the store is used.
+import importlib.util
+import os
+from datetime import datetime
+
+STORE_ROOT = "snapshots"
+CAPTURED_AT_KEY = b"captured_at"
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The snapshot store needs pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def store_available() -> bool:
+    # checked on every app rerun: looks pyarrow up without importing it
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+class SnapshotStore:
+    def __init__(self, root: str = STORE_ROOT):
+        self.root = root
+
+    def save(self, service: str, df, captured_at: datetime = None) -> str:
+        pa, pq = _pyarrow()
+        captured_at = captured_at or datetime.now()
+        stamp = captured_at.strftime("%Y-%m-%d_%H-%M-%S")
+        directory = os.path.join(self.root, service, f"date={captured_at.strftime('%Y-%m-%d')}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{service}_{stamp}.parquet")
+
+        from schema import apply_schema
+        table = pa.Table.from_pandas(apply_schema(service, df), preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[CAPTURED_AT_KEY] = captured_at.isoformat(timespec="seconds").encode("utf-8")
+        metadata[b"service"] = service.encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+        pq.write_table(table, path, compression="zstd")
+        return path
+
+    def list_snapshots(self, service: str):
+        # returns [(captured_at, path)] oldest first; only the Parquet footers are read
+        _, pq = _pyarrow()
+        base = os.path.join(self.root, service)
+        out = []
+        if not os.path.isdir(base):
+            return out
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if not name.endswith(".parquet"):
+                    continue
+                path = os.path.join(dirpath, name)
+                meta = pq.read_schema(path).metadata or {}
+                raw = meta.get(CAPTURED_AT_KEY)
+                if raw is None:
+                    continue
+                out.append((datetime.fromisoformat(raw.decode("utf-8")), path))
+        out.sort()
+        return out
+
+    def load(self, path: str, columns=None):
+        # memory-mapped read; returns (DataFrame, captured_at)
+        _, pq = _pyarrow()
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        raw = (pq.read_schema(path).metadata or {}).get(CAPTURED_AT_KEY)
+        captured_at = datetime.fromisoformat(raw.decode("utf-8")) if raw else None
+        return table.to_pandas(), captured_at
+
+    def load_history(self, service: str, columns=None, since: datetime = None, until: datetime = None):
+        # every stored snapshot in [since, until] as one frame with a "Captured At" column
+        pa, pq = _pyarrow()
+        tables = []
+        for captured_at, path in self.list_snapshots(service):
+            if (since and captured_at < since) or (until and captured_at > until):
+                continue
+            table = pq.read_table(path, columns=columns, memory_map=True)
+            table = table.append_column("Captured At", pa.array([captured_at] * table.num_rows, pa.timestamp("s")))
+            tables.append(table)
+        if not tables:
+            import pandas as pd
+            return pd.DataFrame()
+        return pa.concat_tables(tables, promote_options="default").to_pandas()
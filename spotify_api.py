@@ -0,0 +1,366 @@
+# spotify_api.py
+# Spotify Web API helpers, requests-only (no Streamlit imports, shared by app.py and cli.py)
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import response_cache
+from credential_pool import POOLED_RETRY_STATUSES, REJECTED_COOLDOWN, CredentialPool
+from helpers import batch_timestamp, chunkify
+from http_client import get_client, parse_retry_after
+from response_cache import get_response_cache
+from spotify_auth import get_token_cache
+
+# base urls are module-level so the helpers can be pointed at a local stand-in server
+# (the token endpoint lives in spotify_auth.TOKEN_URL)
+SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+SPOTIFY_MAX_WORKERS = 8
+
+
+# open.spotify.com/track/<id> (also intl-xx/ and embed/ paths), spotify:track:<id>, or a bare id
+SPOTIFY_TRACK_URL_RE = re.compile(r"(?:open\.spotify\.com/(?:intl-[\w-]+/)?(?:embed/)?track/|spotify:track:)([A-Za-z0-9]+)")
+SPOTIFY_TRACK_ID_RE = re.compile(r"\s*([A-Za-z0-9_-]{8,})\s*")
+
+
+def extract_spotify_id(s: str) -> str:
+    m = SPOTIFY_TRACK_URL_RE.search(s) or SPOTIFY_TRACK_ID_RE.fullmatch(s)
+    return m.group(1) if m else ""
+
+
+def parse_spotify_lines(lines):
+    # URL mode counterpart of parse_youtube_lines: returns (ids, url_map, unparsed) with ids unique in
+    # first-seen order and url_map listing every input line per id
+    url_map = {}
+    unparsed = []
+    for line in lines:
+        tid = extract_spotify_id(line)
+        if tid:
+            url_map.setdefault(tid, []).append(line)
+        else:
+            unparsed.append(line)
+    return list(url_map), url_map, unparsed
+
+
+def prepare_spotify_lines(lines, input_mode: str):
+    # dedups a batch before any request: URL mode keeps the first line per track id, title mode the
+    # first copy of each line. returns (lines, unparsed lines, number of duplicates dropped)
+    lines = list(lines)
+    if input_mode == "Track URLs/URIs":
+        ids, url_map, unparsed = parse_spotify_lines(lines)
+        unique = [url_map[tid][0] for tid in ids]
+    else:
+        unparsed = []
+        unique = list(dict.fromkeys(lines))
+    return unique, unparsed, len(lines) - len(unique) - len(unparsed)
+
+
+def get_spotify_token(client_id: str, client_secret: str) -> str:
+    # cached per process; a new token is only requested shortly before the old one expires
+    return get_token_cache().get(client_id, client_secret)
+
+
+def spotify_endpoint(url: str) -> str:
+    # metrics label: ".../v1/tracks/<id>" -> "spotify.tracks"
+    path = url[len(SPOTIFY_API_BASE):] if url.startswith(SPOTIFY_API_BASE) else url
+    return "spotify." + path.lstrip("/").split("?")[0].split("/")[0]
+
+
+def _spotify_get_pooled(url: str, pool: CredentialPool, **kwargs):
+    # the same request on the next client pair when one is throttled or its credentials are refused
+    endpoint = spotify_endpoint(url)
+    for _ in range(pool.attempts()):
+        cred = pool.acquire()
+        if cred is None:
+            break
+        token = get_token_cache().get(*cred.value)
+        if not token:
+            pool.take_out(cred, "credentials rejected", REJECTED_COOLDOWN)
+            continue
+        r = get_client().get(url, endpoint=endpoint, headers={"Authorization": f"Bearer {token}"},
+                             retry_statuses=POOLED_RETRY_STATUSES, **kwargs)
+        if r.status_code == 401:
+            fresh = get_token_cache().refresh(token)
+            if fresh:
+                r = get_client().get(url, endpoint=endpoint, headers={"Authorization": f"Bearer {fresh}"},
+                                     retry_statuses=POOLED_RETRY_STATUSES, **kwargs)
+        if r.status_code != 429:
+            return r
+        pool.throttled(cred, parse_retry_after(r.headers.get("Retry-After")))
+    raise RuntimeError(f"No Spotify client credentials available ({pool.summary()})")
+
+
+def spotify_get(url: str, token, **kwargs):
+    # GET with bearer auth; a 401 means the token expired mid-batch, so refresh once and retry.
+    # token is one access token or a CredentialPool of client pairs
+    if isinstance(token, CredentialPool):
+        return _spotify_get_pooled(url, token, **kwargs)
+    token = get_token_cache().current(token)
+    endpoint = spotify_endpoint(url)
+    r = get_client().get(url, endpoint=endpoint, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+    if r.status_code == 401:
+        fresh = get_token_cache().refresh(token)
+        if fresh:
+            r = get_client().get(url, endpoint=endpoint, headers={"Authorization": f"Bearer {fresh}"}, **kwargs)
+    return r
+
+
+def search_spotify_track(query: str, token: str):
+    # returns top track item or None
+    url = f"{SPOTIFY_API_BASE}/search"
+    params = {"q": query, "type": "track", "limit": 1}
+    try:
+        r = spotify_get(url, token, params=params, timeout=10)
+    except Exception:
+        return None
+    if r.status_code != 200:
+        return None
+    data = r.json()
+    items = data.get("tracks", {}).get("items", [])
+    return items[0] if items else None
+
+
+def build_spotify_row(t, features, artist_followers, track_id: str, reported_at=None):
+    features = features or {}
+    artists = ", ".join([a.get("name") for a in t.get("artists", []) if a.get("name")])
+    return {
+        "Track Name": t.get("name"),
+        "Track URL": t.get("external_urls", {}).get("spotify", f"https://open.spotify.com/track/{track_id}"),
+        "Artists": artists,
+        "Album": t.get("album", {}).get("name"),
+        "Release Date": t.get("album", {}).get("release_date"),
+        "Duration (ms)": t.get("duration_ms"),
+        "Popularity": t.get("popularity"),
+        "Artist Followers": artist_followers,
+        "Tempo": features.get("tempo"),
+        "Danceability": features.get("danceability"),
+        "Energy": features.get("energy"),
+        "Reporting Date": reported_at or batch_timestamp()
+    }
+
+
+def fetch_spotify_track_details(track_id: str, token: str):
+    try:
+        r = spotify_get(f"{SPOTIFY_API_BASE}/tracks/{track_id}", token, timeout=10)
+    except Exception as e:
+        return None, f"Request error: {e}"
+    if r.status_code != 200:
+        return None, f"HTTP {r.status_code}: {r.text}"
+    t = r.json()
+
+    # audio features (tempo, danceability, energy)
+    features = {}
+    try:
+        fresp = spotify_get(f"{SPOTIFY_API_BASE}/audio-features/{track_id}", token, timeout=10)
+        if fresp.status_code == 200:
+            features = fresp.json()
+    except Exception:
+        features = {}
+
+    # artist followers (first artist)
+    artist_followers = None
+    try:
+        if t.get("artists"):
+            artist_id = t["artists"][0].get("id")
+            if artist_id:
+                ar = spotify_get(f"{SPOTIFY_API_BASE}/artists/{artist_id}", token, timeout=10)
+                if ar.status_code == 200:
+                    artist_followers = ar.json().get("followers", {}).get("total")
+    except Exception:
+        artist_followers = None
+
+    return build_spotify_row(t, features, artist_followers, track_id), None
+
+
+# Spotify multi-id endpoints: /tracks and /artists take 50 ids, /audio-features takes 100
+SPOTIFY_TRACKS_BATCH = 50
+SPOTIFY_FEATURES_BATCH = 100
+SPOTIFY_ARTISTS_BATCH = 50
+
+
+def _fetch_spotify_batch(path: str, key: str, ids, token: str):
+    # returns ({id: item}, error) for one multi-id request; missing ids come back as null items
+    try:
+        r = spotify_get(f"{SPOTIFY_API_BASE}/{path}", token, params={"ids": ",".join(ids)}, timeout=20)
+    except Exception as e:
+        return {}, f"Request error: {e}"
+    if r.status_code != 200:
+        return {}, f"HTTP {r.status_code}: {r.text}"
+    items = r.json().get(key) or []
+    return {item["id"]: item for item in items if item and item.get("id")}, None
+
+
+def _fetch_spotify_batches(path: str, key: str, ids, size: int, token: str, max_workers: int):
+    # fans the chunks of one endpoint out over a pool; returns (items by id, error by id)
+    chunks = list(chunkify(ids, size))
+    found, errors = {}, {}
+    if not chunks:
+        return found, errors
+    workers = max(1, min(int(max_workers), len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda c: _fetch_spotify_batch(path, key, c, token), chunks)
+        for chunk, (items, err) in zip(chunks, results):
+            found.update(items)
+            if err:
+                for i in chunk:
+                    errors[i] = err
+    return found, errors
+
+
+# cache kind -> (fields, split, join) for each multi-id endpoint
+SPOTIFY_CACHE_KINDS = {
+    "tracks": ("spotify_track", response_cache.SPOTIFY_TRACK_FIELDS,
+               response_cache.split_spotify_track, response_cache.join_spotify_track),
+    "audio-features": ("spotify_features", response_cache.SPOTIFY_FEATURES_FIELDS,
+                       response_cache.split_spotify_features, response_cache.join_spotify_features),
+    "artists": ("spotify_artist", response_cache.SPOTIFY_ARTIST_FIELDS,
+                response_cache.split_spotify_artist, response_cache.join_spotify_artist),
+}
+
+
+def _fetch_spotify_cached(path: str, key: str, ids, size: int, token: str, max_workers: int):
+    # serves fresh ids from the response cache and only sends the rest to the API
+    kind, fields, split, join = SPOTIFY_CACHE_KINDS[path]
+    cache = get_response_cache()
+    found, missing = {}, []
+    for i in ids:
+        parts = cache.get(kind, i, fields)
+        if parts is not None:
+            found[i] = join(parts)
+        else:
+            missing.append(i)
+    fetched, errors = _fetch_spotify_batches(path, key, missing, size, token, max_workers)
+    for i, item in fetched.items():
+        cache.put(kind, i, split(item))
+    found.update(fetched)
+    return found, errors
+
+
+def fetch_spotify_tracks_batch(track_ids, token: str, max_workers: int = SPOTIFY_MAX_WORKERS, reported_at=None):
+    # batched equivalent of fetch_spotify_track_details: returns {track_id: (row, error)}
+    reported_at = reported_at or batch_timestamp()
+    unique_ids = list(dict.fromkeys(t for t in track_ids if t))
+    tracks, track_errors = _fetch_spotify_cached("tracks", "tracks", unique_ids, SPOTIFY_TRACKS_BATCH, token, max_workers)
+    found_ids = [tid for tid in unique_ids if tid in tracks]
+    features, _ = _fetch_spotify_cached("audio-features", "audio_features", found_ids, SPOTIFY_FEATURES_BATCH, token, max_workers)
+
+    # artist followers (first artist), each artist looked up once across all tracks
+    artist_ids = list(dict.fromkeys(
+        tracks[tid]["artists"][0].get("id") for tid in found_ids
+        if tracks[tid].get("artists") and tracks[tid]["artists"][0].get("id")
+    ))
+    artists, _ = _fetch_spotify_cached("artists", "artists", artist_ids, SPOTIFY_ARTISTS_BATCH, token, max_workers)
+
+    results = {}
+    for tid in unique_ids:
+        t = tracks.get(tid)
+        if not t:
+            results[tid] = (None, track_errors.get(tid, "Track not found"))
+            continue
+        artist_followers = None
+        if t.get("artists"):
+            artist = artists.get(t["artists"][0].get("id"))
+            if artist:
+                artist_followers = artist.get("followers", {}).get("total")
+        results[tid] = (build_spotify_row(t, features.get(tid), artist_followers, tid, reported_at), None)
+    return results
+
+
+SPOTIFY_FEAT_RE = re.compile(r"\b(?:featuring|feat|ft)\b\.?")
+SPOTIFY_QUERY_PUNCT_RE = re.compile(r"[()\[\]{}]|\s[-\u2013\u2014]+\s")
+
+
+def normalize_spotify_query(title: str) -> str:
+    # "Song (ft. X) – Artist" and "song feat. x - artist" become the same query
+    q = unicodedata.normalize("NFKC", title).casefold()
+    q = SPOTIFY_QUERY_PUNCT_RE.sub(" ", q)
+    q = SPOTIFY_FEAT_RE.sub("feat", q)
+    return " ".join(q.split())
+
+
+def search_spotify_tracks(titles, token: str, max_workers: int = SPOTIFY_MAX_WORKERS):
+    # returns {normalized query: {"id", "name", "artists"} or None}; each distinct query is searched
+    # once, known queries come from the response cache, and the tracks found are cached as well,
+    # so the detail fetch that follows does not request them again
+    queries = list(dict.fromkeys(q for q in map(normalize_spotify_query, titles) if q))
+    cache = get_response_cache()
+    matches, missing = {}, []
+    for q in queries:
+        parts = cache.get("spotify_search", q, response_cache.SPOTIFY_SEARCH_FIELDS)
+        if parts is not None:
+            matches[q] = parts["match"]
+        else:
+            missing.append(q)
+    if not missing:
+        return matches
+    workers = max(1, min(int(max_workers), len(missing)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        items = list(pool.map(lambda q: search_spotify_track(q, token), missing))
+    for q, item in zip(missing, items):
+        if not item or not item.get("id"):
+            matches[q] = None  # not cached: a failed or empty search is retried next time
+            continue
+        match = {"id": item["id"], "name": item.get("name"),
+                 "artists": [a.get("name") for a in item.get("artists", [])]}
+        matches[q] = match
+        cache.put("spotify_search", q, {"match": match})
+        cache.put("spotify_track", item["id"], response_cache.split_spotify_track(item))
+    return matches
+
+
+def resolve_spotify_line_id(line: str, input_mode: str, token: str, matches=None):
+    # returns (track_id, error, notes) for one input line; notes are the progress messages shown in the UI.
+    # In title mode `matches` is the search_spotify_tracks result for the whole batch
+    notes = []
+    if input_mode == "Track URLs/URIs":
+        tid = extract_spotify_id(line)
+        if not tid:
+            return None, f"Could not extract track id from: {line}", notes
+        notes.append(f"🔍 Extracted track ID: `{tid}`")
+        return tid, None, notes
+
+    # Track Titles: look the normalized title up in the batch's search results
+    notes.append(f"🔎 Searching for: `{line}`")
+    if matches is None:
+        matches = search_spotify_tracks([line], token)
+    match = matches.get(normalize_spotify_query(line))
+    if not match:
+        return None, f"No match found for title: {line}", notes
+    notes.append(f"✔ Top match: `{match.get('name')}` by {', '.join(a for a in match.get('artists', []) if a)}")
+    return match["id"], None, notes
+
+
+def enrich_spotify_lines(lines, input_mode: str, token: str, max_workers: int = SPOTIFY_MAX_WORKERS, reported_at=None):
+    # returns [(row, error, notes)] in input order: in title mode the distinct normalized titles are
+    # searched concurrently first, then details for the unique ids are fetched through the batch endpoints
+    if not lines:
+        return []
+    matches = search_spotify_tracks(lines, token, max_workers) if input_mode == "Track Titles (search)" else None
+    resolved = [resolve_spotify_line_id(l, input_mode, token, matches) for l in lines]
+
+    details = fetch_spotify_tracks_batch([tid for tid, err, _ in resolved if not err], token, max_workers, reported_at)
+    out = []
+    for line, (tid, err, notes) in zip(lines, resolved):
+        if err:
+            out.append((None, err, notes))
+            continue
+        data, err = details.get(tid, (None, "Track not found"))
+        if err:
+            out.append((None, f"{line} -> {err}", notes))
+            continue
+        data = dict(data)
+        # ensure Track URL column contains original input if external url missing
+        if input_mode == "Track URLs/URIs" and not data.get("Track URL"):
+            data["Track URL"] = line
+        out.append((data, None, notes))
+    return out
+
+
+def iter_spotify_rows(lines, input_mode: str, token: str, max_workers: int = SPOTIFY_MAX_WORKERS,
+                      skip=(), chunk_size: int = 100, reported_at=None):
+    # yields (line, row, error, notes) in input order, one chunk of lines at a time, so callers can
+    # render and checkpoint as results arrive; lines in `skip` (already checkpointed) are not fetched
+    reported_at = reported_at or batch_timestamp()
+    pending = [l for l in lines if l not in skip]
+    for chunk in chunkify(pending, chunk_size):
+        for line, (data, err, notes) in zip(chunk, enrich_spotify_lines(chunk, input_mode, token, max_workers, reported_at)):
+            yield line, data, err, notes
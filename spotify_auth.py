@@ -0,0 +1,80 @@
+# spotify_auth.py
+# Process-wide Spotify client-credentials token cache.
+# Lives outside app.py so it survives Streamlit reruns and is shared by all sessions.
+import threading
+import time
+
+from http_client import get_client
+
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+REFRESH_MARGIN = 60  # seconds before expiry at which a token is treated as stale
+
+
+class SpotifyTokenCache:
+    def __init__(self, margin=REFRESH_MARGIN, clock=time.time):
+        self.margin = margin
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}  # client_id -> {"token", "expires_at", "secret"}
+        self._owner = {}    # every token handed out -> client_id, so stale tokens can be refreshed
+
+    def _request_token(self, client_id: str, client_secret: str):
+        try:
+            resp = get_client().post(TOKEN_URL, endpoint="spotify.token", data={"grant_type": "client_credentials"},
+                                     auth=(client_id, client_secret), timeout=10)
+        except Exception:
+            return "", 0
+        if resp.status_code != 200:
+            return "", 0
+        data = resp.json()
+        return data.get("access_token", ""), int(data.get("expires_in") or 3600)
+
+    def get(self, client_id: str, client_secret: str, force: bool = False) -> str:
+        if not client_id or not client_secret:
+            return ""
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if (not force and entry and entry["secret"] == client_secret
+                    and self._clock() < entry["expires_at"] - self.margin):
+                return entry["token"]
+            token, expires_in = self._request_token(client_id, client_secret)
+            if not token:
+                self._entries.pop(client_id, None)
+                return ""
+            self._entries[client_id] = {"token": token, "expires_at": self._clock() + expires_in, "secret": client_secret}
+            self._owner[token] = client_id
+            return token
+
+    def current(self, token: str) -> str:
+        # freshest token for the credentials that issued `token` (refreshed if close to expiry)
+        with self._lock:
+            client_id = self._owner.get(token)
+            entry = self._entries.get(client_id) if client_id else None
+        if not entry:
+            return token
+        return self.get(client_id, entry["secret"]) or token
+
+    def refresh(self, stale_token: str) -> str:
+        # called after a 401; concurrent callers holding the same stale token share one refresh
+        with self._lock:
+            client_id = self._owner.get(stale_token)
+            entry = self._entries.get(client_id) if client_id else None
+            if entry and entry["token"] != stale_token and self._clock() < entry["expires_at"] - self.margin:
+                return entry["token"]
+        if not entry:
+            return ""
+        return self.get(client_id, entry["secret"], force=True)
+
+    def invalidate(self, client_id: str = None):
+        with self._lock:
+            if client_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(client_id, None)
+
+
+_cache = SpotifyTokenCache()
+
+
+def get_token_cache() -> SpotifyTokenCache:
+    return _cache
@@ -3,10 +3,6 @@ import pandas as pd
 import requests
 from datetime import datetime
 
-# --- Load API Key from file ---
-with open("secrets/google_api_key.txt", "r") as f:
-    youtube_api_key = f.read().strip()
-
 # --- Category Mapping ---
 categories = {
     "1": "Film & Animation", "2": "Autos & Vehicles", "10": "Music", "15": "Pets & Animals",
@@ -19,6 +15,11 @@ categories = {
     "40": "Sci-Fi/Fantasy", "41": "Thriller", "42": "Shorts", "43": "Shows", "44": "Trailers"
 }
 
+# --- Load API Key from file (on Analyze, not at import, so the page loads without it) ---
+def load_api_key():
+    with open("secrets/google_api_key.txt", "r") as f:
+        return f.read().strip()
+
 # Create timestamp string
 timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
@@ -33,7 +34,13 @@ st.write("Paste multiple YouTube video URLs (one per line). The API key is secur
 urls_input = st.text_area("Enter YouTube URLs (one per line)")
 
 if st.button("Analyze Videos"):
-    if not urls_input.strip():
+    try:
+        youtube_api_key = load_api_key()
+    except OSError:
+        youtube_api_key = ""
+    if not youtube_api_key:
+        st.error("secrets/google_api_key.txt not found or empty. Put your YouTube API key in that file.")
+    elif not urls_input.strip():
         st.error("Please enter at least one YouTube URL.")
     else:
         video_urls = [u.strip() for u in urls_input.split("\n") if u.strip()]
@@ -0,0 +1,326 @@
+# youtube_api.py
+# YouTube Data API helpers (no Streamlit imports, shared by app.py and cli.py)
+import math
+import re
+import threading
+
+import response_cache
+from credential_pool import (POOLED_RETRY_STATUSES, REJECTED_COOLDOWN, CredentialPool,
+                             seconds_until_quota_reset)
+from helpers import batch_timestamp, chunkify
+from http_client import get_client, parse_retry_after
+from metrics import get_metrics
+from response_cache import get_response_cache
+from schema import parse_iso8601_duration, to_int
+
+# base url is module-level so the helpers can be pointed at a local stand-in server
+YOUTUBE_API_BASE = "https://www.googleapis.com/youtube/v3"
+
+# quota units per call (https://developers.google.com/youtube/v3/determine_quota_cost)
+YOUTUBE_QUOTA_COSTS = {"videos": 1, "playlistItems": 1, "playlists": 1, "channels": 1}
+YOUTUBE_DAILY_QUOTA = 10_000
+YOUTUBE_PAGE_SIZE = 50
+# error reasons that take a pooled key out of rotation
+YOUTUBE_QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+YOUTUBE_RATE_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+YOUTUBE_KEY_REASONS = {"keyInvalid", "keyExpired", "accessNotConfigured"}
+
+YOUTUBE_CATEGORIES = {
+    "1": "Film & Animation", "2": "Autos & Vehicles", "10": "Music", "15": "Pets & Animals",
+    "17": "Sports", "18": "Short Movies", "19": "Travel & Events", "20": "Gaming",
+    "21": "Videoblogging", "22": "People & Blogs", "23": "Comedy", "24": "Entertainment",
+    "25": "News & Politics", "26": "Howto & Style", "27": "Education",
+    "28": "Science & Technology", "29": "Nonprofits & Activism", "30": "Movies",
+    "31": "Anime/Animation", "32": "Action/Adventure", "33": "Classics", "34": "Comedy",
+    "35": "Documentary", "36": "Drama", "37": "Family", "38": "Foreign", "39": "Horror",
+    "40": "Sci-Fi/Fantasy", "41": "Thriller", "42": "Shorts", "43": "Shows", "44": "Trailers"
+}
+
+
+# watch?v=, youtu.be/, shorts/, embed/, live/ and /v/ links on www., m., music. and the
+# nocookie domain, or a bare 11-character id
+YOUTUBE_VIDEO_URL_RE = re.compile(
+    r"youtu(?:be(?:-nocookie)?\.com/(?:watch\?(?:[^#\s]*&)?v=|shorts/|embed/|live/|v/)|\.be/)([\w-]{11})(?![\w-])"
+)
+YOUTUBE_VIDEO_ID_RE = re.compile(r"\s*([\w-]{11})\s*")
+
+
+def extract_youtube_id(url: str) -> str:
+    m = YOUTUBE_VIDEO_URL_RE.search(url) or YOUTUBE_VIDEO_ID_RE.fullmatch(url)
+    return m.group(1) if m else ""
+
+
+class QuotaBudget:
+    # caps the quota units one run may spend; every YouTube request charges it before going out
+    def __init__(self, limit: int = YOUTUBE_DAILY_QUOTA):
+        self.limit = limit
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.spent)
+
+    def charge(self, units: int = 1) -> bool:
+        with self._lock:
+            if self.spent + units > self.limit:
+                return False
+            self.spent += units
+            return True
+
+
+def estimate_video_quota(video_count: int) -> int:
+    # videos.list, 50 ids per call
+    return math.ceil(video_count / YOUTUBE_PAGE_SIZE) * YOUTUBE_QUOTA_COSTS["videos"]
+
+
+def estimate_playlist_quota(item_count: int) -> int:
+    # one playlistItems page plus one videos.list call per 50 items
+    pages = math.ceil(item_count / YOUTUBE_PAGE_SIZE)
+    return pages * YOUTUBE_QUOTA_COSTS["playlistItems"] + estimate_video_quota(item_count)
+
+
+YOUTUBE_CHANNEL_RE = re.compile(r"youtube\.com/channel/(UC[\w-]+)")
+YOUTUBE_HANDLE_RE = re.compile(r"youtube\.com/(@[\w.-]+)")
+YOUTUBE_USER_RE = re.compile(r"youtube\.com/user/([\w.-]+)")
+YOUTUBE_PLAYLIST_RE = re.compile(r"[?&]list=([\w-]+)")
+YOUTUBE_SOURCE_HINT_RE = re.compile(r"youtube\.com/(?:channel/|@|user/)|[?&]list=")
+
+
+def extract_youtube_source(url: str):
+    # channel/playlist urls -> (kind, value); single videos (anything with v=) and unknown urls -> None
+    s = url.strip()
+    if "v=" in s or "youtu.be/" in s:
+        return None
+    for kind, pattern in (("playlist", YOUTUBE_PLAYLIST_RE), ("channel", YOUTUBE_CHANNEL_RE),
+                          ("handle", YOUTUBE_HANDLE_RE), ("user", YOUTUBE_USER_RE)):
+        m = pattern.search(s)
+        if m:
+            return kind, m.group(1)
+    return None
+
+
+def youtube_error_reason(r) -> str:
+    # "quotaExceeded", "keyInvalid", ... from a YouTube error response, or ""
+    try:
+        errors = r.json().get("error", {}).get("errors") or []
+    except (ValueError, AttributeError):
+        return ""
+    return errors[0].get("reason", "") if errors else ""
+
+
+def _youtube_get_pooled(endpoint: str, params: dict, pool: CredentialPool, units: int):
+    # the same request, moving to the next key when one is out of quota, throttled or rejected
+    for _ in range(pool.attempts()):
+        cred = pool.acquire(units)
+        if cred is None:
+            break
+        try:
+            r = get_client().get(f"{YOUTUBE_API_BASE}/{endpoint}", endpoint=f"youtube.{endpoint}",
+                                 params=dict(params, key=cred.value), timeout=20, retry_statuses=POOLED_RETRY_STATUSES)
+        except Exception as e:
+            return None, f"YouTube request error: {e}"
+        if r.status_code == 200:
+            return r.json(), None
+        reason = youtube_error_reason(r)
+        if r.status_code == 429 or reason in YOUTUBE_RATE_REASONS:
+            pool.throttled(cred, parse_retry_after(r.headers.get("Retry-After")))
+        elif reason in YOUTUBE_QUOTA_REASONS:
+            pool.take_out(cred, "quota exceeded", seconds_until_quota_reset())
+        elif reason in YOUTUBE_KEY_REASONS:
+            pool.take_out(cred, "key rejected", REJECTED_COOLDOWN)
+        else:
+            return None, f"YouTube API error {r.status_code}: {r.text}"
+    return None, f"No YouTube API key available ({pool.summary()})"
+
+
+def _youtube_get(endpoint: str, params: dict, api_key, budget=None):
+    # returns (json, error); charges the budget before the request goes out.
+    # api_key is one key or a CredentialPool of several
+    units = YOUTUBE_QUOTA_COSTS.get(endpoint, 1)
+    if budget is not None and not budget.charge(units):
+        return None, f"YouTube quota budget exhausted ({budget.spent}/{budget.limit} units)"
+    get_metrics().record_quota("youtube", units)
+    if isinstance(api_key, CredentialPool):
+        return _youtube_get_pooled(endpoint, params, api_key, units)
+    try:
+        r = get_client().get(f"{YOUTUBE_API_BASE}/{endpoint}", endpoint=f"youtube.{endpoint}",
+                             params=dict(params, key=api_key), timeout=20)
+    except Exception as e:
+        return None, f"YouTube request error: {e}"
+    if r.status_code != 200:
+        return None, f"YouTube API error {r.status_code}: {r.text}"
+    return r.json(), None
+
+
+def resolve_youtube_source(kind: str, value: str, api_key: str, budget=None):
+    # returns (playlist_id, item_count, error); channels resolve to their uploads playlist
+    if kind == "playlist":
+        data, err = _youtube_get("playlists", {"part": "contentDetails", "id": value}, api_key, budget)
+        if err:
+            return None, 0, err
+        items = data.get("items", [])
+        if not items:
+            return None, 0, f"Playlist not found: {value}"
+        return value, int(items[0].get("contentDetails", {}).get("itemCount", 0)), None
+
+    lookup = {"channel": "id", "handle": "forHandle", "user": "forUsername"}[kind]
+    params = {"part": "contentDetails,statistics", lookup: value}
+    data, err = _youtube_get("channels", params, api_key, budget)
+    if err:
+        return None, 0, err
+    items = data.get("items", [])
+    if not items:
+        return None, 0, f"Channel not found: {value}"
+    uploads = items[0].get("contentDetails", {}).get("relatedPlaylists", {}).get("uploads")
+    if not uploads:
+        return None, 0, f"Channel has no uploads playlist: {value}"
+    return uploads, int(items[0].get("statistics", {}).get("videoCount", 0)), None
+
+
+def fetch_playlist_video_ids(playlist_id: str, api_key: str, budget=None, max_items: int = None):
+    # pages through playlistItems (50 per page); returns (video ids, error)
+    ids = []
+    page_token = None
+    while max_items is None or len(ids) < max_items:
+        params = {"part": "contentDetails", "playlistId": playlist_id, "maxResults": YOUTUBE_PAGE_SIZE}
+        if page_token:
+            params["pageToken"] = page_token
+        data, err = _youtube_get("playlistItems", params, api_key, budget)
+        if err:
+            return ids, err
+        for item in data.get("items", []):
+            vid = item.get("contentDetails", {}).get("videoId")
+            if vid:
+                ids.append(vid)
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            break
+    return ids[:max_items] if max_items is not None else ids, None
+
+
+def expand_youtube_sources(lines, api_key: str, budget=None, max_videos: int = None):
+    # replaces channel/playlist lines with watch urls for their videos, capped so that the
+    # playlist pages and the later videos.list calls fit in the remaining budget
+    # returns (lines, notes, errors)
+    out, notes, errors = [], [], []
+    for line in lines:
+        # one cheap regex pass rules out ordinary video urls before the per-kind patterns run
+        source = extract_youtube_source(line) if YOUTUBE_SOURCE_HINT_RE.search(line) else None
+        if not source:
+            out.append(line)
+            continue
+        playlist_id, count, err = resolve_youtube_source(source[0], source[1], api_key, budget)
+        if err:
+            errors.append(f"{line} -> {err}")
+            continue
+        wanted = min(count, max_videos) if max_videos else count
+        estimate = estimate_playlist_quota(wanted)
+        if budget is not None and estimate > budget.remaining:
+            affordable_pages = budget.remaining // (YOUTUBE_QUOTA_COSTS["playlistItems"] + YOUTUBE_QUOTA_COSTS["videos"])
+            wanted = min(wanted, affordable_pages * YOUTUBE_PAGE_SIZE)
+            notes.append(f"{line}: {count} videos would need ~{estimate} quota units; "
+                         f"limited to {wanted} to stay within the remaining budget of {budget.remaining}")
+        if wanted <= 0:
+            continue
+        ids, err = fetch_playlist_video_ids(playlist_id, api_key, budget, wanted)
+        if err:
+            errors.append(f"{line} -> {err}")
+        notes.append(f"{line}: {len(ids)} videos (~{estimate_playlist_quota(len(ids))} quota units)")
+        out.extend(f"https://www.youtube.com/watch?v={vid}" for vid in ids)
+    return out, notes, errors
+
+
+def parse_youtube_lines(lines):
+    # returns (ids, url_map, unparsed lines): ids are unique in first-seen order, url_map lists every
+    # input url per id (the first one goes into the URL column)
+    url_map = {}
+    unparsed = []
+    for line in lines:
+        vid = extract_youtube_id(line)
+        if vid:
+            url_map.setdefault(vid, []).append(line)
+        else:
+            unparsed.append(line)
+    return list(url_map), url_map, unparsed
+
+
+def first_url(url_map, vid: str):
+    urls = url_map.get(vid)
+    return urls[0] if urls else None
+
+
+def fetch_youtube_videos(video_ids, api_key: str, budget=None):
+    # returns ({video_id: item}, [error messages]); cached ids cost no quota
+    results = {}
+    errors = []
+    if not api_key:
+        return results, errors
+    cache = get_response_cache()
+    missing = []
+    for vid in dict.fromkeys(video_ids):
+        parts = cache.get("youtube", vid, response_cache.YOUTUBE_FIELDS)
+        if parts is not None:
+            results[vid] = response_cache.join_youtube_item(vid, parts)
+        else:
+            missing.append(vid)
+    for chunk in chunkify(missing, YOUTUBE_PAGE_SIZE):  # batch 50 per request
+        params = {
+            "part": "snippet,statistics,contentDetails",
+            "id": ",".join(chunk),
+        }
+        data, err = _youtube_get("videos", params, api_key, budget)
+        if err:
+            errors.append(err)
+            continue
+        for item in data.get("items", []):
+            vid = item.get("id")
+            if vid:
+                results[vid] = item
+                cache.put("youtube", vid, response_cache.split_youtube_item(item))
+    return results, errors
+
+
+def build_youtube_row(item, input_url, reported_at=None):
+    snippet = item.get("snippet", {})
+    stats = item.get("statistics", {})
+    content = item.get("contentDetails", {})
+    cat = snippet.get("categoryId", "")
+    return {
+        "Title": snippet.get("title"),
+        "URL": input_url,
+        "Video ID": item.get("id"),
+        "Published Date": snippet.get("publishedAt"),
+        "Channel Name": snippet.get("channelTitle"),
+        "Tags": ", ".join(snippet.get("tags", [])),
+        "Category ID": cat,
+        "Category Name": YOUTUBE_CATEGORIES.get(cat, "Unknown"),
+        "Duration (s)": parse_iso8601_duration(content.get("duration")),
+        "Views": to_int(stats.get("viewCount")),
+        "Likes": to_int(stats.get("likeCount")),
+        "Comments": to_int(stats.get("commentCount")),
+        "Reporting Date": reported_at or batch_timestamp()
+    }
+
+
+def iter_youtube_rows(ids, url_map, api_key: str, skip=(), chunk_size: int = YOUTUBE_PAGE_SIZE, reported_at=None,
+                      budget=None):
+    # yields (video_id, row, warning) in input order, one API batch at a time; request
+    # errors come through as (None, None, error). ids in `skip` (already checkpointed) are not fetched
+    reported_at = reported_at or batch_timestamp()
+    pending = [vid for vid in ids if vid not in skip]
+    for chunk in chunkify(pending, chunk_size):
+        items_map, errors = fetch_youtube_videos(chunk, api_key, budget)
+        for err in errors:
+            yield None, None, err
+        if errors and ((budget is not None and budget.remaining < YOUTUBE_QUOTA_COSTS["videos"])
+                       or (isinstance(api_key, CredentialPool) and not api_key.in_rotation())):
+            # out of quota (the run's budget, or every key's): stop instead of reporting every remaining
+            # id as missing
+            return
+        for vid in chunk:
+            item = items_map.get(vid)
+            if not item:
+                yield vid, None, f"No data returned for video id: {vid} (input: {', '.join(url_map.get(vid) or [])})"
+                continue
+            yield vid, build_youtube_row(item, first_url(url_map, vid), reported_at), None